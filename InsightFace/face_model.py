@@ -1,27 +1,51 @@
+import time
+
 import insightface
+from insightface.app.common import Face
 import cv2
 import numpy as np
 
+import metrics
+
+_started = time.perf_counter()
+
 app = insightface.app.FaceAnalysis(
     name="buffalo_l",
+    allowed_modules=["detection", "recognition"],  # ไม่ต้องโหลด genderage / landmark
     providers=["CPUExecutionProvider"]
 )
 
 app.prepare(ctx_id=0, det_size=(640, 640))
+metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - _started, model="insightface")
+
+def warm_up(frame_sizes=((480, 640), (720, 1280)), iterations: int = 2):
+    """รัน detect + recognition ด้วยภาพสังเคราะห์ ให้ ONNX Runtime init เสร็จก่อน Request แรก"""
+    rng = np.random.default_rng(0)
+    aligned = rng.integers(0, 256, size=(112, 112, 3), dtype=np.uint8)
+    for _ in range(iterations):
+        for height, width in frame_sizes:
+            app.det_model.detect(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8), max_num=1)
+        app.models["recognition"].get_feat(aligned)
 
 def get_embedding(image_bytes: bytes):
     # แปลง bytes → image
-    np_img = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
+    with metrics.stage("decode"):
+        np_img = np.frombuffer(image_bytes, np.uint8)
+        img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
 
     if img is None:
         raise ValueError("Invalid image")
 
-    faces = app.get(img)
+    # แยก app.get() เป็น detect / embed เอง เพื่อให้เวลาแต่ละ stage ใน metrics ไม่ปนกัน
+    with metrics.stage("detect"):
+        bboxes, kpss = app.det_model.detect(img, max_num=1)
 
-    if len(faces) == 0:
+    if bboxes.shape[0] == 0:
         raise ValueError("No face detected")
 
     # ใช้หน้าหลัก
-    embedding = faces[0].embedding
-    return embedding.tolist()
\ No newline at end of file
+    face = Face(bbox=bboxes[0, 0:4], kps=None if kpss is None else kpss[0], det_score=bboxes[0, 4])
+    with metrics.stage("embed"):
+        app.models["recognition"].get(img, face)
+
+    return face.embedding.tolist()
\ No newline at end of file
@@ -1,17 +1,47 @@
-from fastapi import FastAPI,HTTPException, UploadFile, File
+import asyncio
+import logging
+from fastapi import FastAPI,HTTPException, UploadFile, File, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 import cv2, numpy as np
-from qdrant_client import QdrantClient
-from face_model import get_embedding
-from qdrant_service import init_collection, insert_face, search_face
+from face_model import get_embedding, warm_up
+from qdrant_service import client as qdrant, init_collection, ainsert_face, asearch_face, aclose as close_qdrant
+import metrics
+from readiness import readiness, require_ready
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
-
-qdrant = QdrantClient(
-    url="http://localhost:6333"
-)
+app.add_middleware(metrics.ServerTimingMiddleware)
 
 MATCH_THRESHOLD = 0.8
 
+def run_warm_up():
+    try:
+        with readiness.phase("warmup"):
+            warm_up()
+        readiness.mark_ready()
+        logger.info(f"Service ready. Cold start: {readiness.phases}")
+    except Exception as e:
+        logger.exception(f"Warm-up failed: {e}")
+        readiness.fail(e)
+
+@app.on_event("startup")
+async def startup_event():
+    # สร้าง Collection ถ้ายังไม่มี (จำเป็นเมื่อใช้ Qdrant local mode ที่เริ่มจากว่างเปล่า)
+    with readiness.phase("qdrant_init"):
+        init_collection()
+    # warm-up เบื้องหลัง -> /ready เป็น true เมื่อเสร็จ
+    app.state.warmup_task = asyncio.create_task(asyncio.to_thread(run_warm_up))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # ปิด connection pool ของ Qdrant
+    await close_qdrant()
+
 @app.get("/")
 def root():
     return {"message": "API is working"}
@@ -23,6 +53,14 @@ def health():
         "service": "pestguard-api"
     }
 
+@app.get("/ready")
+def ready():
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/qdrant")
 def test_qdrant():
     return qdrant.get_collections()
@@ -34,13 +72,13 @@ def analyze(data: dict):
         "result": "processing"
     }
 
-@app.post("/register")
+@app.post("/register", dependencies=[Depends(require_ready)])
 async def register_face(user_id: str, file: UploadFile = File(...)):
     image_bytes = await file.read()
     embedding = get_embedding(image_bytes)
 
-    insert_face(embedding, user_id)
-    existing = search_face(embedding)
+    await ainsert_face(embedding, user_id)
+    existing = await asearch_face(embedding)
     if existing and existing[0].score > 0.9:
         return {
             "status": "duplicate",
@@ -50,10 +88,12 @@ async def register_face(user_id: str, file: UploadFile = File(...)):
     
     return {"status": "registered", "user_id": user_id}
 
-@app.post("/identify")
+@app.post("/identify", dependencies=[Depends(require_ready)])
 async def identify_face(file: UploadFile = File(...)):
+    metrics.set_pipeline("identify")
     try:
-        image_bytes = await file.read()
+        with metrics.stage("upload_read"):
+            image_bytes = await file.read()
 
         with open("debug_received_image.jpg", "wb") as f:
             f.write(image_bytes)
@@ -61,20 +101,24 @@ async def identify_face(file: UploadFile = File(...)):
 
         embedding = get_embedding(image_bytes)
 
-        results = search_face(embedding)
+        with metrics.stage("qdrant_search"):
+            results = await asearch_face(embedding)
 
         if not results:
+            metrics.count_result("reject", "no_match")
             return {"match": False}
 
         top = results[0]
 
         if top.score < MATCH_THRESHOLD:
+            metrics.count_result("reject", "below_threshold")
             return {
                 "match": False,
                 "reason": "below_threshold",
                 "score": top.score
             }
     
+        metrics.count_result("match")
         return {
             "match": True,
             "user_id": top.payload["user_id"],
@@ -83,10 +127,12 @@ async def identify_face(file: UploadFile = File(...)):
     except ValueError as e:
         # ดักจับ Error "No face detected"
         if str(e) == "No face detected":
+            metrics.count_result("reject", "no_face")
             raise HTTPException(status_code=400, detail="ไม่พบใบหน้าในรูปภาพ (No face detected)")
         else:
             raise HTTPException(status_code=500, detail=str(e))
             
     except Exception as e:
         # ดักจับ Error อื่นๆ ทั่วไป
+        metrics.count_result("error")
         raise HTTPException(status_code=500, detail="Internal Server Error")
\ No newline at end of file
@@ -1,8 +1,39 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct, Filter
+import asyncio
+import math
+import os
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import VectorParams, Distance, PointStruct, Filter, QueryRequest
 import uuid
 
-client = QdrantClient(url="http://localhost:6333")
+# QDRANT_LOCAL_PATH=":memory:" (หรือ path) -> ใช้ Qdrant local mode แทน Server (ไว้ทำ load test)
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_LOCAL_PATH = os.getenv("QDRANT_LOCAL_PATH")
+# QDRANT_PREFER_GRPC=true -> ส่ง Vector ผ่าน gRPC (binary) แทน JSON
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT_S = float(os.getenv("QDRANT_TIMEOUT_S", "2.0"))  # timeout ต่อคำสั่ง
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "32"))
+
+_server_options = dict(
+    url=QDRANT_URL,
+    grpc_port=QDRANT_GRPC_PORT,
+    prefer_grpc=QDRANT_PREFER_GRPC,
+    timeout=math.ceil(QDRANT_TIMEOUT_S),
+    limits=httpx.Limits(max_connections=QDRANT_POOL_SIZE, max_keepalive_connections=QDRANT_POOL_SIZE),
+)
+
+# aclient: ใช้ใน Endpoint แบบ async (ตัวเดียวทั้ง Process -> ใช้ connection pool ร่วมกัน)
+# local mode มีได้ Client เดียว -> aclient = None แล้วรัน client แบบ sync ใน Thread แทน
+if QDRANT_LOCAL_PATH == ":memory:":
+    client = QdrantClient(location=":memory:")
+    aclient = None
+elif QDRANT_LOCAL_PATH:
+    client = QdrantClient(path=QDRANT_LOCAL_PATH)
+    aclient = None
+else:
+    client = QdrantClient(**_server_options)
+    aclient = AsyncQdrantClient(**_server_options)
 
 COLLECTION = "faces"
 
@@ -39,4 +70,50 @@ def search_face(embedding, limit=1):
         limit=limit
     )
     return result.points
+
+
+# ---------------- async (ไม่ block event loop) ----------------
+
+async def ainsert_face(embedding, user_id: str):
+    if aclient is None:
+        return await asyncio.wait_for(asyncio.to_thread(insert_face, embedding, user_id), QDRANT_TIMEOUT_S)
+    await asyncio.wait_for(aclient.upsert(
+        collection_name=COLLECTION,
+        points=[PointStruct(id=str(uuid.uuid4()), vector=embedding, payload={"user_id": user_id})]
+    ), QDRANT_TIMEOUT_S)
+
+
+async def asearch_face(embedding, limit=1):
+    if aclient is None:
+        return await asyncio.wait_for(asyncio.to_thread(search_face, embedding, limit), QDRANT_TIMEOUT_S)
+    result = await asyncio.wait_for(aclient.query_points(
+        collection_name=COLLECTION,
+        query=embedding,
+        limit=limit
+    ), QDRANT_TIMEOUT_S)
+    return result.points
+
+
+def search_faces(embeddings, limit=1):
+    """ค้นหาหลาย embedding ในคำสั่งเดียว (query_batch_points) -> list ของ points ตามลำดับ"""
+    responses = client.query_batch_points(
+        collection_name=COLLECTION,
+        requests=[QueryRequest(query=e, limit=limit, with_payload=True) for e in embeddings]
+    )
+    return [r.points for r in responses]
+
+
+async def asearch_faces(embeddings, limit=1):
+    if aclient is None:
+        return await asyncio.wait_for(asyncio.to_thread(search_faces, embeddings, limit), QDRANT_TIMEOUT_S)
+    responses = await asyncio.wait_for(aclient.query_batch_points(
+        collection_name=COLLECTION,
+        requests=[QueryRequest(query=e, limit=limit, with_payload=True) for e in embeddings]
+    ), QDRANT_TIMEOUT_S)
+    return [r.points for r in responses]
+
+
+async def aclose():
+    if aclient is not None:
+        await aclient.close()
 # เรียกใช้ตอนเริ่มระบบ
\ No newline at end of file
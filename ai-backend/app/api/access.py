@@ -1,81 +1,138 @@
-from fastapi import APIRouter
-from app.services.camera import CameraService
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from app.services.camera_manager import CameraManager
+from app.services.fair_scheduler import FairScheduler
 from app.services.face_detect import FaceDetector
 from app.services.antispoof import AntiSpoofService
+from app.services.scan_pipeline import ScanPipeline
+from app.services.quality_gate import QUALITY_GATE_ENABLED, quality_gate_from_env
+from app.core.recognition import FaceRecognizer
+from app.core.qdrant import QdrantService
+from app.core import metrics
 from app.core.audit import log_event
 from app.core.decision import DecisionEngine
 from app.core.policy_store import get_policy
+from app.core.readiness import readiness, require_ready
 
-decision_engine = DecisionEngine()
-
-antispoof = AntiSpoofService()
-router = APIRouter()
-
-camera = CameraService(0)  # USB camera
-detector = FaceDetector()
-
-def liveness_check(frames):
-    scores = []
-    for face in frames:
-        score = antispoof.check(face)
-        scores.append(score)
+# ขนาดเฟรม (สูงxกว้าง) ที่ใช้ warm-up ให้ตรงกับกล้องที่ติดตั้ง
+WARMUP_FRAME_SIZES = [
+    tuple(int(v) for v in size.split("x"))
+    for size in os.getenv("WARMUP_FRAME_SIZES", "480x640,720x1280").split(",")
+]
+WARMUP_ITERATIONS = int(os.getenv("WARMUP_ITERATIONS", "2"))
 
-    passed = sum(s >= 0.7 for s in scores)
-    return passed >= 3, scores
-
-@router.post("/scan")
-def scan_face():
-    frames = []
+decision_engine = DecisionEngine()
 
-    for _ in range(5):
-        frame = camera.get_frame()
-        if frame is None:
-            continue
+# โหลด Anti-Spoof (TorchScript) และ buffalo_l (ONNX) พร้อมกัน
+with readiness.phase("load_models"), ThreadPoolExecutor(max_workers=2) as _loader:
+    _antispoof_future = _loader.submit(AntiSpoofService)
+    _detector_future = _loader.submit(FaceDetector)
+    antispoof = _antispoof_future.result()
+    detector = _detector_future.result()
 
-        face = detector.detect(frame)
-        if face is not None:
-            frames.append(face)
+router = APIRouter()
 
-    if len(frames) < 3:
+# เปิดกล้องทุกตัวตาม cameras.json (กล้องละ 1 locker_id)
+camera_manager = CameraManager()
+recognizer = FaceRecognizer()  # ใช้โมเดลชุดเดียวกับ detector (ผ่าน model_registry)
+qdrant = QdrantService()
+
+# Inference pool กลางของทุกกล้อง (round-robin ตาม locker_id)
+inference_scheduler = FairScheduler(max_workers=int(os.getenv("INFERENCE_WORKERS", "4")))
+
+# detect / liveness หลายเฟรมซ้อนกัน แล้วหยุดทันทีที่ผ่านครบ 3 เฟรม (หรือไม่มีทางผ่านแล้ว)
+scan_pipeline = ScanPipeline(
+    detector=detector,
+    antispoof=antispoof,
+    recognizer=recognizer,
+    qdrant=qdrant,
+    required_passes=3,
+    liveness_threshold=0.7,
+    scheduler=inference_scheduler,
+    # เฟรมเบลอ / มืด / หน้าเล็ก / หันมาก ไม่ต้องรัน Detector หรือ Liveness
+    quality_gate=quality_gate_from_env() if QUALITY_GATE_ENABLED else None
+)
+
+def warm_up():
+    """
+    รัน detect / embed / liveness ด้วยเฟรมสังเคราะห์ทุกขนาดใน WARMUP_FRAME_SIZES
+    ให้ lazy-init ของ ONNX Runtime / Torch เกิดก่อนการสแกนจริงครั้งแรก
+    """
+    rng = np.random.default_rng(0)
+    aligned = rng.integers(0, 256, size=(112, 112, 3), dtype=np.uint8)
+    for _ in range(WARMUP_ITERATIONS):
+        for height, width in WARMUP_FRAME_SIZES:
+            detector.detect(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8), with_embedding=False)
+        recognizer.rec_model.get_feat(aligned)
+        # ขนาด batch เท่าที่ ScanPipeline ส่งจริง
+        for n in range(1, scan_pipeline.required_passes + 1):
+            antispoof.check_batch([aligned] * n)
+
+@router.post("/scan", dependencies=[Depends(require_ready)])
+def scan_default():
+    """สแกนกล้องตัวแรกใน config (ใช้กับเครื่องที่มีตู้เดียว)"""
+    return scan_face(camera_manager.default_locker)
+
+@router.post("/scan/{locker_id}", dependencies=[Depends(require_ready)])
+def scan_face(locker_id: str):
+    metrics.set_pipeline("scan")
+    camera = camera_manager.get(locker_id)
+    if camera is None:
+        raise HTTPException(404, f"No camera configured for locker {locker_id}")
+
+    # หยิบ 5 เฟรมล่าสุดจาก ring buffer ของ Capture Thread (ไม่ต้องรอกล้อง)
+    with metrics.stage("frame_grab"):
+        frames = camera.get_latest(5, max_age=1.0)
+    outcome = scan_pipeline.run(frames, key=locker_id)
+
+    if outcome.reason == "no_face":
+        metrics.count_result("deny", "no_face")
         return {"status": "deny", "reason": "no_face"}
 
-    passed, scores = liveness_check(frames)
+    if outcome.reason == "low_quality":
+        metrics.count_result("deny", "low_quality")
+        return {"status": "deny", "reason": "low_quality", "quality": sorted(set(outcome.quality))}
 
-    if not passed:
-        log_event("LIVENESS_FAIL", detail={"scores": scores})
+    if not outcome.passed:
+        metrics.count_result("deny", "spoof_detected")
+        log_event("LIVENESS_FAIL", locker=locker_id, detail={"scores": outcome.scores})
         return {
             "status": "deny",
             "reason": "spoof_detected",
-            "liveness": scores
+            "liveness": outcome.scores
         }
 
-    # ✅ ผ่าน liveness → ค่อยทำ embedding
-    emb = recognizer.get_embedding(frames[-1])
-    result = qdrant.search(emb)
+    # ✅ ผ่าน liveness → pipeline embed + ค้นหาเฟรมที่ดีที่สุดให้แล้ว
+    result = outcome.search_result
 
     if not result or result[0].score < 0.35:
+        metrics.count_result("deny", "unknown")
         return {"status": "deny", "reason": "unknown"}
 
-    log_event("ACCESS_GRANTED", user=result[0].payload["user_id"])
-
     user_id = result[0].payload["user_id"]
-    locker_id = "locker_01"  # ตอนนี้ fix ไว้ก่อน
 
     policy = get_policy(locker_id)
 
     if not policy:
+        metrics.count_result("deny", "no_policy")
         return {"status": "deny", "reason": "no_policy"}
 
-    decision = decision_engine.check_access(
-        user_id=user_id,
-        locker_id=locker_id,
-        policy=policy
-    )
+    with metrics.stage("decision"):
+        decision = decision_engine.check_access(
+            user_id=user_id,
+            locker_id=locker_id,
+            policy=policy
+        )
 
     if not decision.allow:
+        metrics.count_result("deny", decision.reason)
         log_event(
             "ACCESS_DENIED",
             user=user_id,
+            locker=locker_id,
             detail={"reason": decision.reason}
         )
         return {
@@ -83,9 +140,11 @@ def scan_face():
             "reason": decision.reason
         }
 
+    metrics.count_result("allow")
     log_event(
         "ACCESS_GRANTED",
         user=user_id,
+        locker=locker_id,
         detail={"locker": locker_id}
     )
 
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.audit import audit_logger
+
+router = APIRouter()
+
+def _to_epoch(value: Optional[str]):
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(400, f"Invalid datetime: {value}")
+
+@router.get("/audit")
+def query_audit(
+    user: Optional[str] = None,
+    locker: Optional[str] = None,
+    event: Optional[str] = None,
+    since: Optional[str] = None,   # ISO datetime
+    until: Optional[str] = None,   # ISO datetime
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """ค้นหา audit log (ใหม่ -> เก่า) ใช้ next_cursor เพื่อดึงหน้าถัดไป"""
+    try:
+        return audit_logger.query(
+            user=user,
+            locker=locker,
+            event=event,
+            since=_to_epoch(since),
+            until=_to_epoch(until),
+            limit=limit,
+            cursor=cursor
+        )
+    except (ValueError, IndexError):
+        raise HTTPException(400, "Invalid cursor")
+
+@router.get("/audit/stats")
+def audit_stats():
+    """สถานะคิว / จำนวนที่เขียนแล้ว / จำนวนที่ถูกทิ้งเพราะคิวเต็ม"""
+    return audit_logger.stats()
@@ -22,11 +22,12 @@ async def enroll(user_id: str, file: UploadFile = File(...)):
     if face is None:
         return {"status": "fail", "reason": "no_face"}
 
+    # detect() คำนวณ embedding มาให้แล้วจาก aligned crop เดียวกัน
     emb = recognizer.get_embedding(face)
     if emb is None:
         return {"status": "fail", "reason": "embedding_fail"}
 
-    qdrant.add_face(
+    await qdrant.aadd_face(
         embedding=emb,
         payload={"user_id": user_id}
     )
@@ -1,9 +1,229 @@
-from datetime import datetime
-
-def log_event(event, user=None, detail=None):
-    print({
-        "time": datetime.utcnow().isoformat(),
-        "event": event,
-        "user": user,
-        "detail": detail
-    })
+import glob
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+AUDIT_DIR = os.getenv("AUDIT_DIR", "audit_logs")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.5"))
+AUDIT_SEGMENT_ROWS = int(os.getenv("AUDIT_SEGMENT_ROWS", "1000000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    time TEXT NOT NULL,
+    event TEXT NOT NULL,
+    user TEXT,
+    locker TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_user_ts ON events(user, ts);
+CREATE INDEX IF NOT EXISTS idx_events_locker_ts ON events(locker, ts);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+"""
+
+class AuditLogger:
+    """
+    Audit log แบบ buffered: log() แค่ใส่คิวในหน่วยความจำ (ไม่แตะ disk บน request path)
+    Thread เบื้องหลังเขียนลง SQLite เป็น batch (append-only) และหมุนไฟล์ใหม่เมื่อครบ segment_rows
+    ถ้าคิวเต็ม event จะถูกทิ้งและนับไว้ใน stats (ไม่บล็อก request)
+    """
+
+    def __init__(self, directory: str = AUDIT_DIR, max_queue: int = AUDIT_QUEUE_SIZE,
+                 batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 segment_rows: int = AUDIT_SEGMENT_ROWS):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._max_queue = max_queue
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0,
+                       "max_queue_depth": 0, "last_flush_ms": 0.0, "write_errors": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- request path ----------
+
+    def log(self, event, user=None, locker=None, detail=None):
+        now = time.time()
+        record = (
+            now,
+            datetime.fromtimestamp(now, tz=timezone.utc).isoformat(),
+            event,
+            None if user is None else str(user),
+            None if locker is None else str(locker),
+            None if detail is None else json.dumps(detail, default=str),
+        )
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["dropped"] += 1
+            return
+
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+            depth = self._queue.qsize()
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+
+    # ---------- writer thread ----------
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, "audit-*.sqlite")))
+
+    def _open_segment(self, path):
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        rows = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        return conn, rows
+
+    def _new_segment_path(self):
+        segments = self._segments()
+        seq = int(os.path.basename(segments[-1])[6:-7]) + 1 if segments else 1
+        return os.path.join(self.directory, f"audit-{seq:06d}.sqlite")
+
+    def _run(self):
+        segments = self._segments()
+        conn, rows = self._open_segment(segments[-1] if segments else self._new_segment_path())
+
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+                while len(batch) < self.batch_size and not stopping:
+                    item = self._queue.get_nowait()
+                    if item is None:
+                        stopping = True
+                    else:
+                        batch.append(item)
+            except queue.Empty:
+                pass
+
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO events (ts, time, event, user, locker, detail) VALUES (?, ?, ?, ?, ?, ?)",
+                        batch,
+                    )
+                rows += len(batch)
+                with self._stats_lock:
+                    self._stats["written"] += len(batch)
+                    self._stats["batches"] += 1
+                    self._stats["last_flush_ms"] = (time.perf_counter() - started) * 1000.0
+            except sqlite3.Error as e:
+                logger.error(f"Audit write failed: {e}")
+                with self._stats_lock:
+                    self._stats["write_errors"] += 1
+                    self._stats["dropped"] += len(batch)
+
+            if rows >= self.segment_rows:
+                # หมุนไฟล์: segment เก่าไม่ถูกแก้ไขอีก (append-only)
+                conn.close()
+                conn, rows = self._open_segment(self._new_segment_path())
+
+        conn.close()
+
+    def close(self, timeout: float = 5.0):
+        """flush ที่ค้างในคิวให้หมดแล้วหยุด Thread (เรียกตอนปิด Server)"""
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+    # ---------- query ----------
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._max_queue
+        stats["segments"] = len(self._segments())
+        return stats
+
+    def query(self, user=None, locker=None, event=None, since=None, until=None,
+              limit: int = 100, cursor: str = None) -> dict:
+        """
+        ค้นหา event ใหม่ -> เก่า แบบแบ่งหน้า
+        cursor = "<segment>:<id>" จาก next_cursor ของหน้าก่อน
+        since / until เป็น epoch seconds
+        """
+        where, params = [], []
+        for column, value in (("user", user), ("locker", locker), ("event", event)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(str(value))
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts <= ?")
+            params.append(until)
+
+        segments = self._segments()
+        start_segment, start_id = len(segments) - 1, None
+        if cursor:
+            seg, _, row_id = cursor.partition(":")
+            start_segment, start_id = int(seg), int(row_id)
+
+        items, last, has_more = [], None, False
+        for seg_index in range(start_segment, -1, -1):
+            # หน้าเต็มแล้วก็ยังถาม segment ถัดไป (LIMIT 1) -> next_cursor มีค่าเมื่อมีแถวเหลือจริงเท่านั้น
+            remaining = limit - len(items)
+
+            clauses, args = list(where), list(params)
+            if start_id is not None and seg_index == start_segment:
+                clauses.append("id < ?")
+                args.append(start_id)
+            sql = "SELECT id, time, event, user, locker, detail FROM events"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            sql += " ORDER BY id DESC LIMIT ?"
+            args.append(remaining + 1)
+
+            conn = sqlite3.connect(f"file:{segments[seg_index]}?mode=ro", uri=True)
+            try:
+                rows = conn.execute(sql, args).fetchall()
+            finally:
+                conn.close()
+
+            for row_id, ts, ev, u, lk, detail in rows[:remaining]:
+                items.append({
+                    "time": ts, "event": ev, "user": u, "locker": lk,
+                    "detail": json.loads(detail) if detail else None,
+                })
+                last = f"{seg_index}:{row_id}"
+            if len(rows) > remaining:
+                has_more = True
+                break
+
+        next_cursor = last if has_more else None
+        return {"items": items, "next_cursor": next_cursor}
+
+audit_logger = AuditLogger()
+
+def log_event(event, user=None, detail=None, locker=None):
+    audit_logger.log(event, user=user, locker=locker, detail=detail)
@@ -1,5 +1,6 @@
 from datetime import datetime
 from app.models.schemas import DecisionResult
+from app.core.policy_store import CompiledPolicy
 
 class DecisionEngine:
 
@@ -7,16 +8,20 @@ class DecisionEngine:
         self,
         user_id: str,
         locker_id: str,
-        policy: dict
+        policy
     ) -> DecisionResult:
+        # policy จาก policy_store ถูก compile มาแล้ว (dict แบบเก่าก็ยังรับได้)
+        if isinstance(policy, dict):
+            policy = CompiledPolicy.from_dict(locker_id, policy)
 
-        if not policy.get("enabled", True):
+        if not policy.enabled:
             return DecisionResult(
                 allow=False,
                 reason="locker_disabled"
             )
 
-        if user_id not in policy.get("allowed_users", []):
+        # frozenset -> O(1) ไม่ว่าจะมี user กี่คน
+        if user_id not in policy.allowed_users:
             return DecisionResult(
                 allow=False,
                 reason="user_not_allowed"
@@ -24,15 +29,11 @@ class DecisionEngine:
 
         now = datetime.now().time()
 
-        start = policy.get("start_time")
-        end = policy.get("end_time")
-
-        if start and end:
-            if not (start <= now <= end):
-                return DecisionResult(
-                    allow=False,
-                    reason="outside_allowed_time"
-                )
+        if not policy.allows_time(now):
+            return DecisionResult(
+                allow=False,
+                reason="outside_allowed_time"
+            )
 
         return DecisionResult(
             allow=True,
@@ -0,0 +1,32 @@
+import threading
+import time
+
+import insightface
+
+from app.core import metrics
+
+# โหลด buffalo_l แค่ชุดเดียวต่อ Process แล้วให้ทุก Service (detect / recognition / enroll) ใช้ร่วมกัน
+_lock = threading.Lock()
+_face_app = None
+
+def get_face_app():
+    global _face_app
+    if _face_app is None:
+        with _lock:
+            if _face_app is None:
+                started = time.perf_counter()
+                app = insightface.app.FaceAnalysis(
+                    name="buffalo_l",
+                    allowed_modules=["detection", "recognition"],
+                    providers=["CPUExecutionProvider"]
+                )
+                app.prepare(ctx_id=-1)
+                metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model="insightface")
+                _face_app = app
+    return _face_app
+
+def get_detector():
+    return get_face_app().det_model
+
+def get_recognizer():
+    return get_face_app().models["recognition"]
@@ -1,5 +1,16 @@
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
 from datetime import time
+from typing import Dict, FrozenSet, Optional, Tuple
 
+logger = logging.getLogger(__name__)
+
+# Policy ตั้งต้น (ใช้เมื่อไม่ได้กำหนด POLICY_SOURCE)
 POLICIES = {
     "locker_01": {
         "enabled": True,
@@ -9,5 +20,185 @@ POLICIES = {
     }
 }
 
+# ไฟล์ JSON หรือ SQLite (.db / .sqlite) ที่เก็บ policy -> แก้ไฟล์แล้วระบบโหลดใหม่เอง
+POLICY_SOURCE = os.getenv("POLICY_SOURCE")
+POLICY_RELOAD_INTERVAL = float(os.getenv("POLICY_RELOAD_INTERVAL", "2.0"))
+
+def _to_seconds(value) -> int:
+    """time / "HH:MM" / "HH:MM:SS" -> วินาทีนับจากเที่ยงคืน"""
+    if isinstance(value, str):
+        value = time.fromisoformat(value)
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+def _compile_windows(policy: dict) -> Optional[Tuple[Tuple[int, int], ...]]:
+    """
+    แปลงช่วงเวลาเป็นตาราง (start_sec, end_sec) ที่เรียงแล้ว
+    รองรับทั้ง start_time/end_time เดี่ยว และ "windows": [["08:00", "12:00"], ...]
+    ช่วงข้ามเที่ยงคืน (22:00 - 06:00) ถูกแยกเป็น 2 ช่วง
+    """
+    raw = policy.get("windows")
+    if raw is None:
+        start, end = policy.get("start_time"), policy.get("end_time")
+        if not (start and end):
+            return None
+        raw = [(start, end)]
+
+    windows = []
+    for start, end in raw:
+        s, e = _to_seconds(start), _to_seconds(end)
+        if s <= e:
+            windows.append((s, e))
+        else:
+            windows.append((s, 86399))
+            windows.append((0, e))
+
+    # รวมช่วงที่ซ้อนกัน เพื่อให้ค้นหาด้วย bisect ได้ถูกต้อง
+    merged = []
+    for s, e in sorted(windows):
+        if merged and s <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return tuple(merged)
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    locker_id: str
+    enabled: bool
+    allowed_users: FrozenSet[str]
+    windows: Optional[Tuple[Tuple[int, int], ...]]  # None = เข้าได้ทั้งวัน
+    _window_starts: Tuple[int, ...] = ()
+
+    @classmethod
+    def from_dict(cls, locker_id: str, policy: dict) -> "CompiledPolicy":
+        windows = _compile_windows(policy)
+        return cls(
+            locker_id=locker_id,
+            enabled=policy.get("enabled", True),
+            allowed_users=frozenset(policy.get("allowed_users", [])),
+            windows=windows,
+            _window_starts=tuple(w[0] for w in windows) if windows else (),
+        )
+
+    def allows_time(self, now: time) -> bool:
+        if self.windows is None:
+            return True
+        sec = now.hour * 3600 + now.minute * 60 + now.second
+        # หาช่วงสุดท้ายที่เริ่มก่อน/เท่ากับ now แล้วเช็คว่ายังไม่จบ
+        i = bisect.bisect_right(self._window_starts, sec) - 1
+        return i >= 0 and sec <= self.windows[i][1]
+
+class PolicyIndex:
+    """Policy ที่ compile แล้ว: set ของ user ต่อตู้ + reverse index user -> ตู้ (immutable หลังสร้าง)"""
+
+    def __init__(self, policies: Dict[str, CompiledPolicy]):
+        self.policies = policies
+        user_lockers: Dict[str, set] = {}
+        for locker_id, policy in policies.items():
+            for user_id in policy.allowed_users:
+                user_lockers.setdefault(user_id, set()).add(locker_id)
+        self.user_lockers: Dict[str, FrozenSet[str]] = {u: frozenset(l) for u, l in user_lockers.items()}
+
+    @classmethod
+    def compile(cls, raw: Dict[str, dict]) -> "PolicyIndex":
+        return cls({locker_id: CompiledPolicy.from_dict(locker_id, p) for locker_id, p in raw.items()})
+
+    def get(self, locker_id: str) -> Optional[CompiledPolicy]:
+        return self.policies.get(locker_id)
+
+    def lockers_for(self, user_id: str) -> FrozenSet[str]:
+        return self.user_lockers.get(user_id, frozenset())
+
+def load_json(path: str) -> Dict[str, dict]:
+    """{"locker_01": {"enabled": true, "allowed_users": [...], "start_time": "08:00", "end_time": "18:00"}}"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_sqlite(path: str) -> Dict[str, dict]:
+    """
+    ตาราง lockers(locker_id, enabled, start_time, end_time)
+    และ locker_users(locker_id, user_id)
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        raw = {}
+        for locker_id, enabled, start, end in conn.execute(
+            "SELECT locker_id, enabled, start_time, end_time FROM lockers"
+        ):
+            raw[locker_id] = {"enabled": bool(enabled), "allowed_users": [], "start_time": start, "end_time": end}
+        for locker_id, user_id in conn.execute("SELECT locker_id, user_id FROM locker_users"):
+            if locker_id in raw:
+                raw[locker_id]["allowed_users"].append(user_id)
+        return raw
+    finally:
+        conn.close()
+
+def load_source(path: str) -> Dict[str, dict]:
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return load_sqlite(path)
+    return load_json(path)
+
+class PolicyStore:
+    """
+    ถือ PolicyIndex ปัจจุบัน แล้วคอยดู mtime ของไฟล์ต้นทาง
+    เมื่อไฟล์เปลี่ยนจะ compile ใหม่ทั้งก้อนแล้วสลับ reference ทีเดียว (atomic)
+    -> Request ที่กำลังตัดสินอยู่เห็น index ชุดเดิมครบชุดเสมอ
+    """
+
+    def __init__(self, source: Optional[str] = None, reload_interval: float = POLICY_RELOAD_INTERVAL):
+        self.source = source
+        self.reload_interval = reload_interval
+        self._mtime = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        if source is None:
+            self.index = PolicyIndex.compile(POLICIES)
+        else:
+            self.reload()
+            self._thread = threading.Thread(target=self._watch, name="policy-reload", daemon=True)
+            self._thread.start()
+
+    def _source_mtime(self):
+        mtimes = []
+        for path in (self.source, self.source + "-wal"):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                pass
+        return tuple(mtimes)
+
+    def reload(self) -> bool:
+        mtime = self._source_mtime()
+        try:
+            index = PolicyIndex.compile(load_source(self.source))
+        except Exception as e:
+            # ไฟล์เสีย/เขียนไม่เสร็จ -> ใช้ชุดเดิมต่อไป
+            logger.error(f"Failed to load policies from {self.source}: {e}")
+            if not hasattr(self, "index"):
+                raise
+            return False
+
+        self.index = index
+        self._mtime = mtime
+        logger.info(f"Loaded {len(index.policies)} locker policies from {self.source}")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            if self._source_mtime() != self._mtime:
+                self.reload()
+
+    def get_policy(self, locker_id: str) -> Optional[CompiledPolicy]:
+        return self.index.get(locker_id)
+
+    def lockers_for(self, user_id: str) -> FrozenSet[str]:
+        return self.index.lockers_for(user_id)
+
+    def stop(self):
+        self._stop.set()
+
+policy_store = PolicyStore(POLICY_SOURCE)
+
 def get_policy(locker_id: str):
-    return POLICIES.get(locker_id)
+    return policy_store.get_policy(locker_id)
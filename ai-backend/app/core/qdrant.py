@@ -1,13 +1,63 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+import asyncio
+import math
+import os
+import threading
+
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import Distance, VectorParams, PointStruct, QueryRequest
 import uuid
 
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+# QDRANT_PREFER_GRPC=true -> ส่ง Vector ผ่าน gRPC (binary) แทน JSON
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT_S = float(os.getenv("QDRANT_TIMEOUT_S", "2.0"))  # timeout ต่อคำสั่ง
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "32"))
+
+# Client ชุดเดียวต่อ Process แล้วให้ทุก Router (access / enroll) ใช้ connection pool ร่วมกัน
+_lock = threading.Lock()
+_client = None
+_aclient = None
+
+def _server_options() -> dict:
+    return dict(
+        host=QDRANT_HOST,
+        port=QDRANT_PORT,
+        grpc_port=QDRANT_GRPC_PORT,
+        prefer_grpc=QDRANT_PREFER_GRPC,
+        timeout=math.ceil(QDRANT_TIMEOUT_S),
+        limits=httpx.Limits(max_connections=QDRANT_POOL_SIZE, max_keepalive_connections=QDRANT_POOL_SIZE),
+    )
+
+def get_client() -> QdrantClient:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = QdrantClient(**_server_options())
+    return _client
+
+def get_async_client() -> AsyncQdrantClient:
+    """ใช้กับ Endpoint แบบ async (ไม่ block event loop ระหว่างรอ Qdrant)"""
+    global _aclient
+    if _aclient is None:
+        with _lock:
+            if _aclient is None:
+                _aclient = AsyncQdrantClient(**_server_options())
+    return _aclient
+
+async def close_clients():
+    if _aclient is not None:
+        await _aclient.close()
+    if _client is not None:
+        _client.close()
+
 class QdrantService:
     def __init__(self):
-        self.client = QdrantClient(
-            host="localhost",
-            port=6333
-        )
+        self.client = get_client()
+        self.aclient = get_async_client()
         self.collection = "faces"
         self._init_collection()
 
@@ -22,21 +72,62 @@ class QdrantService:
                 )
             )
 
-    def add_face(self, embedding, payload: dict):
-        point = PointStruct(
+    def _point(self, embedding, payload: dict) -> PointStruct:
+        return PointStruct(
             id=str(uuid.uuid4()),
             vector=embedding.tolist(),
             payload=payload
         )
+
+    def add_face(self, embedding, payload: dict):
         self.client.upsert(
             collection_name=self.collection,
-            points=[point]
+            points=[self._point(embedding, payload)]
         )
 
     def search(self, embedding, limit=1):
-        result = self.client.search(
+        result = self.client.query_points(
             collection_name=self.collection,
-            query_vector=embedding.tolist(),
-            limit=limit
+            query=embedding.tolist(),
+            limit=limit,
+            with_payload=True
+        )
+        return result.points
+
+    def search_batch(self, embeddings, limit=1):
+        """ค้นหาหลาย embedding ในคำสั่งเดียว (query_batch_points) -> list ของผลลัพธ์ตามลำดับ"""
+        responses = self.client.query_batch_points(
+            collection_name=self.collection,
+            requests=[QueryRequest(query=e.tolist(), limit=limit, with_payload=True) for e in embeddings]
+        )
+        return [r.points for r in responses]
+
+    # ---------------- async (timeout ต่อคำสั่ง: Qdrant ช้าแล้ว Request ไม่ค้างตาม) ----------------
+
+    async def aadd_face(self, embedding, payload: dict):
+        await asyncio.wait_for(
+            self.aclient.upsert(collection_name=self.collection, points=[self._point(embedding, payload)]),
+            QDRANT_TIMEOUT_S
+        )
+
+    async def asearch(self, embedding, limit=1):
+        result = await asyncio.wait_for(
+            self.aclient.query_points(
+                collection_name=self.collection,
+                query=embedding.tolist(),
+                limit=limit,
+                with_payload=True
+            ),
+            QDRANT_TIMEOUT_S
+        )
+        return result.points
+
+    async def asearch_batch(self, embeddings, limit=1):
+        responses = await asyncio.wait_for(
+            self.aclient.query_batch_points(
+                collection_name=self.collection,
+                requests=[QueryRequest(query=e.tolist(), limit=limit, with_payload=True) for e in embeddings]
+            ),
+            QDRANT_TIMEOUT_S
         )
-        return result
+        return [r.points for r in responses]
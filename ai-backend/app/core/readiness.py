@@ -0,0 +1,12 @@
+"""
+สถานะความพร้อมของ Service นี้ (/ready) -> ตัว implementation อยู่ที่ common/readiness.py
+
+/      = Process ยังไม่ตาย (liveness)
+/ready = โหลดโมเดล + warm-up เสร็จแล้ว พร้อมรับ Request ที่ latency ปกติ (readiness)
+"""
+from common.readiness import Readiness
+
+from app.core import metrics
+
+readiness = Readiness(metrics.STARTUP_SECONDS)
+require_ready = readiness.require_ready
@@ -1,17 +1,19 @@
-import insightface
 import numpy as np
 
+from app.core.model_registry import get_recognizer
+
 class FaceRecognizer:
     def __init__(self):
-        self.app = insightface.app.FaceAnalysis(
-            name="buffalo_l",
-            providers=["CPUExecutionProvider"]
-        )
-        self.app.prepare(ctx_id=-1)
+        self.rec_model = get_recognizer()
+
+    def get_embedding(self, face):
+        """
+        face: FaceDetection จาก FaceDetector.detect
+        ใช้หน้าที่ align ไว้แล้ว -> ไม่ต้องรัน detection ซ้ำบน crop
+        """
+        if face.embedding is not None:
+            return face.embedding
 
-    def get_embedding(self, face_crop):
-        faces = self.app.get(face_crop)
-        if not faces:
-            return None
-        emb = faces[0].embedding
-        return emb / np.linalg.norm(emb)
+        emb = self.rec_model.get_feat(face.aligned).flatten()
+        face.embedding = emb / np.linalg.norm(emb)
+        return face.embedding
@@ -1,13 +1,60 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
-from app.api.access import router as access_router
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.access import router as access_router, camera_manager, inference_scheduler, warm_up
+from app.api.enroll import router as enroll_router
+from app.api.audit import router as audit_router
+from app.core.audit import audit_logger
+from app.core.qdrant import close_clients
+from app.core import metrics
+from app.core.readiness import readiness
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Commercial Face Access Control",
     version="1.0.0"
 )
 
+# เวลาแต่ละ stage ของ /scan ส่งกลับใน header Server-Timing
+app.add_middleware(metrics.ServerTimingMiddleware)
+
 app.include_router(access_router, prefix="/api")
+app.include_router(enroll_router, prefix="/api")
+app.include_router(audit_router, prefix="/api")
+
+def _warm_up():
+    try:
+        with readiness.phase("warmup"):
+            warm_up()
+        readiness.mark_ready()
+        logger.info(f"Service ready. Cold start: {readiness.phases}")
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        readiness.fail(e)
+
+@app.on_event("startup")
+async def startup_event():
+    # warm-up เบื้องหลัง: Health Check ตอบได้ทันที แต่ /ready และ /scan รอจนเสร็จ
+    app.state.warmup_task = asyncio.create_task(asyncio.to_thread(_warm_up))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    camera_manager.release_all()
+    inference_scheduler.shutdown()
+    audit_logger.close()
+    await close_clients()
 
 @app.get("/")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/ready")
+def ready_check():
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,13 @@
+import threading
+
 import torch
 import cv2
 import numpy as np
 
+INPUT_SIZE = 80
+
 class AntiSpoofService:
-    def __init__(self):
+    def __init__(self, max_batch: int = 8):
         self.device = "cpu"
         self.model = torch.jit.load(
             "models/antispoof/antispoof_cpu.pt",
@@ -11,17 +15,34 @@ class AntiSpoofService:
         )
         self.model.eval()
 
-    def _preprocess(self, face_crop):
-        face = cv2.resize(face_crop, (80, 80))
+        # Tensor NCHW ที่จองไว้ล่วงหน้า (ขยายเองถ้า batch ใหญ่กว่า)
+        self._batch = np.empty((max_batch, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def _preprocess_into(self, face_crop, out):
+        """resize -> BGR2RGB -> /255 -> CHW เขียนลง out (3x80x80) โดยตรง"""
+        face = cv2.resize(face_crop, (INPUT_SIZE, INPUT_SIZE))
         face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
-        face = face.astype(np.float32) / 255.0
-        face = np.transpose(face, (2, 0, 1))  # CHW
-        return face
+        np.multiply(face.transpose(2, 0, 1), 1.0 / 255.0, out=out, casting="unsafe")
 
-    def check(self, face_crop) -> float:
-        x = self._preprocess(face_crop)
-        with torch.no_grad():
-            tensor = torch.from_numpy(x).unsqueeze(0)
-            out = self.model(tensor)
-            prob_real = torch.softmax(out, dim=1)[0][1].item()
+    def check_batch(self, face_crops) -> list:
+        """คะแนนคนจริงของทุก crop ด้วย forward pass ครั้งเดียว"""
+        n = len(face_crops)
+        if n == 0:
+            return []
+
+        with self._lock:
+            if n > self._batch.shape[0]:
+                self._batch = np.empty((n, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+
+            for i, crop in enumerate(face_crops):
+                self._preprocess_into(crop, self._batch[i])
+
+            with torch.no_grad():
+                tensor = torch.from_numpy(self._batch[:n])
+                out = self.model(tensor)
+                prob_real = torch.softmax(out, dim=1)[:, 1].tolist()
         return prob_real
+
+    def check(self, face_crop) -> float:
+        return self.check_batch([face_crop])[0]
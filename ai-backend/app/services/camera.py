@@ -1,15 +1,95 @@
+import os
+import threading
+import time
+from collections import deque
+
 import cv2
 
 class CameraService:
-    def __init__(self, source: str):
+    """
+    Capture Thread ต่อกล้อง 1 ตัว: อ่านเฟรมตลอดเวลาแล้วเก็บเฉพาะเฟรมล่าสุดไว้ใน ring buffer
+    -> /scan หยิบเฟรมล่าสุดได้ทันที ไม่ต้องรอ cap.read() และไม่ได้เฟรมเก่าที่ค้างใน buffer ของ RTSP
+    """
+
+    def __init__(self, source, buffer_size: int = 8, capture=None, reconnect_after: int = 30, open_capture=None):
         self.source = source
-        self.cap = cv2.VideoCapture(source)
+        # capture: object ที่มี read()/release() แบบเดียวกับ cv2.VideoCapture (ใช้ inject source จำลองได้)
+        # open_capture: ฟังก์ชันเปิด source ใหม่ตอน reconnect (default = cv2.VideoCapture)
+        self._open = open_capture if open_capture is not None else cv2.VideoCapture
+        self.cap = capture if capture is not None else self._open(source)
+        self.reconnect_after = reconnect_after
+
+        # ไฟล์วิดีโอ: เล่นวนและหน่วงตาม FPS ของไฟล์ให้เหมือนกล้องจริง
+        self._is_file = capture is None and isinstance(source, str) and os.path.isfile(source)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self._is_file else 0
+        self._frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        self._frames = deque(maxlen=buffer_size)  # (timestamp, frame) เก่าสุดถูกทิ้งอัตโนมัติ
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._grab_loop, name=f"camera-{source}", daemon=True)
+        self._thread.start()
+
+    def _grab_loop(self):
+        failures = 0
+        next_due = time.monotonic()
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                if self._is_file:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                failures += 1
+                if failures >= self.reconnect_after:
+                    # RTSP หลุด -> เปิดใหม่
+                    self.cap.release()
+                    self.cap = self._open(self.source)
+                    failures = 0
+                time.sleep(0.01)
+                continue
+
+            failures = 0
+            with self._cond:
+                self._frames.append((time.monotonic(), frame))
+                self._cond.notify_all()
+
+            if self._frame_interval:
+                next_due += self._frame_interval
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.monotonic()
+
+    def get_latest(self, n: int, timeout: float = 0.5, max_age: float = None):
+        """
+        คืนเฟรมล่าสุด n เฟรม (เรียงเก่า -> ใหม่)
+        ถ้ามีไม่ครบ n จะรอได้ไม่เกิน timeout วินาที แล้วคืนเท่าที่มี
+        max_age: ตัดเฟรมที่เก่ากว่ากี่วินาทีทิ้ง (None = ไม่ตัด)
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._frames) < n and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            items = list(self._frames)[-n:]
+
+        if max_age is not None:
+            oldest = time.monotonic() - max_age
+            items = [item for item in items if item[0] >= oldest]
+        return [frame for _, frame in items]
 
     def get_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
+        frames = self.get_latest(1)
+        if not frames:
             return None
-        return frame
+        return frames[0]
 
     def release(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
         self.cap.release()
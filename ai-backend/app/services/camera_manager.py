@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+
+from app.services.camera import CameraService
+
+logger = logging.getLogger(__name__)
+
+# ไฟล์ตั้งค่ากล้อง: [{"locker_id": "locker_01", "source": 0}, {"locker_id": "locker_02", "source": "rtsp://..."}]
+CAMERA_CONFIG_PATH = os.getenv("CAMERA_CONFIG", "cameras.json")
+DEFAULT_CAMERAS = [{"locker_id": "locker_01", "source": 0}]  # USB camera
+
+def load_camera_config(path: str = CAMERA_CONFIG_PATH):
+    if not os.path.exists(path):
+        logger.warning(f"Camera config {path} not found, using default USB camera.")
+        return DEFAULT_CAMERAS
+
+    with open(path, encoding="utf-8") as f:
+        cameras = json.load(f)
+
+    # รองรับแบบ dict สั้นๆ {"locker_01": 0, ...} ด้วย
+    if isinstance(cameras, dict):
+        cameras = [{"locker_id": k, "source": v} for k, v in cameras.items()]
+    return cameras
+
+class CameraManager:
+    """เปิดกล้องหลายตัวตาม config (กล้องละ 1 Capture Thread) แล้วผูกกับ locker_id"""
+
+    def __init__(self, cameras=None, buffer_size: int = 8):
+        self.cameras = {}
+        for cam in (cameras if cameras is not None else load_camera_config()):
+            locker_id = cam["locker_id"]
+            self.cameras[locker_id] = CameraService(
+                cam["source"],
+                buffer_size=cam.get("buffer_size", buffer_size),
+                capture=cam.get("capture"),
+            )
+            logger.info(f"Camera for {locker_id} opened: {cam['source']}")
+
+    @property
+    def default_locker(self):
+        return next(iter(self.cameras), None)
+
+    def get(self, locker_id: str):
+        return self.cameras.get(locker_id)
+
+    def release_all(self):
+        for camera in self.cameras.values():
+            camera.release()
+        self.cameras = {}
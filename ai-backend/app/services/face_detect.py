@@ -1,20 +1,52 @@
-import insightface
-import cv2
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from insightface.utils import face_align
+
+from app.core.model_registry import get_detector
+from app.core.recognition import FaceRecognizer
+
+@dataclass
+class FaceDetection:
+    """ผลการตรวจจับ 1 หน้า: ใช้ต่อได้ทั้ง liveness (crop) และ recognition (aligned / embedding)"""
+    bbox: np.ndarray
+    kps: np.ndarray
+    det_score: float
+    crop: np.ndarray                  # ภาพหน้าตาม bbox (ใช้กับ anti-spoof)
+    aligned: np.ndarray               # หน้าที่ align แล้ว 112x112 (input ของ ArcFace)
+    embedding: Optional[np.ndarray] = None  # normalize แล้ว (None = ยังไม่ได้คำนวณ)
 
 class FaceDetector:
     def __init__(self):
-        self.app = insightface.app.FaceAnalysis(
-            name="buffalo_l",
-            providers=["CPUExecutionProvider"]
-        )
-        self.app.prepare(ctx_id=-1)
+        self.det_model = get_detector()
+        self.recognizer = FaceRecognizer()
 
-    def detect(self, frame):
-        faces = self.app.get(frame)
-        if not faces:
+    def detect(self, frame, with_embedding: bool = True) -> Optional[FaceDetection]:
+        # Detector เลือกหน้าที่ใหญ่ที่สุดให้เลย (ตรวจจับครั้งเดียวต่อเฟรม)
+        bboxes, kpss = self.det_model.detect(frame, max_num=1, metric="max")
+        if bboxes.shape[0] == 0:
             return None
 
-        face = faces[0]
-        x1, y1, x2, y2 = map(int, face.bbox)
+        bbox = bboxes[0, 0:4]
+        kps = kpss[0]
+
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = map(int, bbox)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
         face_crop = frame[y1:y2, x1:x2]
-        return face_crop
+        if face_crop.size == 0:
+            return None
+
+        face = FaceDetection(
+            bbox=bbox,
+            kps=kps,
+            det_score=float(bboxes[0, 4]),
+            crop=face_crop,
+            aligned=face_align.norm_crop(frame, landmark=kps, image_size=112),
+        )
+
+        if with_embedding:
+            self.recognizer.get_embedding(face)
+        return face
@@ -0,0 +1,77 @@
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+class FairScheduler:
+    """
+    Inference pool กลางที่ทุกกล้องใช้ร่วมกัน
+    งานถูกแยกคิวตาม key (เช่น locker_id) แล้ว Worker หยิบแบบ round-robin ทีละคิว
+    -> กล้องที่ส่งงานถี่ๆ ไม่สามารถแย่ง Worker จนกล้องอื่นรอนาน
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, max_workers)
+        self._queues = {}           # key -> deque[(future, fn, args, kwargs)]
+        self._ready = deque()       # ลำดับ key ที่มีงานรอ (round-robin)
+        self._cond = threading.Condition()
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, key, fn, *args, **kwargs) -> Future:
+        future = Future()
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Scheduler is shut down")
+            q = self._queues.setdefault(key, deque())
+            if not q:
+                self._ready.append(key)
+            # รันงานใน context ของผู้ส่ง (metrics ของ Request จะได้เวลาจาก Worker ด้วย)
+            ctx = contextvars.copy_context()
+            q.append((future, ctx.run, (fn,) + args, kwargs))
+            self._cond.notify()
+        return future
+
+    def _next_task(self):
+        with self._cond:
+            while not self._ready and self._running:
+                self._cond.wait()
+            if not self._ready:
+                return None
+
+            key = self._ready.popleft()
+            q = self._queues[key]
+            task = q.popleft()
+            if q:
+                # ยังมีงานค้าง -> ต่อท้ายคิว round-robin ให้ key อื่นได้ก่อน
+                self._ready.append(key)
+            return task
+
+    def _worker(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            future, fn, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def queue_depths(self) -> dict:
+        with self._cond:
+            return {key: len(q) for key, q in self._queues.items()}
+
+    def shutdown(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=5)
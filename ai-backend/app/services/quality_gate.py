@@ -0,0 +1,12 @@
+"""
+Quality Gate ของ Access-control Backend -> ตัว implementation อยู่ที่ common/quality_gate.py
+ที่นี่แค่อ่าน threshold จาก Environment (QUALITY_MIN_FACE_PX, QUALITY_MAX_YAW, ...) ไม่ตั้ง = ค่า default
+"""
+import os
+
+from common.quality_gate import QualityGate, QualityReport, estimate_pose  # noqa: F401
+
+QUALITY_GATE_ENABLED = os.getenv("QUALITY_GATE_ENABLED", "true").lower() == "true"
+
+def quality_gate_from_env() -> QualityGate:
+    return QualityGate.from_config(os.getenv)
@@ -0,0 +1,143 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from app.core import metrics
+from app.services.face_detect import FaceDetection
+from app.services.fair_scheduler import FairScheduler
+from app.services.quality_gate import QualityGate, QualityReport
+
+@dataclass
+class ScanOutcome:
+    passed: bool
+    reason: Optional[str] = None           # "no_face" / "low_quality" / "spoof_detected" (ถ้าไม่ผ่าน)
+    scores: List[float] = field(default_factory=list)
+    best: Optional[FaceDetection] = None   # เฟรมคุณภาพดีที่สุดที่ผ่าน liveness
+    search_result: Any = None              # ผลค้นหาใน Qdrant ของเฟรม best
+    frames_used: int = 0                   # จำนวนเฟรมที่ detect เสร็จก่อนตัดสินผล
+    quality: List[str] = field(default_factory=list)  # เหตุผลของเฟรมที่ไม่ผ่าน Quality Gate
+
+def frame_quality(face: FaceDetection) -> float:
+    """คะแนนคุณภาพแบบถูกๆ: ความมั่นใจของ detector x ขนาดหน้า"""
+    x1, y1, x2, y2 = face.bbox
+    return face.det_score * max(0.0, (x2 - x1) * (y2 - y1))
+
+class ScanPipeline:
+    """
+    สแกนแบบ streaming: detect / liveness ของหลายเฟรมรันซ้อนกันใน inference pool
+    และหยุดทันทีที่รู้ผล (ผ่านครบ required_passes หรือไม่มีทางผ่านแล้ว)
+    จากนั้นเริ่ม embed + ค้นหา Qdrant บนเฟรมที่ดีที่สุดโดยไม่รอเฟรมที่เหลือ
+    """
+
+    def __init__(self, detector, antispoof, recognizer, qdrant,
+                 required_passes: int = 3, liveness_threshold: float = 0.7,
+                 scheduler: Optional[FairScheduler] = None, max_workers: int = 4,
+                 quality_gate: Optional[QualityGate] = None):
+        self.detector = detector
+        self.antispoof = antispoof
+        self.recognizer = recognizer
+        self.qdrant = qdrant
+        self.required_passes = required_passes
+        self.liveness_threshold = liveness_threshold
+        # เฟรมที่ไม่ผ่าน Quality Gate ไม่ถูกส่งเข้า Detector / Liveness (None = ปิด)
+        self.quality_gate = quality_gate
+        # ทุกกล้องใช้ pool เดียวกัน แยกคิวตาม locker_id
+        self.scheduler = scheduler or FairScheduler(max_workers)
+
+    def _check_quality(self, check, *args) -> QualityReport:
+        with metrics.stage("quality"):
+            report = check(*args)
+        for reason in report.reasons:
+            metrics.QUALITY_REJECTS.inc(reason=reason)
+        return report
+
+    def _detect(self, frame):
+        """Return: FaceDetection / None (ไม่เจอหน้า) / QualityReport (ไม่ผ่าน Quality Gate)"""
+        gate = self.quality_gate
+        if gate is not None:
+            report = self._check_quality(gate.check_frame, frame)
+            if not report.passed:
+                return report
+
+        with metrics.stage("detect"):
+            face = self.detector.detect(frame, with_embedding=False)
+
+        if face is not None and gate is not None:
+            report = self._check_quality(gate.check_face, face.crop, face.bbox, face.kps)
+            if not report.passed:
+                return report
+        return face
+
+    def _liveness(self, faces: List[FaceDetection]) -> List[float]:
+        # เฟรมที่ detect เสร็จพร้อมกันถูกรวมเป็น batch เดียว
+        with metrics.stage("liveness"):
+            return self.antispoof.check_batch([face.crop for face in faces])
+
+    def _identify(self, face: FaceDetection):
+        with metrics.stage("embed"):
+            emb = self.recognizer.get_embedding(face)
+        with metrics.stage("search"):
+            return self.qdrant.search(emb)
+
+    def run(self, frames, key: str = "default") -> ScanOutcome:
+        """key: ชื่อคิวใน FairScheduler (ใช้ locker_id เพื่อให้แต่ละกล้องได้ Worker อย่างยุติธรรม)"""
+        frames = list(frames)
+        total = len(frames)
+        outcome = ScanOutcome(passed=False)
+
+        # future -> ("detect", None) หรือ ("liveness", [faces])
+        pending = {self.scheduler.submit(key, self._detect, f): ("detect", None) for f in frames}
+        faces_found = 0
+        detect_left = total
+        passing: List[FaceDetection] = []
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                detected_now = []
+                for future in done:
+                    stage, faces = pending.pop(future)
+
+                    if stage == "detect":
+                        detect_left -= 1
+                        outcome.frames_used += 1
+                        detected = future.result()
+                        if isinstance(detected, QualityReport):
+                            outcome.quality.extend(detected.reasons)
+                        elif detected is not None:
+                            faces_found += 1
+                            detected_now.append(detected)
+                    else:
+                        for face, score in zip(faces, future.result()):
+                            outcome.scores.append(score)
+                            if score >= self.liveness_threshold:
+                                passing.append(face)
+
+                if detected_now:
+                    pending[self.scheduler.submit(key, self._liveness, detected_now)] = ("liveness", detected_now)
+
+                # ตัดสินผลได้แล้ว?
+                if len(passing) >= self.required_passes:
+                    outcome.passed = True
+                    break
+                if faces_found + detect_left < self.required_passes:
+                    # มีเฟรมที่ไม่ผ่าน Quality Gate -> บอกให้ถ่ายใหม่แทน "ไม่เจอหน้า"
+                    outcome.reason = "low_quality" if outcome.quality else "no_face"
+                    break
+                liveness_left = sum(len(faces) for stage, faces in pending.values() if stage == "liveness")
+                if len(passing) + liveness_left + detect_left < self.required_passes:
+                    outcome.reason = "spoof_detected"
+                    break
+        finally:
+            # เฟรมที่ยังไม่เริ่มไม่ต้องรันแล้ว (ที่รันอยู่ปล่อยให้จบเองแล้วทิ้งผล)
+            for future in pending:
+                future.cancel()
+
+        if not outcome.passed:
+            outcome.reason = outcome.reason or "no_face"
+            return outcome
+
+        # เริ่ม embed + ค้นหาทันที (เฟรมที่ยังค้างอยู่ใน pool ไม่ต้องรอ)
+        outcome.best = max(passing, key=frame_quality)
+        outcome.search_result = self._identify(outcome.best)
+        return outcome
@@ -0,0 +1,102 @@
+"""
+แสดงว่าเวลาหยิบเฟรมของ /scan ไม่รวมเวลา Capture อีกต่อไป
+
+เทียบ 2 แบบบนแหล่งภาพเดียวกัน (กล้องจำลองที่ปล่อยเฟรมตาม FPS หรือไฟล์วิดีโอ):
+  - sync:   อ่าน cap.read() 5 ครั้งใน Request (แบบเดิม)
+  - buffer: CameraService.get_latest(5) จาก ring buffer ของ Capture Thread
+
+วิธีรัน:
+    python -m benchmarks.bench_camera_scan                  # กล้องจำลอง 30 FPS
+    python -m benchmarks.bench_camera_scan --video clip.mp4 # ไฟล์วิดีโอ
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.services.camera import CameraService
+from benchmarks.utils import summarize, format_row, save_results
+
+class SyntheticCapture:
+    """กล้องจำลอง: read() บล็อกจนถึงเวลาเฟรมถัดไปตาม FPS (เหมือนกล้องจริง)"""
+    def __init__(self, fps: float = 30.0, size=(480, 640)):
+        self.interval = 1.0 / fps
+        self.size = size
+        self._next = time.monotonic()
+        self._rng = np.random.default_rng(0)
+
+    def read(self):
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+        self._next = max(self._next + self.interval, time.monotonic())
+        frame = self._rng.integers(0, 255, (*self.size, 3), dtype=np.uint8)
+        return True, frame
+
+    def get(self, prop):
+        return 1.0 / self.interval if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def set(self, prop, value):
+        return True
+
+    def release(self):
+        pass
+
+class VideoFileCapture(SyntheticCapture):
+    """ไฟล์วิดีโออ่านได้เร็วเกินจริง -> หน่วงให้เท่า FPS ของกล้อง และเล่นวนเมื่อจบไฟล์"""
+    def __init__(self, path: str, fps: float):
+        super().__init__(fps)
+        self.cap = cv2.VideoCapture(path)
+
+    def read(self):
+        super().read()
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+def open_source(args):
+    if args.video:
+        return VideoFileCapture(args.video, args.fps)
+    return SyntheticCapture(args.fps)
+
+def main(args):
+    # 1. แบบเดิม: อ่านเฟรมใน Request
+    cap = open_source(args)
+    sync_samples = []
+    for _ in range(args.scans):
+        started = time.perf_counter()
+        frames = [cap.read()[1] for _ in range(5)]
+        sync_samples.append(time.perf_counter() - started)
+        time.sleep(args.gap)
+    cap.release()
+
+    # 2. แบบใหม่: Capture Thread + ring buffer
+    camera = CameraService("bench", capture=open_source(args))
+    time.sleep(0.5)  # ให้ buffer เต็มก่อน
+    buffer_samples = []
+    for _ in range(args.scans):
+        started = time.perf_counter()
+        frames = camera.get_latest(5)
+        buffer_samples.append(time.perf_counter() - started)
+        assert len(frames) == 5
+        time.sleep(args.gap)
+    camera.release()
+
+    results = {"fps": args.fps, "sync": summarize(sync_samples), "buffer": summarize(buffer_samples)}
+    print(format_row("sync cap.read() x5", results["sync"]))
+    print(format_row("ring buffer get_latest(5)", results["buffer"]))
+    print(f"saved: {save_results('camera_scan', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="ไฟล์วิดีโอ (ไม่ใส่ = ใช้กล้องจำลอง)")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--scans", type=int, default=30)
+    parser.add_argument("--gap", type=float, default=0.2, help="เวลาเว้นระหว่าง scan (วินาที)")
+    main(parser.parse_args())
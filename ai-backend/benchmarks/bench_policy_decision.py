@@ -0,0 +1,57 @@
+"""
+Microbenchmark ของ DecisionEngine.check_access
+เทียบ policy แบบเดิม (list ของ user) กับแบบ compile แล้ว (frozenset + ตารางเวลา)
+เมื่อจำนวน user ต่อตู้เพิ่มขึ้น -> แบบ compile ควรคงที่
+
+วิธีรัน:
+    python -m benchmarks.bench_policy_decision
+"""
+import argparse
+import time as clock
+from datetime import datetime, time
+
+from app.core.decision import DecisionEngine
+from app.core.policy_store import PolicyIndex
+from benchmarks.utils import save_results
+
+def legacy_check(user_id, policy):
+    """Logic เดิม: scan list + เทียบ time object"""
+    if not policy.get("enabled", True):
+        return False
+    if user_id not in policy.get("allowed_users", []):
+        return False
+    now = datetime.now().time()
+    start, end = policy.get("start_time"), policy.get("end_time")
+    if start and end and not (start <= now <= end):
+        return False
+    return True
+
+def per_call_ns(fn, iterations):
+    started = clock.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (clock.perf_counter_ns() - started) / iterations
+
+def main(args):
+    engine = DecisionEngine()
+    results = {}
+    for n in args.users:
+        users = [f"user_{i:07d}" for i in range(n)]
+        raw = {"locker_01": {"enabled": True, "allowed_users": users,
+                             "start_time": time(0, 0), "end_time": time(23, 59, 59)}}
+        compiled = PolicyIndex.compile(raw).get("locker_01")
+        # กรณีแย่สุดของ list: user อยู่ท้ายสุด
+        target = users[-1]
+
+        legacy = per_call_ns(lambda: legacy_check(target, raw["locker_01"]), args.iterations)
+        fast = per_call_ns(lambda: engine.check_access(target, "locker_01", compiled), args.iterations)
+        results[str(n)] = {"legacy_ns": legacy, "compiled_ns": fast}
+        print(f"users={n:<8} legacy={legacy / 1000:9.2f}us  compiled={fast / 1000:6.2f}us")
+
+    print(f"saved: {save_results('policy_decision', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--iterations", type=int, default=2_000)
+    main(parser.parse_args())
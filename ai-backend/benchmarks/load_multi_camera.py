@@ -0,0 +1,78 @@
+"""
+Load test หลายกล้อง: กล้องจำลอง N ตัว (หรือไฟล์วิดีโอ) ใช้ Inference pool เดียวกัน
+แต่ละกล้องสแกนซ้ำๆ ตามอัตราที่กำหนด แล้วดู latency แยกรายกล้องว่ายังอยู่ในขอบเขต
+
+วิธีรัน:
+    python -m benchmarks.load_multi_camera --cameras 8 --workers 4 --video ../ai/clip.mp4
+"""
+import argparse
+import threading
+import time
+
+from app.core.qdrant import QdrantService
+from app.core.recognition import FaceRecognizer
+from app.services.antispoof import AntiSpoofService
+from app.services.camera_manager import CameraManager
+from app.services.face_detect import FaceDetector
+from app.services.fair_scheduler import FairScheduler
+from app.services.scan_pipeline import ScanPipeline
+from benchmarks.bench_camera_scan import SyntheticCapture, VideoFileCapture
+from benchmarks.utils import summarize, format_row, save_results
+
+def main(args):
+    cameras = [
+        {
+            "locker_id": f"locker_{i:02d}",
+            "source": args.video or f"synthetic-{i}",
+            "capture": VideoFileCapture(args.video, args.fps) if args.video else SyntheticCapture(args.fps),
+        }
+        for i in range(args.cameras)
+    ]
+    manager = CameraManager(cameras)
+    scheduler = FairScheduler(args.workers)
+    pipeline = ScanPipeline(
+        detector=FaceDetector(),
+        antispoof=AntiSpoofService(),
+        recognizer=FaceRecognizer(),
+        qdrant=QdrantService(),
+        scheduler=scheduler,
+    )
+    time.sleep(0.5)  # ให้ ring buffer ของทุกกล้องมีเฟรม
+
+    latencies = {cam["locker_id"]: [] for cam in cameras}
+    deadline = time.monotonic() + args.duration
+
+    def client(locker_id):
+        camera = manager.get(locker_id)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            pipeline.run(camera.get_latest(5), key=locker_id)
+            latencies[locker_id].append(time.perf_counter() - started)
+            time.sleep(args.interval)
+
+    threads = [threading.Thread(target=client, args=(lid,)) for lid in latencies]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    manager.release_all()
+    scheduler.shutdown()
+
+    results = {lid: summarize(samples) for lid, samples in latencies.items()}
+    for lid, stats in results.items():
+        print(format_row(lid, stats))
+    p95s = [r["p95_ms"] for r in results.values() if r.get("count")]
+    results["spread"] = {"p95_min_ms": min(p95s), "p95_max_ms": max(p95s)} if p95s else {}
+    print(f"p95 spread across cameras: {results['spread']}")
+    print(f"saved: {save_results('multi_camera', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--video", help="ไฟล์วิดีโอที่มีใบหน้า (ไม่ใส่ = กล้องจำลองภาพสุ่ม)")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--interval", type=float, default=0.5, help="เวลาเว้นระหว่าง scan ของแต่ละกล้อง")
+    main(parser.parse_args())
@@ -0,0 +1,49 @@
+"""Helper ร่วมของสคริปต์ Benchmark (สถิติ latency + บันทึกผลเป็น JSON)"""
+import json
+import os
+import platform
+import time
+from typing import Dict, List
+
+import numpy as np
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    """สรุป latency (วินาที) เป็น ms: p50 / p95 / p99 / mean / max"""
+    if not samples_s:
+        return {"count": 0}
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    return {
+        "count": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+def format_row(name: str, stats: Dict[str, float]) -> str:
+    if not stats.get("count"):
+        return f"{name:<28} (no samples)"
+    return (
+        f"{name:<28} n={stats['count']:<6} p50={stats['p50_ms']:8.2f}ms "
+        f"p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms"
+    )
+
+def save_results(name: str, results: dict, out_dir: str = "benchmarks/results") -> str:
+    """บันทึกผลเป็น JSON (ชื่อไฟล์มี timestamp เอาไว้เทียบกันข้ามรอบ)"""
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(out_dir, f"{name}-{stamp}.json")
+    payload = {
+        "benchmark": name,
+        "timestamp": stamp,
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
@@ -0,0 +1,98 @@
+"""
+AuditLogger: Thread เขียน batch, นับ event ที่ถูกทิ้งเมื่อคิวเต็ม, หมุน segment และแบ่งหน้าด้วย cursor
+
+รัน (จากโฟลเดอร์ ai-backend/):
+    python -m pytest tests
+"""
+import os
+
+import pytest
+
+from app.core.audit import AuditLogger
+
+@pytest.fixture
+def make_logger(tmp_path):
+    # ทุกเทสปิด logger เอง (close() ซ้ำกับคิวที่เต็มจะบล็อก)
+    def make(**kwargs):
+        # batch_size=1 -> เช็ค segment_rows ทุกแถว จำนวนแถวต่อไฟล์จึงแน่นอน
+        options = {"batch_size": 1, "flush_interval": 0.01, "segment_rows": 3, **kwargs}
+        return AuditLogger(str(tmp_path), **options)
+
+    return make
+
+def write_events(logger, events):
+    for event, user in events:
+        logger.log(event, user=user, locker="locker_01", detail={"n": 1})
+    # close() รอให้ Thread flush คิวจนหมด -> query เห็นทุกแถว
+    logger.close()
+
+def all_pages(logger, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        page = logger.query(limit=limit, cursor=cursor, **filters)
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_writer_flushes_queue_to_sqlite(make_logger):
+    logger = make_logger(segment_rows=1000)
+    write_events(logger, [("access_granted", "user_001"), ("access_denied", "user_002")])
+
+    stats = logger.stats()
+    assert stats["enqueued"] == stats["written"] == 2
+    assert stats["dropped"] == 0
+    assert stats["segments"] == 1
+
+    items = logger.query()["items"]
+    assert [item["event"] for item in items] == ["access_denied", "access_granted"]
+    assert items[0]["user"] == "user_002"
+    assert items[0]["detail"] == {"n": 1}
+
+def test_full_queue_drops_and_counts(make_logger):
+    logger = make_logger(max_queue=2)
+    # หยุด Thread เขียนก่อน -> ไม่มีใครดึงคิว
+    logger.close()
+
+    for i in range(5):
+        logger.log("access_granted", user=f"user_{i}")
+
+    stats = logger.stats()
+    assert stats["enqueued"] == 2
+    assert stats["dropped"] == 3
+    assert stats["queue_depth"] == 2
+
+def test_segments_rotate_after_segment_rows(make_logger, tmp_path):
+    logger = make_logger()
+    write_events(logger, [("access_granted", f"user_{i}") for i in range(7)])
+
+    segments = sorted(name for name in os.listdir(tmp_path) if name.endswith(".sqlite"))
+    assert segments == ["audit-000001.sqlite", "audit-000002.sqlite", "audit-000003.sqlite"]
+    assert logger.stats()["written"] == 7
+
+def test_cursor_pages_across_segments(make_logger):
+    logger = make_logger()
+    write_events(logger, [("access_granted", f"user_{i}") for i in range(7)])
+
+    pages = all_pages(logger, limit=3)
+    assert [len(page["items"]) for page in pages] == [3, 3, 1]
+    users = [item["user"] for page in pages for item in page["items"]]
+    assert users == [f"user_{i}" for i in range(6, -1, -1)]
+
+def test_exactly_filled_last_page_has_no_cursor(make_logger):
+    logger = make_logger()
+    # 6 แถว = 2 segment เต็มพอดี (+ segment ว่างที่เพิ่งหมุน)
+    write_events(logger, [("access_granted", f"user_{i}") for i in range(6)])
+
+    pages = all_pages(logger, limit=3)
+    assert [len(page["items"]) for page in pages] == [3, 3]
+    assert logger.query(limit=6)["next_cursor"] is None
+
+def test_filtered_page_without_older_matches_has_no_cursor(make_logger):
+    logger = make_logger()
+    # segment เก่าสุดมีแต่ user_b -> หน้าแรกของ user_a เต็มพอดีและไม่มีหน้าถัดไป
+    write_events(logger, [("access_granted", "user_b")] * 3 + [("access_granted", "user_a")] * 3)
+
+    page = logger.query(user="user_a", limit=3)
+    assert len(page["items"]) == 3
+    assert page["next_cursor"] is None
@@ -0,0 +1,99 @@
+"""
+CameraService ต่อ source จำลองแบบ cv2.VideoCapture (ไม่ต้องมีกล้อง / ไฟล์วิดีโอ)
+
+รัน (จากโฟลเดอร์ ai-backend/):
+    python -m pytest tests
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.camera import CameraService
+
+class FakeCapture:
+    """
+    read() คืนเฟรมที่มีเลขลำดับ frames ครั้ง แล้วแต่ละครั้งต่อจากนั้น:
+    block ไว้จนกว่าจะ release() (hang=True) หรือคืน (False, None) ทันที (หลุด)
+    """
+    def __init__(self, frames: int, hang: bool = True):
+        self.frames = frames
+        self.hang = hang
+        self.reads = 0
+        self.released = threading.Event()
+
+    def read(self):
+        if self.reads < self.frames:
+            self.reads += 1
+            return True, np.full((4, 4, 3), self.reads, dtype=np.uint8)
+        if self.hang:
+            self.released.wait()
+        return False, None
+
+    def get(self, prop):
+        return 0
+
+    def release(self):
+        self.released.set()
+
+def wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def cameras():
+    started = []
+    yield started
+    for camera in started:
+        # ปล่อย read() ที่ค้างอยู่ก่อน ไม่งั้น release() รอ join Capture Thread จนหมด 2 วินาที
+        camera.cap.release()
+        camera.release()
+
+def test_get_latest_returns_buffered_frames_without_waiting_on_read(cameras):
+    capture = FakeCapture(frames=5)
+    camera = CameraService("fake", buffer_size=3, capture=capture)
+    cameras.append(camera)
+    wait_for(lambda: capture.reads == 5)
+
+    # read() ค้างอยู่ใน Capture Thread -> ต้องได้เฟรมที่ buffer ไว้ทันที ไม่รอ timeout
+    started = time.monotonic()
+    frames = camera.get_latest(3, timeout=5.0)
+    assert time.monotonic() - started < 0.5
+    assert [int(f[0, 0, 0]) for f in frames] == [3, 4, 5]  # ring buffer เก็บแค่ 3 เฟรมล่าสุด
+
+    # ขอมากกว่าที่มี -> รอได้ไม่เกิน timeout แล้วคืนเท่าที่มี
+    started = time.monotonic()
+    assert len(camera.get_latest(5, timeout=0.1)) == 3
+    assert time.monotonic() - started < 0.5
+
+def test_max_age_rejects_stale_frames(cameras):
+    capture = FakeCapture(frames=2)
+    camera = CameraService("fake", capture=capture)
+    cameras.append(camera)
+    wait_for(lambda: capture.reads == 2)
+
+    assert len(camera.get_latest(2, timeout=0.0, max_age=1.0)) == 2
+    time.sleep(0.2)
+    # กล้องค้าง: เฟรมที่เหลือใน buffer เก่าเกิน max_age -> ห้ามส่งไปยืนยันตัวตน
+    assert camera.get_latest(2, timeout=0.0, max_age=0.1) == []
+    assert camera.get_frame() is not None
+
+def test_reconnects_after_read_failures(cameras):
+    broken = FakeCapture(frames=0, hang=False)
+    recovered = FakeCapture(frames=3)
+    opened = []
+
+    def open_capture(source):
+        opened.append(source)
+        return recovered
+
+    camera = CameraService("rtsp://locker-1", capture=broken, reconnect_after=3, open_capture=open_capture)
+    cameras.append(camera)
+    wait_for(lambda: recovered.reads == 3)
+
+    assert opened == ["rtsp://locker-1"]
+    assert broken.released.is_set()
+    assert [int(f[0, 0, 0]) for f in camera.get_latest(3, timeout=0.0)] == [1, 2, 3]
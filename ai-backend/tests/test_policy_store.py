@@ -0,0 +1,98 @@
+"""
+CompiledPolicy.allows_time (ช่วงข้ามเที่ยงคืน / หลายช่วงซ้อนกัน) และ PolicyStore.reload จากไฟล์ JSON
+
+รัน (จากโฟลเดอร์ ai-backend/):
+    python -m pytest tests
+"""
+import json
+from datetime import time
+
+import pytest
+
+from app.core.decision import DecisionEngine
+from app.core.policy_store import CompiledPolicy, PolicyStore
+
+def compiled(**policy) -> CompiledPolicy:
+    return CompiledPolicy.from_dict("locker_01", {"allowed_users": ["user_001"], **policy})
+
+def test_no_window_allows_all_day():
+    policy = compiled()
+    assert policy.windows is None
+    assert policy.allows_time(time(0, 0))
+    assert policy.allows_time(time(23, 59, 59))
+
+def test_window_crossing_midnight():
+    policy = compiled(start_time="22:00", end_time="06:00")
+    assert policy.windows == ((0, 6 * 3600), (22 * 3600, 86399))
+
+    for now in (time(22, 0), time(23, 59, 59), time(0, 0), time(3, 30), time(6, 0)):
+        assert policy.allows_time(now), now
+    for now in (time(6, 0, 1), time(12, 0), time(21, 59, 59)):
+        assert not policy.allows_time(now), now
+
+def test_overlapping_windows_are_merged():
+    policy = compiled(windows=[["08:00", "12:00"], ["11:00", "13:00"], ["13:00:01", "14:00"], ["18:00", "19:00"]])
+    # 08-12 + 11-13 ซ้อนกัน, 13:00:01 ต่อจาก 13:00 พอดี -> รวมเป็น 08:00-14:00
+    assert policy.windows == ((8 * 3600, 14 * 3600), (18 * 3600, 19 * 3600))
+
+    for now in (time(8, 0), time(11, 30), time(13, 0), time(13, 0, 1), time(14, 0), time(18, 30)):
+        assert policy.allows_time(now), now
+    for now in (time(7, 59, 59), time(14, 0, 1), time(17, 59, 59), time(19, 0, 1)):
+        assert not policy.allows_time(now), now
+
+def test_window_nested_inside_another():
+    policy = compiled(windows=[["08:00", "18:00"], ["09:00", "10:00"], ["23:00", "01:00"]])
+    assert policy.windows == ((0, 3600), (8 * 3600, 18 * 3600), (23 * 3600, 86399))
+    assert policy.allows_time(time(17, 0))
+    assert policy.allows_time(time(0, 30))
+    assert not policy.allows_time(time(2, 0))
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "policies.json"
+
+    def write(raw):
+        path.write_text(raw if isinstance(raw, str) else json.dumps(raw), encoding="utf-8")
+
+    write({"locker_01": {"enabled": True, "allowed_users": ["user_001"]}})
+    return path, write
+
+@pytest.fixture
+def store(source):
+    path, _ = source
+    # ไม่ให้ thread watch โหลดเองระหว่างเทส -> เรียก reload() ตรงๆ
+    store = PolicyStore(str(path), reload_interval=3600)
+    yield store
+    store.stop()
+
+def test_reload_swaps_index(store, source):
+    _, write = source
+    assert store.lockers_for("user_001") == {"locker_01"}
+
+    write({
+        "locker_01": {"enabled": True, "allowed_users": ["user_002"]},
+        "locker_02": {"enabled": True, "allowed_users": ["user_002"], "start_time": "22:00", "end_time": "06:00"},
+    })
+    assert store.reload()
+
+    assert store.lockers_for("user_001") == frozenset()
+    assert store.lockers_for("user_002") == {"locker_01", "locker_02"}
+    assert store.get_policy("locker_02").allows_time(time(1, 0))
+
+def test_corrupt_source_keeps_old_index(store, source):
+    _, write = source
+    index = store.index
+
+    write('{"locker_01": {"enabled": true, "allowed_users": ["user_')
+    assert not store.reload()
+    assert store.index is index
+
+    # ตัดสินด้วยชุดเดิมต่อได้
+    result = DecisionEngine().check_access("user_001", "locker_01", store.get_policy("locker_01"))
+    assert result.allow
+
+def test_corrupt_source_on_first_load_raises(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text("not json", encoding="utf-8")
+    with pytest.raises(ValueError):
+        PolicyStore(str(path), reload_interval=3600)
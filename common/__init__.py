@@ -0,0 +1 @@
+"""โมดูลที่ทุก Service ใช้ร่วมกัน (ติดตั้งด้วย pip install -e . จาก root ของ repo)"""
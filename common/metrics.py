@@ -0,0 +1,222 @@
+"""
+Metrics แบบเบาๆ (ไม่ต้องพึ่ง prometheus_client) ที่ทุก Service ใช้ร่วมกัน
+
+- PipelineMetrics(prefix): ชุด metric ของ Service หนึ่งตัว (ชื่อขึ้นต้นด้วย prefix เช่น face_ / access_)
+- stage("detect"): จับเวลาแต่ละขั้นตอน -> Histogram + ใส่ลง Server-Timing ของ Request นั้น
+- /metrics: export เป็น Prometheus text format
+
+แต่ละ Service มี metrics.py ของตัวเองที่สร้าง PipelineMetrics ด้วย prefix ของตัวเองแล้ว export ชื่อเดิม
+(metrics.stage / metrics.count_result / metrics.registry ...) -> โค้ดที่เรียกใช้ไม่ต้องรู้จักโมดูลนี้
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label_str(labelnames, values, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(k, "")) for k in self.labelnames)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self):
+        yield from super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_label_str(self.labelnames, key)} {value}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self._values: Dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self):
+        yield from super().render()
+        with self._lock:
+            items = [(key, list(data)) for key, data in self._values.items()]
+        for key, data in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                labels = _label_str(self.labelnames, key, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _label_str(self.labelnames, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {data[-1]}"
+            yield f"{self.name}_sum{_label_str(self.labelnames, key)} {data[-2]}"
+            yield f"{self.name}_count{_label_str(self.labelnames, key)} {data[-1]}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# ชื่อ pipeline และรายการเวลาแต่ละ stage ของ Request ปัจจุบัน (ตั้งโดย middleware / route)
+_pipeline: ContextVar[str] = ContextVar("metrics_pipeline", default="other")
+_timings: ContextVar[Optional[list]] = ContextVar("metrics_timings", default=None)
+
+def set_pipeline(name: str):
+    _pipeline.set(name)
+
+@contextmanager
+def capture():
+    """เก็บเวลาของทุก stage ที่เกิดภายใน block นี้ (ใช้ใน benchmark ที่ไม่ได้ผ่าน middleware)"""
+    timings = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+class PipelineMetrics:
+    """Metric มาตรฐานของ Service หนึ่งตัว: ทุกชื่อขึ้นต้นด้วย "{prefix}_" """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.registry = registry = Registry()
+        self.STAGE_SECONDS = registry.register(Histogram(
+            f"{prefix}_stage_seconds", "Latency of each pipeline stage", ("pipeline", "stage")))
+        self.REQUESTS = registry.register(Counter(
+            f"{prefix}_requests_total", "Pipeline requests by outcome", ("pipeline", "status")))
+        self.REJECTS = registry.register(Counter(
+            f"{prefix}_rejects_total", "Rejected requests by reason", ("pipeline", "reason")))
+        self.MODEL_LOAD_SECONDS = registry.register(Gauge(
+            f"{prefix}_model_load_seconds", "Time spent loading each model at startup", ("model",)))
+        self.STARTUP_SECONDS = registry.register(Gauge(
+            f"{prefix}_startup_seconds", "Cold-start time of each startup phase", ("phase",)))
+        self.CACHE_LOOKUPS = registry.register(Counter(
+            f"{prefix}_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result")))
+        self.QUALITY_REJECTS = registry.register(Counter(
+            f"{prefix}_quality_rejects_total", "Frames stopped by the quality gate by reason", ("reason",)))
+
+    def record_stage(self, name: str, seconds: float):
+        self.STAGE_SECONDS.observe(seconds, pipeline=_pipeline.get(), stage=name)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((name, seconds))
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - started)
+
+    def count_result(self, status: str, reason: str = None):
+        pipeline = _pipeline.get()
+        self.REQUESTS.inc(pipeline=pipeline, status=status)
+        if reason:
+            self.REJECTS.inc(pipeline=pipeline, reason=reason)
+
+    def count_cache(self, cache: str, hit: bool):
+        self.CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+def _server_timing(timings, total: float) -> str:
+    # stage เดียวกันอาจถูกเรียกหลายครั้ง (เช่นหลายเฟรม) -> รวมเวลาแล้วบอกจำนวนครั้ง
+    merged: Dict[str, list] = {}
+    for name, seconds in timings:
+        entry = merged.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = [
+        f'{name};dur={seconds * 1000:.2f}' + (f';desc="x{count}"' if count > 1 else "")
+        for name, (seconds, count) in merged.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+class ServerTimingMiddleware:
+    """ASGI middleware: เก็บเวลาทุก stage ของ Request แล้วใส่เป็น header Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        timings_token = _timings.set(timings)
+        pipeline_token = _pipeline.set("other")
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = _server_timing(timings, time.perf_counter() - started)
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(timings_token)
+            _pipeline.reset(pipeline_token)
@@ -0,0 +1,142 @@
+"""
+ด่านตรวจคุณภาพเฟรมแบบถูกๆ ก่อนรันโมเดลที่แพง (Detector / Anti-Spoof / ArcFace)
+
+- check_frame(): ก่อน Detect -> ความสว่างของทั้งเฟรม (สุ่มทุกๆ frame_stride พิกเซล ไม่ copy ภาพ)
+- check_face():  หลัง Detect ก่อน Embed / Liveness -> ขนาดหน้า, ท่าหน้าจาก 5 keypoints,
+                 ความคมชัด (Laplacian variance) และความสว่างของ crop หน้า
+เฟรมที่ไม่ผ่านจะไม่ถูกส่งเข้าโมเดลถัดไปเลย และได้รายการเหตุผลกลับไปให้ผู้เรียกรายงาน
+
+ใช้ร่วมกันทุก Service: แต่ละ Service มี quality_gate.py ของตัวเองที่แค่อ่าน threshold จาก config
+ของตัวเอง (Settings / Environment) ผ่าน QualityGate.from_config()
+"""
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+# ขนาดที่ย่อ/ขยาย crop หน้าก่อนวัดความคม (Laplacian variance ขึ้นกับขนาดภาพ -> ให้ threshold ใช้ได้ทุกระยะ)
+BLUR_SIZE = 112
+# น้ำหนัก BGR -> ความสว่าง (ITU-R BT.601 เหมือน cv2.COLOR_BGR2GRAY)
+LUMA_BGR = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+# ตำแหน่งจมูกระหว่างแนวตากับแนวปาก (0 = แนวตา, 1 = แนวปาก) ของหน้าตรงใน template ของ ArcFace
+NEUTRAL_NOSE_RATIO = 0.5
+
+@dataclass
+class QualityReport:
+    reasons: List[str] = field(default_factory=list)   # ว่าง = ผ่าน
+    measures: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        return not self.reasons
+
+def estimate_pose(kps) -> np.ndarray:
+    """
+    ประมาณ (yaw, pitch, roll) เป็นองศาจาก 5 keypoints ของ SCRFD
+    (ตาซ้าย, ตาขวา, จมูก, มุมปากซ้าย, มุมปากขวา) รับได้ทั้ง (5, 2) และ (N, 5, 2)
+
+    - roll:  มุมของแนวตา
+    - yaw:   จมูกเยื้องจากกึ่งกลางตา เทียบกับครึ่งระยะห่างตา (หลังหมุนแก้ roll)
+    - pitch: ตำแหน่งจมูกระหว่างแนวตากับแนวปาก เทียบกับหน้าตรง
+    เป็นค่าประมาณแบบ 2D เพียงพอสำหรับคัดหน้าที่หันมากๆ ทิ้ง ไม่ใช่ head pose จริง
+    """
+    kps = np.asarray(kps, dtype=np.float32)
+    left_eye, right_eye, nose = kps[..., 0, :], kps[..., 1, :], kps[..., 2, :]
+    mouth = (kps[..., 3, :] + kps[..., 4, :]) / 2
+
+    eye_vec = right_eye - left_eye
+    roll = np.arctan2(eye_vec[..., 1], eye_vec[..., 0])
+
+    # หมุนกลับให้แนวตาเป็นแนวนอน แล้ววัดตำแหน่งจมูก / ปากจากกึ่งกลางตา
+    eye_mid = (left_eye + right_eye) / 2
+    cos, sin = np.cos(-roll), np.sin(-roll)
+    nose_d, mouth_d = nose - eye_mid, mouth - eye_mid
+    nose_x = nose_d[..., 0] * cos - nose_d[..., 1] * sin
+    nose_y = nose_d[..., 0] * sin + nose_d[..., 1] * cos
+    mouth_y = mouth_d[..., 0] * sin + mouth_d[..., 1] * cos
+
+    half_eye = np.maximum(np.linalg.norm(eye_vec, axis=-1) / 2, 1e-6)
+    yaw = np.arcsin(np.clip(nose_x / half_eye, -1.0, 1.0))
+    nose_ratio = nose_y / np.maximum(mouth_y, 1e-6)
+    pitch = np.arcsin(np.clip((nose_ratio - NEUTRAL_NOSE_RATIO) * 2, -1.0, 1.0))
+    return np.degrees(np.stack([yaw, pitch, roll], axis=-1))
+
+@dataclass
+class QualityGate:
+    min_face_px: float = 60.0               # ด้านที่สั้นกว่าของ bbox
+    min_blur_var: float = 40.0              # Laplacian variance ของ crop หน้าขนาด BLUR_SIZE
+    min_brightness: float = 40.0            # ค่าเฉลี่ยความสว่างของหน้า (0-255)
+    max_brightness: float = 220.0
+    max_clipped_fraction: float = 0.4       # สัดส่วนพิกเซลที่มืดสนิท / สว่างจนขาว
+    max_yaw: float = 35.0                   # องศา
+    max_pitch: float = 30.0
+    max_roll: float = 30.0
+    frame_min_brightness: float = 20.0      # ทั้งเฟรม (ก่อน Detect): หลวมกว่าของหน้าเพราะรวมพื้นหลัง
+    frame_max_brightness: float = 240.0
+    frame_stride: int = 8
+
+    @classmethod
+    def from_config(cls, lookup: Callable[[str], Optional[Any]]) -> "QualityGate":
+        """
+        threshold จาก config ของ Service: ชื่อ key = "QUALITY_" + ชื่อ field ตัวใหญ่ (เช่น QUALITY_MIN_FACE_PX)
+        lookup(key) คืน None = ใช้ค่า default ของ field นั้น
+        """
+        values = {}
+        for f in fields(cls):
+            value = lookup(f"QUALITY_{f.name.upper()}")
+            if value is not None:
+                values[f.name] = type(f.default)(value)
+        return cls(**values)
+
+    def check_frame(self, img) -> QualityReport:
+        """ทั้งเฟรมมืด / สว่างเกินกว่าจะหาหน้าเจอ -> ไม่ต้องรัน Detector"""
+        report = QualityReport()
+        step = max(1, self.frame_stride)
+        brightness = float((img[::step, ::step] @ LUMA_BGR).mean())
+        report.measures["frame_brightness"] = brightness
+        if brightness < self.frame_min_brightness:
+            report.reasons.append("frame_too_dark")
+        elif brightness > self.frame_max_brightness:
+            report.reasons.append("frame_too_bright")
+        return report
+
+    def check_face(self, face_crop, bbox, kps=None) -> QualityReport:
+        """หน้าที่ Detect ได้แล้วคุ้มที่จะ Embed / ตรวจ Liveness หรือไม่"""
+        report = QualityReport()
+        face_px = float(min(bbox[2] - bbox[0], bbox[3] - bbox[1]))
+        report.measures["face_px"] = face_px
+        if face_px < self.min_face_px:
+            # หน้าเล็กเกินไป: ค่าอื่นวัดไม่น่าเชื่อถือ ตัดสินเลย
+            report.reasons.append("face_too_small")
+            return report
+
+        if kps is not None:
+            yaw, pitch, roll = (float(v) for v in estimate_pose(kps))
+            report.measures.update(yaw=yaw, pitch=pitch, roll=roll)
+            if abs(yaw) > self.max_yaw:
+                report.reasons.append("pose_yaw")
+            if abs(pitch) > self.max_pitch:
+                report.reasons.append("pose_pitch")
+            if abs(roll) > self.max_roll:
+                report.reasons.append("pose_roll")
+
+        if face_crop is None or face_crop.size == 0:
+            report.reasons.append("face_out_of_frame")
+            return report
+
+        gray = cv2.resize(cv2.cvtColor(face_crop, cv2.COLOR_BGR2GRAY), (BLUR_SIZE, BLUR_SIZE),
+                          interpolation=cv2.INTER_AREA)
+        blur_var = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+        brightness = float(gray.mean())
+        dark = np.count_nonzero(gray <= 5) / gray.size
+        bright = np.count_nonzero(gray >= 250) / gray.size
+        report.measures.update(blur_var=blur_var, brightness=brightness)
+
+        if blur_var < self.min_blur_var:
+            report.reasons.append("blurry")
+        if brightness < self.min_brightness or dark > self.max_clipped_fraction:
+            report.reasons.append("too_dark")
+        elif brightness > self.max_brightness or bright > self.max_clipped_fraction:
+            report.reasons.append("too_bright")
+        return report
@@ -0,0 +1,59 @@
+"""
+สถานะความพร้อมของ Service (/ready) + เวลา cold start ของแต่ละช่วงตอน Start (ใช้ร่วมกันทุก Service)
+
+/      = Process ยังไม่ตาย (liveness)
+/ready = โหลดโมเดล + warm-up เสร็จแล้ว พร้อมรับ Request ที่ latency ปกติ (readiness)
+
+แต่ละ Service มี readiness.py ของตัวเองที่สร้าง Readiness(metrics.STARTUP_SECONDS) ตัวเดียวทั้ง Process
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+class Readiness:
+    def __init__(self, startup_seconds=None):
+        # Gauge ของ Service ที่ export เวลาแต่ละช่วง (metrics.STARTUP_SECONDS) -> None = ไม่ export
+        self.startup_seconds = startup_seconds
+        self.ready = False
+        self.error: Optional[str] = None
+        self.phases: Dict[str, float] = {}
+        self._started = time.perf_counter()  # ≈ เวลาที่ Process เริ่ม import app
+
+    @contextmanager
+    def phase(self, name: str):
+        """จับเวลาหนึ่งช่วงของการ Start (เช่น load_models / warmup)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+        if self.startup_seconds is not None:
+            self.startup_seconds.set(seconds, phase=name)
+
+    def mark_ready(self):
+        self.record("total", time.perf_counter() - self._started)
+        self.ready = True
+
+    def fail(self, error: Exception):
+        self.error = str(error)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "cold_start_seconds": dict(self.phases),
+        }
+
+    def require_ready(self):
+        """Dependency ของ Route ที่ต้องใช้โมเดล: ตอบ 503 ระหว่าง warm-up แทนการให้ผู้ใช้คนแรกรอหลายวินาที"""
+        if not self.ready:
+            raise HTTPException(
+                status_code=503,
+                detail=self.error or "Service is warming up",
+                headers={"Retry-After": "1"},
+            )
@@ -1,52 +1,123 @@
+import asyncio
+import logging
+import math
+import os
 import uuid
 import datetime
 import pytz # แนะนำให้ใช้เพื่อแก้ปัญหา Timezone
 import numpy as np
 import cv2
+import time
 from fastapi import FastAPI, UploadFile, HTTPException, Form, Depends, File
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, update
 from insightface.app import FaceAnalysis
-from qdrant_client import QdrantClient
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct
 
 # Import files ที่เราสร้างตะกี้
 from database import get_db, engine, Base
 from models import Student, Subject, StudentEnrolled, AttendanceLog
+import metrics
+from readiness import readiness, require_ready
 
 # ============================
 # SETUP
 # ============================
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
-qdrant = QdrantClient(host="10.4.41.250", port=6333)
+app.add_middleware(metrics.ServerTimingMiddleware)
+# QDRANT_LOCAL_PATH=":memory:" (หรือ path) -> ใช้ Qdrant local mode แทน Server (ไว้ทำ load test)
+QDRANT_LOCAL_PATH = os.getenv("QDRANT_LOCAL_PATH")
+QDRANT_TIMEOUT_S = float(os.getenv("QDRANT_TIMEOUT_S", "2.0"))  # timeout ต่อคำสั่ง
+_qdrant_options = dict(
+    host=os.getenv("QDRANT_HOST", "10.4.41.250"),
+    port=int(os.getenv("QDRANT_PORT", "6333")),
+    # QDRANT_PREFER_GRPC=true -> ส่ง Vector ผ่าน gRPC (binary) แทน JSON
+    prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true",
+    grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+    timeout=math.ceil(QDRANT_TIMEOUT_S),
+    limits=httpx.Limits(max_connections=int(os.getenv("QDRANT_POOL_SIZE", "32"))),
+)
+# aqdrant: Client async ตัวเดียวทั้ง Process สำหรับ Endpoint (local mode มีได้ Client เดียว -> None)
+if QDRANT_LOCAL_PATH == ":memory:":
+    qdrant = QdrantClient(location=":memory:")
+    aqdrant = None
+elif QDRANT_LOCAL_PATH:
+    qdrant = QdrantClient(path=QDRANT_LOCAL_PATH)
+    aqdrant = None
+else:
+    qdrant = QdrantClient(**_qdrant_options)
+    aqdrant = AsyncQdrantClient(**_qdrant_options)
 COLLECTION_NAME = "student_faces"
 
 # InsightFace Setup
-face_app = FaceAnalysis(name='buffalo_l')
+_started = time.perf_counter()
+face_app = FaceAnalysis(name='buffalo_l', allowed_modules=['detection', 'recognition'])
 face_app.prepare(ctx_id=0, det_size=(640, 640))
+metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - _started, model="insightface")
+readiness.record("load_models", time.perf_counter() - _started)
 
 # Timezone (Thai)
 BKK_TZ = pytz.timezone('Asia/Bangkok')
 
+def warm_up(frame_sizes=((480, 640), (720, 1280)), iterations: int = 2):
+    """รัน detect + recognition ด้วยภาพสังเคราะห์ ให้ ONNX Runtime init เสร็จก่อนนักศึกษาคนแรกเช็คชื่อ"""
+    try:
+        with readiness.phase("warmup"):
+            rng = np.random.default_rng(0)
+            aligned = rng.integers(0, 256, size=(112, 112, 3), dtype=np.uint8)
+            for _ in range(iterations):
+                for height, width in frame_sizes:
+                    face_app.det_model.detect(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8), max_num=1)
+                face_app.models["recognition"].get_feat(aligned)
+        readiness.mark_ready()
+        logger.info(f"Service ready. Cold start: {readiness.phases}")
+    except Exception as e:
+        logger.exception(f"Warm-up failed: {e}")
+        readiness.fail(e)
+
 @app.on_event("startup")
 async def startup_event():
     # สร้าง Table ใน DB (ถ้ายังไม่มี) แบบ Async
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    with readiness.phase("db_init"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
     
     # Qdrant Init
-    if not qdrant.collection_exists(COLLECTION_NAME):
-        qdrant.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(size=512, distance=Distance.COSINE),
-        )
+    with readiness.phase("qdrant_init"):
+        if not qdrant.collection_exists(COLLECTION_NAME):
+            qdrant.create_collection(
+                collection_name=COLLECTION_NAME,
+                vectors_config=VectorParams(size=512, distance=Distance.COSINE),
+            )
+
+    # warm-up เบื้องหลัง -> /ready เป็น true เมื่อเสร็จ
+    app.state.warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
+async def qdrant_call(method: str, **kwargs):
+    """เรียกคำสั่ง Qdrant โดยไม่ block event loop (aqdrant หรือ Client sync ใน Thread) พร้อม timeout"""
+    if aqdrant is not None:
+        call = getattr(aqdrant, method)(**kwargs)
+    else:
+        call = asyncio.to_thread(getattr(qdrant, method), **kwargs)
+    return await asyncio.wait_for(call, QDRANT_TIMEOUT_S)
 
 def process_image(file_bytes):
     # InsightFace เป็น CPU-bound operation (ยังคงเป็น Sync)
     # ถ้า load เยอะจริงๆ ควรแยกไปรันใน ThreadPool หรือ Celery
-    nparr = np.frombuffer(file_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    faces = face_app.get(img)
+    with metrics.stage("decode"):
+        nparr = np.frombuffer(file_bytes, np.uint8)
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    with metrics.stage("embed"):
+        faces = face_app.get(img, max_num=1)
     if not faces:
         raise ValueError("No face detected")
     return faces[0].embedding
@@ -54,15 +125,17 @@ def process_image(file_bytes):
 # ============================
 # API: Register (Async)
 # ============================
-@app.post("/register")
+@app.post("/register", dependencies=[Depends(require_ready)])
 async def register_student(
     student_no: str = Form(...),
     name: str = Form(...),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db) # Inject Async DB Session
 ):
+    metrics.set_pipeline("register")
     try:
-        image_bytes = await file.read()
+        with metrics.stage("upload_read"):
+            image_bytes = await file.read()
         embedding = process_image(image_bytes)
         
         # Generate UUID
@@ -71,49 +144,59 @@ async def register_student(
         # 1. Insert ลง PostgreSQL (Async)
         new_student = Student(id=new_uuid, student_no=student_no, name=name)
         db.add(new_student)
-        await db.commit() # รอ commit แบบ async
-        await db.refresh(new_student)
-
-        # 2. Insert ลง Qdrant (Sync - qdrant client ปกติเร็วอยู่แล้ว)
-        qdrant.upsert(
-            collection_name=COLLECTION_NAME,
-            points=[
-                PointStruct(
-                    id=str(new_uuid),
-                    vector=embedding.tolist(),
-                    payload={"student_no": student_no, "name": name}
-                )
-            ]
-        )
+        with metrics.stage("db_write"):
+            await db.commit() # รอ commit แบบ async
+            await db.refresh(new_student)
+
+        # 2. Insert ลง Qdrant (Async)
+        with metrics.stage("qdrant_upsert"):
+            await qdrant_call(
+                "upsert",
+                collection_name=COLLECTION_NAME,
+                points=[
+                    PointStruct(
+                        id=str(new_uuid),
+                        vector=embedding.tolist(),
+                        payload={"student_no": student_no, "name": name}
+                    )
+                ]
+            )
 
+        metrics.count_result("success")
         return {"status": "success", "student_id": str(new_uuid)}
 
     except Exception as e:
+        metrics.count_result("error")
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============================
 # API: Check-in (Async + Logic แน่นๆ)
 # ============================
-@app.post("/check-in")
+@app.post("/check-in", dependencies=[Depends(require_ready)])
 async def check_in(
     file: UploadFile,
     db: AsyncSession = Depends(get_db)
 ):
+    metrics.set_pipeline("check_in")
     try:
         # 1. Process Image
-        image_bytes = await file.read()
+        with metrics.stage("upload_read"):
+            image_bytes = await file.read()
         embedding = process_image(image_bytes)
 
         # 2. Search Qdrant
-        search_result = qdrant.query_points(
-            collection_name=COLLECTION_NAME,
-            query_vector=embedding.tolist(),
-            limit=1,
-            score_threshold=0.5
-        )
+        with metrics.stage("qdrant_search"):
+            search_result = (await qdrant_call(
+                "query_points",
+                collection_name=COLLECTION_NAME,
+                query=embedding.tolist(),
+                limit=1,
+                score_threshold=0.5
+            )).points
 
         if not search_result:
+            metrics.count_result("reject", "unknown_person")
             return {"status": "failed", "message": "Unknown person"}
 
         student_id_str = search_result[0].id
@@ -137,10 +220,12 @@ async def check_in(
             )
         )
         
-        result = await db.execute(stmt)
+        with metrics.stage("db_query"):
+            result = await db.execute(stmt)
         subject = result.scalars().first()
 
         if not subject:
+            metrics.count_result("reject", "no_class")
             return {"status": "warning", "message": "No class scheduled right now."}
 
         # 5. Check Duplicate Log (ป้องกันเช็คซ้ำในวันเดียว)
@@ -149,10 +234,12 @@ async def check_in(
             AttendanceLog.subject_id == subject.id,
             AttendanceLog.attendance_date == now.date()
         )
-        log_result = await db.execute(stmt_log)
+        with metrics.stage("db_query"):
+            log_result = await db.execute(stmt_log)
         existing_log = log_result.scalars().first()
 
         if existing_log:
+            metrics.count_result("reject", "already_checked_in")
             return {"status": "info", "message": f"Already checked in for {subject.name}"}
 
         # 6. Insert Log & Update Enrollment
@@ -174,11 +261,12 @@ async def check_in(
             )
             .values(attended=True)
         )
-        await db.execute(stmt_update)
-
         # Commit ทั้งหมดทีเดียว (Atomic Transaction)
-        await db.commit()
+        with metrics.stage("db_write"):
+            await db.execute(stmt_update)
+            await db.commit()
 
+        metrics.count_result("success")
         return {
             "status": "success",
             "student_name": search_result[0].payload.get("name"),
@@ -187,9 +275,24 @@ async def check_in(
         }
 
     except Exception as e:
+        metrics.count_result("error")
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # ปิด connection pool ของ Qdrant
+    if aqdrant is not None:
+        await aqdrant.close()
+
+@app.get("/ready")
+def ready():
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Metrics ของ Attendance Service (ชื่อขึ้นต้นด้วย "attendance_")
+
+ตัว implementation (Registry / Histogram / Server-Timing middleware) อยู่ที่ common/metrics.py ใช้ร่วมกันทุก Service
+(package face-common ที่ root ของ repo ต้องติดตั้งก่อน: pip install -e .)
+-> ไฟล์นี้แค่สร้างชุด metric ด้วย prefix ของ Service นี้แล้ว export ชื่อที่โค้ดเรียกใช้
+"""
+from common.metrics import PipelineMetrics, ServerTimingMiddleware, capture, set_pipeline  # noqa: F401
+
+_metrics = PipelineMetrics("attendance")
+
+registry = _metrics.registry
+STAGE_SECONDS = _metrics.STAGE_SECONDS
+REQUESTS = _metrics.REQUESTS
+REJECTS = _metrics.REJECTS
+MODEL_LOAD_SECONDS = _metrics.MODEL_LOAD_SECONDS
+STARTUP_SECONDS = _metrics.STARTUP_SECONDS
+CACHE_LOOKUPS = _metrics.CACHE_LOOKUPS
+QUALITY_REJECTS = _metrics.QUALITY_REJECTS
+
+record_stage = _metrics.record_stage
+stage = _metrics.stage
+count_result = _metrics.count_result
+count_cache = _metrics.count_cache
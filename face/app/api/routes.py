@@ -1,10 +1,16 @@
 import logging
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status
-from typing import Optional
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from typing import List, Optional
 
 # Import Services ที่เราสร้างไว้
 from app.services.face_service import face_service
 from app.services.vector_db import qdrant_service
+from app.services.decision_cache import decision_cache
+from app.services.inference_pool import inference_pool
+from app.services.process_pool import process_pool
+from app.config import settings
+from app import metrics
+from app.readiness import require_ready
 
 # Import Schemas (เดี๋ยวเราจะสร้างไฟล์นี้เป็นขั้นตอนต่อไป)
 from app.api.schemas import VerifyResponse, EnrollResponse
@@ -21,26 +27,152 @@ class BookingRequest(BaseModel):
     user_id: int
     locker_id: str
 
+async def analyze_image(img):
+    """Detect + Embed + Liveness (รันใน Worker Thread หรือส่งต่อไป Worker Process ตาม INFERENCE_MODE)"""
+    with metrics.stage("analyze"):
+        if settings.INFERENCE_MODE == "process":
+            return await inference_pool.run(process_pool.infer, img)
+        return await inference_pool.run(face_service.analyze, img)
+
+async def analyze_crop_image(img, kps=None, bbox=None):
+    """Align + Embed + Liveness ของหน้าที่ Client crop มาแล้ว (ไม่รัน Detector)"""
+    with metrics.stage("analyze"):
+        if settings.INFERENCE_MODE == "process":
+            return await inference_pool.run(process_pool.infer_crop, img, kps, bbox)
+        return await inference_pool.run(face_service.analyze_crop, img, kps, bbox)
+
+def parse_numbers(text: str, count: int, error: str) -> List[float]:
+    """ตัวเลข count ตัวจาก Form: JSON (ซ้อนกี่ชั้นก็ได้) หรือคั่นด้วย comma / ช่องว่าง"""
+    try:
+        values = [float(v) for v in text.replace("[", " ").replace("]", " ").replace(",", " ").split()]
+    except ValueError:
+        values = []
+    if len(values) != count:
+        raise HTTPException(400, error)
+    return values
+
+def parse_landmarks(text: Optional[str]):
+    """
+    5 จุดของหน้า (ตาซ้าย, ตาขวา, จมูก, มุมปากซ้าย, มุมปากขวา) ในพิกัดของภาพที่ crop มา
+    รับได้ทั้ง JSON [[x, y], ...] และตัวเลข 10 ตัวคั่นด้วย comma -> [[x, y] x 5] หรือ None ถ้าไม่ส่งมา
+    """
+    if not text:
+        return None
+    values = parse_numbers(text, 10, "landmarks must be 5 (x, y) points")
+    return [values[i:i + 2] for i in range(0, 10, 2)]
+
+def parse_face_box(text: Optional[str]):
+    """กรอบหน้า [x1, y1, x2, y2] ในพิกัดของภาพที่ crop มา (เมื่อ crop ขยายขอบไว้) หรือ None ถ้าไม่ส่งมา"""
+    if not text:
+        return None
+    error = "bbox must be x1, y1, x2, y2 with x2 > x1 and y2 > y1"
+    x1, y1, x2, y2 = parse_numbers(text, 4, error)
+    if x2 <= x1 or y2 <= y1:
+        raise HTTPException(400, error)
+    return [x1, y1, x2, y2]
+
+def reject(reason: str, **kwargs) -> VerifyResponse:
+    """สร้าง VerifyResponse แบบ reject พร้อมนับเหตุผลลง metrics"""
+    metrics.count_result("reject", reason)
+    return VerifyResponse(status="reject", reason=reason, **kwargs)
+
+async def probe_face(file: UploadFile, analyze=analyze_image):
+    """
+    ขั้นตอนร่วมของ verify ทุกแบบ: อ่านรูป -> Detect + Embed -> Liveness
+    analyze: analyze_image (เฟรมเต็ม) หรือ analyze_crop_image (หน้าที่ crop มาแล้ว)
+    Return: (face_result, None) ถ้าผ่าน หรือ (None, VerifyResponse แบบ reject)
+    """
+    with metrics.stage("upload_read"):
+        image_bytes = await file.read()
+    with metrics.stage("decode"):
+        img = await inference_pool.run(face_service.bytes_to_image, image_bytes)
+
+    if img is None:
+        logger.warning("Verify failed: Invalid image file.")
+        return None, reject("invalid_image")
+
+    # ให้ AI หาใบหน้า (Detect & Crop)
+    face_result = await analyze(img)
+
+    if face_result is None:
+        logger.info("Verify failed: No face detected.")
+        return None, reject("no_face_detected")
+
+    # ภาพไม่ผ่าน Quality Gate (ไม่ได้รัน Embed / Liveness) -> ให้ถ่ายใหม่
+    if not face_result.quality_ok:
+        logger.info(f"Verify failed: Low quality frame {face_result.quality_reasons}.")
+        return None, reject("low_quality", quality=face_result.quality_reasons)
+
+    # Liveness Check (ป้องกันรูปถ่าย/มือถือ)
+    if not face_result.is_real:
+        logger.warning("Verify failed: Spoof detected!")
+        return None, reject("spoof_detected")
+
+    return face_result, None
+
+async def identify(face_result, locker_id: Optional[str], device_id: Optional[str]) -> VerifyResponse:
+    """ขั้นตอนหลังได้ embedding ของ /verify และ /verify/crop: ค้นหาใน Qdrant (ผ่าน cache) -> ตรวจการจอง"""
+    # 4. ค้นหาใน Qdrant
+    # face_result.embedding คือ Vector 512 ตัวเลข
+    # มี locker_id -> ค้นหาแค่ผู้ใช้ที่จองตู้นี้ (ไม่กี่คน) แทนทั้ง Gallery
+    # คนเดิมเพิ่งสแกนผ่านที่อุปกรณ์นี้ -> ใช้ผลเดิมจาก cache
+    device = (device_id, locker_id) if device_id or locker_id else None
+    hit = None
+    if device is not None and settings.DECISION_CACHE_ENABLED:
+        with metrics.stage("decision_cache"):
+            hit = decision_cache.lookup(device, face_result.embedding)
+    if hit is None:
+        # จำ version ก่อนค้นหา: ลงทะเบียน / จอง / ลบ ที่เกิดระหว่างค้นหา -> ผลนี้อาจเก่าแล้ว ห้าม cache
+        version = qdrant_service.generations.version()
+        with metrics.stage("search"):
+            hit = await qdrant_service.asearch_face(face_result.embedding, locker_id=locker_id)
+        if hit is not None and device is not None and settings.DECISION_CACHE_ENABLED:
+            decision_cache.store(device, face_result.embedding, hit, since=version)
+
+    if hit is None:
+        logger.info("Verify failed: Unknown person (Score too low).")
+        return reject("unknown_person")
+
+    # 5. เจอตัวจริง! (Success)
+    user_id = hit.id
+    booked_locker = hit.payload.get("locker_id")
+    
+    if booked_locker is None:
+    # รู้จักหน้านะ แต่ไม่ได้จองตู้ไว้
+        return reject("no_booking_found", user_id=str(hit.id))
+    
+    logger.info(f"Verify Success! User: {user_id}, Locker: {booked_locker}")
+    metrics.count_result("allow")
+    
+    return VerifyResponse(
+        status="allow",
+        user_id=str(user_id),
+        locker_id=str(booked_locker)
+    )
+
 # ---------------------------------------------------------
 # 1. VERIFY ENDPOINT (สำหรับ ESP32 สแกนหน้าเปิดตู้)
 # ---------------------------------------------------------
-@router.post("/register", response_model=EnrollResponse)
+@router.post("/register", response_model=EnrollResponse, dependencies=[Depends(require_ready)])
 async def register_user(
     user_id: int = Form(...),
     file: UploadFile = File(...)
 ):
     """เก็บหน้าและ ID ลงฐานข้อมูล"""
+    metrics.set_pipeline("register")
     # 1. แปลงรูป
     image_bytes = await file.read()
-    img = face_service.bytes_to_image(image_bytes)
+    img = await inference_pool.run(face_service.bytes_to_image, image_bytes)
     if img is None: raise HTTPException(400, "Invalid Image")
 
     # 2. หา Vector
-    face_obj, _ = face_service.detect_one_face(img)
-    if face_obj is None: raise HTTPException(400, "Face not found")
+    face_result = await analyze_image(img)
+    if face_result is None: raise HTTPException(400, "Face not found")
+    if not face_result.quality_ok: raise HTTPException(400, f"Low quality image: {', '.join(face_result.quality_reasons)}")
 
     # 3. บันทึกลง DB (โดยยังไม่มี Locker ID)
-    success = qdrant_service.register_new_user(user_id, face_obj.embedding.tolist())
+    with metrics.stage("upsert"):
+        success = await qdrant_service.aregister_new_user(user_id, face_result.embedding.tolist())
     
     if not success: raise HTTPException(500, "Database Error")
 
@@ -52,78 +184,138 @@ async def book_locker(request: BookingRequest):
     รับ user_id กับ locker_id เพื่อผูกสิทธิ์ (ไม่ต้องถ่ายรูป)
     """
     # เรียกฟังก์ชันอัปเดต Payload ใน Qdrant
-    success = qdrant_service.update_booking(request.user_id, request.locker_id)
+    success = await qdrant_service.aupdate_booking(request.user_id, request.locker_id)
     
     if success:
         return {"status": "success", "message": f"Locker {request.locker_id} assigned to User {request.user_id}"}
     else:
         raise HTTPException(404, "User ID not found or Database error")
     
-@router.post("/verify", response_model=VerifyResponse)
+@router.post("/verify", response_model=VerifyResponse, dependencies=[Depends(require_ready)])
 async def verify_face(
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    locker_id: Optional[str] = Form(None),  # ตู้ที่อุปกรณ์ติดอยู่ (ถ้าส่งมา ค้นหาเฉพาะคนที่จองตู้นี้)
+    device_id: Optional[str] = Form(None)   # ใช้แยก cache ผลล่าสุดของแต่ละอุปกรณ์
 ):
     """
     รับไฟล์ภาพ -> ตรวจ Liveness -> ค้นหาใน DB -> คืนค่า User/Locker ID
     """
+    metrics.set_pipeline("verify")
     try:
-        # 1. อ่านไฟล์รูปภาพ
-        image_bytes = await file.read()
-        img = face_service.bytes_to_image(image_bytes)
-        
-        if img is None:
-            logger.warning("Verify failed: Invalid image file.")
-            return VerifyResponse(status="reject", reason="invalid_image")
+        # 1-3. อ่านรูป -> หาใบหน้า -> Liveness Check
+        face_result, rejection = await probe_face(file)
+        if rejection is not None:
+            return rejection
+
+        # 4-5. ค้นหาใน Qdrant -> ตรวจการจอง
+        return await identify(face_result, locker_id, device_id)
+
+    except Exception as e:
+        logger.error(f"Internal Server Error during verify: {e}")
+        metrics.count_result("error")
+        # กรณี Server พังจริงๆ ให้ส่ง 500 กลับไป
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
+            detail="Internal server error processing image"
+        )
+
+@router.post("/verify/crop", response_model=VerifyResponse, dependencies=[Depends(require_ready)])
+async def verify_crop(
+    file: UploadFile = File(...),            # หน้าที่อุปกรณ์ crop มาแล้ว (เช่น FaceCropper ใน face_detection/camera.py)
+    landmarks: Optional[str] = Form(None),   # 5 จุดในพิกัดของ crop: JSON [[x, y], ...] หรือ "x1,y1,...,x5,y5"
+    bbox: Optional[str] = Form(None),        # กรอบหน้าในพิกัดของ crop "x1,y1,x2,y2" (ส่งเมื่อ crop มี margin)
+    locker_id: Optional[str] = Form(None),
+    device_id: Optional[str] = Form(None)
+):
+    """
+    เหมือน /verify แต่รับหน้าที่ crop มาแล้ว -> ไม่ต้อง decode เฟรมเต็ม และไม่รัน Detector ซ้ำ
+    (Align เป็น 112x112 ตาม landmarks -> Embed + Liveness -> ค้นหาใน DB)
+    """
+    metrics.set_pipeline("verify_crop")
+    kps = parse_landmarks(landmarks)
+    face_box = parse_face_box(bbox)
+    try:
+        face_result, rejection = await probe_face(file, analyze=lambda img: analyze_crop_image(img, kps, face_box))
+        if rejection is not None:
+            return rejection
+
+        return await identify(face_result, locker_id, device_id)
+
+    except Exception as e:
+        logger.error(f"Internal Server Error during crop verify: {e}")
+        metrics.count_result("error")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error processing image"
+        )
+
+@router.post("/verify/claimed", response_model=VerifyResponse, dependencies=[Depends(require_ready)])
+async def verify_claimed(
+    user_id: int = Form(...),             # ID ที่ได้จาก PIN pad / RFID ก่อนสแกนหน้า
+    file: UploadFile = File(...),
+    locker_id: Optional[str] = Form(None)  # ตู้ที่อุปกรณ์ติดอยู่ (ถ้าส่งมา ต้องตรงกับที่จองไว้)
+):
+    """
+    ยืนยันตัวตนแบบ 1:1: เทียบหน้ากับ Vector ของ user_id ที่อ้างมาคนเดียว (ไม่ค้นหาทั้ง Gallery)
+    """
+    metrics.set_pipeline("verify_claimed")
+    try:
+        face_result, rejection = await probe_face(file)
+        if rejection is not None:
+            return rejection
+
+        # ดึง Vector ที่ลงทะเบียนไว้ตาม point id (cache ไว้) แล้วคำนวณ cosine เอง
+        with metrics.stage("fetch_claimed"):
+            stored = await qdrant_service.aget_face(user_id)
+
+        if stored is None:
+            logger.info(f"Claimed verify failed: User {user_id} not enrolled.")
+            return reject("unknown_person")
+
+        with metrics.stage("compare"):
+            score = stored.similarity(face_result.embedding)
+
+        if score < settings.FACE_SIMILARITY_THRESHOLD:
+            logger.info(f"Claimed verify failed: User {user_id} score {score:.4f} below threshold.")
+            return reject("face_mismatch", user_id=str(user_id))
+
+        booked_locker = stored.payload.get("locker_id")
+        if booked_locker is None:
+            return reject("no_booking_found", user_id=str(user_id))
+        if locker_id is not None and str(booked_locker) != locker_id:
+            return reject("wrong_locker", user_id=str(user_id))
+
+        logger.info(f"Claimed verify Success! User: {user_id}, Locker: {booked_locker}, Score: {score:.4f}")
+        metrics.count_result("allow")
 
-        # 2. ให้ AI หาใบหน้า (Detect & Crop)
-        face_obj, face_crop = face_service.detect_one_face(img)
-        
-        if face_obj is None:
-            logger.info("Verify failed: No face detected.")
-            return VerifyResponse(status="reject", reason="no_face_detected")
-
-        # 3. Liveness Check (ป้องกันรูปถ่าย/มือถือ)
-        is_real = face_service.check_liveness(face_crop)
-        if not is_real:
-            logger.warning("Verify failed: Spoof detected!")
-            return VerifyResponse(status="reject", reason="spoof_detected")
-
-        # 4. ค้นหาใน Qdrant
-        # face_obj.embedding คือ Vector 512 ตัวเลข
-        hit = qdrant_service.search_face(face_obj.embedding)
-
-        if hit is None:
-            logger.info("Verify failed: Unknown person (Score too low).")
-            return VerifyResponse(status="reject", reason="unknown_person")
-
-        # 5. เจอตัวจริง! (Success)
-        user_id = hit.id
-        locker_id = hit.payload.get("locker_id")
-        
-        if locker_id is None:
-        # รู้จักหน้านะ แต่ไม่ได้จองตู้ไว้
-            return VerifyResponse(status="reject", reason="no_booking_found", user_id=str(hit.id))
-        
-        logger.info(f"Verify Success! User: {user_id}, Locker: {locker_id}")
-        
         return VerifyResponse(
             status="allow",
             user_id=str(user_id),
-            locker_id=str(locker_id)
+            locker_id=str(booked_locker)
         )
 
     except Exception as e:
-        logger.error(f"Internal Server Error during verify: {e}")
-        # กรณี Server พังจริงๆ ให้ส่ง 500 กลับไป
+        logger.error(f"Internal Server Error during claimed verify: {e}")
+        metrics.count_result("error")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error processing image"
         )
 
+@router.get("/stats/batching")
+async def batching_stats():
+    """ดูสถิติของ Micro-batching (batch size / เวลารอในคิว)"""
+    return face_service.batching_stats()
+
+@router.get("/stats/decision-cache")
+async def decision_cache_stats():
+    """ดู hit rate ของ cache ผลยืนยันล่าสุดต่ออุปกรณ์"""
+    return decision_cache.stats()
+
 # ---------------------------------------------------------
 # 2. ENROLL ENDPOINT (สำหรับลงทะเบียนผ่านเว็บ/แอป)
 # ---------------------------------------------------------
-@router.post("/enroll", response_model=EnrollResponse)
+@router.post("/enroll", response_model=EnrollResponse, dependencies=[Depends(require_ready)])
 async def enroll_face(
     user_id: int = Form(...),    # รับเป็น Form Data
     locker_id: str = Form(...),  # รับเป็น Form Data
@@ -133,26 +325,30 @@ async def enroll_face(
     รับไฟล์ภาพ + ID -> แปลงเป็น Vector -> บันทึกลง DB
     """
     logger.info(f"Enrolling User: {user_id} for Locker: {locker_id}")
+    metrics.set_pipeline("enroll")
     
     try:
         # 1. แปลงไฟล์ภาพ
         image_bytes = await file.read()
-        img = face_service.bytes_to_image(image_bytes)
+        img = await inference_pool.run(face_service.bytes_to_image, image_bytes)
         
         if img is None:
             raise HTTPException(400, "Invalid image file")
 
         # 2. หาใบหน้า (Enrollment ควรเข้มงวด ต้องเจอหน้าชัดๆ)
-        face_obj, _ = face_service.detect_one_face(img)
+        face_result = await analyze_image(img)
         
-        if face_obj is None:
+        if face_result is None:
             raise HTTPException(400, "No face detected in the image. Please try again.")
+        if not face_result.quality_ok:
+            raise HTTPException(400, f"Low quality image ({', '.join(face_result.quality_reasons)}). Please try again.")
 
         # 3. บันทึกลง Qdrant
         # แปลง embedding (numpy array) เป็น list ปกติก่อนส่งให้ JSON
-        embedding_list = face_obj.embedding.tolist()
+        embedding_list = face_result.embedding.tolist()
         
-        success = qdrant_service.upsert_face(user_id, locker_id, embedding_list)
+        with metrics.stage("upsert"):
+            success = await qdrant_service.aupsert_face(user_id, locker_id, embedding_list)
         
         if not success:
             raise HTTPException(500, "Failed to save to database")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 # ---------------------------------------------------------
 # Response Schemas (ข้อมูลที่ Server ส่งกลับ)
@@ -13,6 +13,7 @@ class VerifyResponse(BaseModel):
     reason: Optional[str] = None  # เหตุผลถ้า reject (เช่น "spoof_detected", "unknown_person")
     user_id: Optional[str] = None # ID ของ user (ส่งมาเฉพาะตอน allow)
     locker_id: Optional[str] = None # เบอร์ตู้ (ส่งมาเฉพาะตอน allow)
+    quality: Optional[List[str]] = None # เหตุผลที่ภาพไม่ผ่าน Quality Gate (เช่น "blurry", "too_dark")
 
 class EnrollResponse(BaseModel):
     """
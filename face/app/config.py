@@ -1,4 +1,5 @@
 #import os
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,17 +13,146 @@ class Settings(BaseSettings):
     QDRANT_HOST: str = "localhost" 
     QDRANT_PORT: int = 6333
     COLLECTION_NAME: str = "face_vectors"
+    # ใช้ Qdrant แบบ local mode แทน Server (":memory:" หรือ path ของโฟลเดอร์)
+    # สำหรับ load test / benchmark บนเครื่องเดียว -> ถ้าตั้งค่านี้ QDRANT_HOST / PORT จะไม่ถูกใช้
+    QDRANT_LOCAL_PATH: Optional[str] = None
+
+    # --- Qdrant Client ---
+    # Endpoint ใช้ AsyncQdrantClient (รอ Qdrant โดยไม่ block event loop)
+    # local mode ใช้ไม่ได้ -> จะรัน Client แบบ sync ใน Thread แทน
+    QDRANT_ASYNC: bool = True
+    # gRPC ส่ง Vector เป็น binary (ไม่ต้อง encode float 512 ตัวเป็น JSON ทุกคำสั่ง)
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    # timeout ต่อคำสั่ง (วินาที): Qdrant ช้า/ล่มแล้ว Request ไม่ค้างตาม
+    QDRANT_TIMEOUT_S: float = 2.0
+    # จำนวน connection สูงสุดใน pool ของ Client (REST)
+    QDRANT_POOL_SIZE: int = 32
+
+    # --- Qdrant Collection Tuning ---
+    # ใช้ตอนสร้าง Collection และ migrate Collection เดิมตอน Start (ถ้า QDRANT_MIGRATE_ON_START)
+    QDRANT_HNSW_M: int = 16                  # จำนวน edge ต่อ node: มาก = recall ดีขึ้น แต่ใช้ RAM / เวลา build มากขึ้น
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    QDRANT_HNSW_EF: int = 0                  # ef ตอนค้นหา (0 = ค่า default ของ Qdrant)
+    QDRANT_FULL_SCAN_THRESHOLD_KB: int = 10000
+    QDRANT_ON_DISK: bool = False             # เก็บ Vector แบบ memmap บน disk (Gallery ใหญ่กว่า RAM)
+    QDRANT_ON_DISK_PAYLOAD: bool = True
+    # "none" / "scalar" (int8) / "binary" (1 bit ต่อมิติ)
+    QDRANT_QUANTIZATION: str = "none"
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True
+    QDRANT_QUANTIZATION_RESCORE: bool = True   # คำนวณ score ใหม่ด้วย Vector เต็มสำหรับผู้สมัคร top-k
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0
+    # ค้นหาแบบ exact (brute force) ทุกครั้ง -> เหมาะกับ Gallery เล็ก (ไม่กี่พันคน) recall 100%
+    QDRANT_EXACT_SEARCH: bool = False
+    # Payload index สำหรับ filter (field -> "keyword" / "bool" / "integer")
+    QDRANT_PAYLOAD_INDEXES: Dict[str, str] = {"locker_id": "keyword", "active": "bool"}
+    QDRANT_MIGRATE_ON_START: bool = True
+
+    # --- Vector Backend ---
+    # "qdrant" = ค้นหาผ่าน Qdrant Server ทุกครั้ง
+    # "memory" = โหลด Gallery เข้า RAM แล้วค้นหาแบบ exact ใน Process (ยังเขียนทะลุไป Qdrant เหมือนเดิม)
+    #            ใช้ได้กับ Process เดียวเท่านั้น: Process อื่น (uvicorn --workers / app.prefork หลาย Worker)
+    #            ไม่เห็นการเขียนของกันและกันจนกว่าจะ Restart -> app.prefork ไม่ยอม Start ถ้ามีหลาย Worker
+    VECTOR_BACKEND: str = "qdrant"
     
+    # --- Claimed-identity Verify (1:1) ---
+    # Vector ของผู้ใช้ที่ดึงมาเทียบแบบ 1:1 ถูก cache ไว้ใน Process (ถูกทิ้งเมื่อลงทะเบียน / จอง / ลบ)
+    # Worker ของ app.prefork ทิ้ง cache ตามกันทันทีผ่าน generation ใน Shared Memory (app/services/generations.py)
+    # แต่ uvicorn --workers / หลายเครื่อง ไม่ได้แชร์: ผู้ใช้ที่ถูกลบ / ย้ายตู้ ยังยืนยันผ่านใน Process อื่นได้
+    # นานสุดเท่ากับ TTL -> กรณีนั้นควรลด TTL ลง (หรือตั้ง SIZE = 0 เพื่อปิด)
+    CLAIM_CACHE_SIZE: int = 10000
+    CLAIM_CACHE_TTL_S: float = 300.0
+
+    # --- Recent-decision Cache (สแกนซ้ำที่ตู้เดิมภายในไม่กี่วินาที) ---
+    # หน้าใหม่ที่ใกล้กับหน้าที่เพิ่งยืนยันผ่านบนอุปกรณ์เดียวกัน -> ใช้ผลเดิม ไม่ต้องค้นหาใน Qdrant ซ้ำ
+    # (Liveness ยังรันทุกครั้ง) ควรตั้ง MIN_SIMILARITY สูงกว่า FACE_SIMILARITY_THRESHOLD
+    # ข้าม Process ที่ไม่ได้ fork จาก app.prefork ตัวเดียวกัน: ผลเก่าอยู่ได้นานสุดเท่ากับ TTL (เหมือน CLAIM_CACHE)
+    DECISION_CACHE_ENABLED: bool = True
+    DECISION_CACHE_TTL_S: float = 10.0
+    DECISION_CACHE_MIN_SIMILARITY: float = 0.85  # cosine ระหว่างหน้าใหม่กับหน้าที่ cache ไว้
+    DECISION_CACHE_MAX_DEVICES: int = 1024
+    DECISION_CACHE_PER_DEVICE: int = 4
+    # จำนวนช่องของตัวนับ generation ต่อผู้ใช้ (ผู้ใช้ที่ hash ชนกันแค่ทำให้ cache ถูกทิ้งเกินจำเป็น)
+    GENERATION_SLOTS: int = 4096
+
     # --- AI Model Config ---
     # ความเหมือนขั้นต่ำ (0.0 - 1.0) ยิ่งมากยิ่งแม่นแต่ผ่านยาก
     FACE_SIMILARITY_THRESHOLD: float = 0.75 
     
+    # โมดูลของ buffalo_l ที่จะโหลด (None = โหลดทุกตัว รวม genderage / landmark 2D/3D)
+    # Pipeline ใช้แค่ detection + recognition -> ตัดที่เหลือทิ้งเพื่อลด RAM และเวลา Start
+    INSIGHTFACE_ALLOWED_MODULES: Optional[List[str]] = ["detection", "recognition"]
+
+    # ให้ Detector คืนแค่หน้าที่ใหญ่ที่สุดหน้าเดียว (ไม่ต้อง sort / embed ทุกหน้าในเฟรม)
+    DETECT_SINGLE_FACE: bool = True
+
     # ความมั่นใจว่าเป็นคนจริง (0.0 - 1.0)
     ANTI_SPOOF_THRESHOLD: float = 0.70
     
     # Path ของโมเดล (ควรวางไว้ในโฟลเดอร์ resources)
     ANTI_SPOOF_MODEL_PATH: str = "resources/anti_spoof_model.jit"
-    
+
+    # --- Frame Quality Gate ---
+    # ตรวจคุณภาพแบบถูกๆ ก่อนรันโมเดล: เฟรมมืด/สว่างเกิน ข้าม Detector,
+    # หน้าเล็ก / เบลอ / หันมาก ข้าม Embed + Liveness แล้ว reject เป็น "low_quality"
+    QUALITY_GATE_ENABLED: bool = True
+    QUALITY_MIN_FACE_PX: float = 60.0          # ด้านที่สั้นกว่าของ bbox (พิกเซล)
+    QUALITY_MIN_BLUR_VAR: float = 40.0         # Laplacian variance ของหน้าที่ย่อเป็น 112x112
+    QUALITY_MIN_BRIGHTNESS: float = 40.0       # ความสว่างเฉลี่ยของหน้า (0-255)
+    QUALITY_MAX_BRIGHTNESS: float = 220.0
+    QUALITY_MAX_CLIPPED_FRACTION: float = 0.4  # สัดส่วนพิกเซลที่ดำสนิท / ขาวจนล้น
+    QUALITY_MAX_YAW: float = 35.0              # องศา (ประมาณจาก 5 keypoints)
+    QUALITY_MAX_PITCH: float = 30.0
+    QUALITY_MAX_ROLL: float = 30.0
+    QUALITY_FRAME_MIN_BRIGHTNESS: float = 20.0  # ทั้งเฟรม (ก่อน Detect)
+    QUALITY_FRAME_MAX_BRIGHTNESS: float = 240.0
+    QUALITY_FRAME_STRIDE: int = 8              # สุ่มทุกๆ กี่พิกเซลตอนวัดความสว่างทั้งเฟรม
+
+    # --- Micro-batching (Recognition) ---
+    # รวม Request ที่เข้ามาพร้อมกันแล้วรันโมเดล Recognition ทีเดียวเป็น batch
+    BATCHING_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 16      # จำนวนหน้าสูงสุดต่อ 1 batch
+    BATCH_MAX_WAIT_MS: float = 5.0  # รอรวม batch นานสุดกี่ ms นับจาก Request แรกในคิว
+
+    # --- Inference Executor ---
+    # จำนวน Worker Thread สำหรับงาน CPU-bound (แต่ละตัวมี ONNX/Torch session ของตัวเอง)
+    INFERENCE_WORKERS: int = 2
+
+    # "thread"  = รันโมเดลใน Worker Thread ของ Process นี้
+    # "process" = ส่งเฟรมผ่าน Shared Memory ไปให้ Worker Process (ใช้ได้ทุก Core ไม่ติด GIL)
+    INFERENCE_MODE: str = "thread"
+    PROCESS_WORKERS: int = 2
+    # ขนาด Shared Memory ต่อ Worker (กว้าง x สูง x 3): เฟรมที่ใหญ่กว่านี้ยังใช้ได้แต่ต้องส่งผ่าน Pipe (ช้ากว่า)
+    PROCESS_SHM_FRAME_BYTES: int = 1920 * 1080 * 3
+    # เวลารอผลจาก Worker Process ต่อเฟรม (วินาที): เกินนี้ถือว่า Worker ค้าง -> kill แล้วเปิดตัวใหม่
+    PROCESS_TASK_TIMEOUT_S: float = 10.0
+
+    # --- Preload-and-fork Serving (python -m app.prefork) ---
+    # จำนวน Process ที่ fork จาก Master ที่โหลดโมเดลไว้แล้ว (0 = ไม่ใช้, รัน uvicorn ตามปกติ)
+    # ตั้งโดย app.prefork เอง -> ใช้แบ่ง CPU budget ให้ทุก Process
+    PREFORK_WORKERS: int = 0
+
+    # --- Warm-up / Readiness ---
+    # รัน inference กับเฟรมสังเคราะห์หลัง Start ให้ ONNX/Torch init และจองหน่วยความจำให้เสร็จ
+    # ก่อน Request แรก (/ready จะเป็น false จนกว่าจะเสร็จ)
+    WARMUP_ENABLED: bool = True
+    WARMUP_FRAME_SIZES: List[List[int]] = [[480, 640], [720, 1280]]  # [สูง, กว้าง] ของเฟรมที่กล้องส่งมา
+    WARMUP_ITERATIONS: int = 2
+
+    # --- CPU Thread Budget ---
+    # ONNX Runtime / Torch / OpenCV ต่างคนต่างสร้าง Thread pool ขนาดเท่าจำนวน Core
+    # -> รันพร้อมกันหลาย Worker แล้ว Thread แย่ง Core กัน (tail latency พุ่ง)
+    # เปิดไว้เพื่อแบ่ง Core ให้ Worker แต่ละตัวเท่าๆ กัน (ค่า 0 = ให้ allocator คำนวณเอง)
+    CPU_BUDGET_ENABLED: bool = True
+    CPU_BUDGET: int = 0               # จำนวน Core ที่ให้ Service นี้ใช้ (0 = ทุก Core ที่ Process มองเห็น)
+    ORT_INTRA_OP_THREADS: int = 0
+    ORT_INTER_OP_THREADS: int = 0     # มีผลเฉพาะ ORT_EXECUTION_MODE = "parallel"
+    ORT_GRAPH_OPTIMIZATION: str = "all"       # "disable" / "basic" / "extended" / "all"
+    ORT_EXECUTION_MODE: str = "sequential"    # "sequential" / "parallel"
+    ORT_ALLOW_SPINNING: bool = True   # False = Thread ว่างไม่ busy-wait (ลด CPU ที่เสียไปเมื่อมีหลาย Worker)
+    TORCH_NUM_THREADS: int = 0
+    CV2_NUM_THREADS: int = 0
+
     # --- System Config ---
     # ใช้ 'cuda' ถ้ามี NVIDIA GPU, หรือ 'cpu' ถ้าไม่มี
     DEVICE: str = "cpu" 
@@ -1,10 +1,14 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import Config (จะเขียนในขั้นตอนถัดไป)
 from app.config import settings
+from app import metrics
+from app.readiness import readiness
 
 # Import Router (ตัวจัดการ URL ที่จะเขียนใน app/api/routes.py)
 from app.api.routes import router as api_router
@@ -12,6 +16,9 @@ from app.api.routes import router as api_router
 # Import Service Instances (ตัวแปร Global ที่เราจะสั่งให้โหลดโมเดล)
 from app.services.face_service import face_service
 from app.services.vector_db import qdrant_service
+from app.services.inference_pool import inference_pool
+from app.services.process_pool import process_pool
+from app.services import cpu_budget
 
 # 1. Setup Logging (เพื่อให้เห็น Log เวลาอยู่บน Docker)
 logging.basicConfig(
@@ -20,6 +27,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def warm_up():
+    """
+    รันหลัง Server เปิดรับ Request แล้ว (Health Check ตอบได้ แต่ /ready ยังเป็น false)
+    warm session ของ Worker ทุกตัว + session ที่ Batcher ใช้ แล้วค่อยประกาศว่าพร้อม
+    """
+    try:
+        if settings.WARMUP_ENABLED and settings.INFERENCE_MODE != "process":
+            logger.info("🔥 Warming up models...")
+            with readiness.phase("warmup"):
+                jobs = [asyncio.to_thread(inference_pool.broadcast, face_service.warm_up)]
+                if face_service.batcher is not None:
+                    jobs.append(asyncio.to_thread(face_service.warm_up))
+                await asyncio.gather(*jobs)
+        # (โหมด process: Worker Process warm-up ตัวเองก่อนส่งสัญญาณ ready แล้ว)
+        readiness.mark_ready()
+        logger.info(f"✅ Service ready. Cold start: {readiness.phases}")
+    except Exception as e:
+        logger.error(f"❌ Warm-up failed: {e}")
+        readiness.fail(e)
+
 # 2. Lifespan Manager (ทำงานตอน Start/Stop Server)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -27,26 +54,63 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Server starting... Initializing resources.")
     
     try:
-        # A. โหลดโมเดล AI เข้า RAM (InsightFace + AntiSpoof)
-        # ขั้นตอนนี้อาจใช้เวลา 5-10 วินาที
-        logger.info("⏳ Loading AI Models...")
-        face_service.load_models()
-        logger.info("✅ AI Models loaded successfully.")
+        if settings.INFERENCE_MODE == "process":
+            # A. โหลดโมเดลใน Worker Process แยก (Process นี้ทำแค่ decode + ส่งเฟรมผ่าน Shared Memory)
+            logger.info(f"⏳ Starting {settings.PROCESS_WORKERS} inference worker processes...")
+            with readiness.phase("worker_processes"):
+                process_pool.start()
+            if settings.INFERENCE_WORKERS < settings.PROCESS_WORKERS:
+                logger.warning("⚠️ INFERENCE_WORKERS < PROCESS_WORKERS: some worker processes will stay idle.")
+            # ไม่มี initializer: Thread ใน Process นี้แค่ decode แล้วส่งเฟรมให้ process_pool (ไม่มีโมเดลให้โหลด)
+            inference_pool.start()
+        elif face_service.app is not None:
+            # A. โหมด prefork: Master โหลดโมเดลไว้แล้วก่อน fork (weight ใช้ร่วมกันแบบ copy-on-write)
+            # Worker Thread ใช้ session ชุดเดียวกัน (ไม่โหลดของตัวเอง) และ Thread เบื้องหลังต้องเริ่มใหม่หลัง fork
+            # ไม่ส่ง initializer=load_worker_models โดยตั้งใจ: session ที่โหลดหลัง fork เป็นหน่วยความจำของ Worker เอง
+            # (ไม่แชร์ copy-on-write) คูณจำนวน Thread x จำนวน Worker -> เสียประโยชน์ของการ preload ทั้งหมด
+            # การใช้ร่วมกันปลอดภัย: InferenceSession.run ของ ORT เรียกพร้อมกันหลาย Thread ได้ และ AntiSpoofModel ล็อกเองตอน forward
+            logger.info("✅ Using models preloaded by the prefork master.")
+            if face_service.budget is not None:
+                cpu_budget.apply_thread_budget(face_service.budget)
+            face_service.start_batcher()
+            inference_pool.start()
+        else:
+            # A. โหลดโมเดล AI เข้า RAM (InsightFace + AntiSpoof)
+            # ขั้นตอนนี้อาจใช้เวลา 5-10 วินาที
+            logger.info("⏳ Loading AI Models...")
+            with readiness.phase("load_models"):
+                face_service.load_models()
+            logger.info("✅ AI Models loaded successfully.")
+
+            # เริ่ม Worker สำหรับงาน CPU-bound (แต่ละ Worker โหลด session ของตัวเอง)
+            logger.info(f"⏳ Starting inference pool ({settings.INFERENCE_WORKERS} workers)...")
+            with readiness.phase("worker_models"):
+                inference_pool.start(initializer=face_service.load_worker_models)
 
         # B. เชื่อมต่อ Qdrant และเช็คว่ามี Collection หรือยัง
         logger.info("⏳ Connecting to Qdrant Database...")
-        qdrant_service.init_collection()
+        with readiness.phase("qdrant_init"):
+            qdrant_service.init_collection()
         logger.info("✅ Database connected and collection verified.")
         
     except Exception as e:
         logger.error(f"❌ Critical Error during startup: {e}")
         raise e # ถ้าโหลดโมเดลไม่ผ่าน ให้ Server พังไปเลย (ดีกว่ารันแล้วทำงานไม่ได้)
 
+    # C. Warm-up เบื้องหลัง -> /ready เป็น true เมื่อเสร็จ
+    warmup_task = asyncio.create_task(warm_up())
+
     yield # จุดที่ Server ทำงานปกติรับ Request
 
     # --- SHUTDOWN ZONE ---
     logger.info("🛑 Server shutting down...")
-    # (ถ้ามีการเชื่อมต่อ Database ค้างไว้ สั่งปิดตรงนี้ได้)
+    if not warmup_task.done():
+        warmup_task.cancel()
+    inference_pool.shutdown()
+    process_pool.shutdown()
+    face_service.shutdown()
+    # ปิด connection pool ของ Qdrant
+    await qdrant_service.aclose()
 
 # 3. Create App Instance
 app = FastAPI(
@@ -64,6 +128,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# จับเวลาแต่ละ stage แล้วส่งกลับใน header Server-Timing (ให้ firmware log ได้)
+app.add_middleware(metrics.ServerTimingMiddleware)
+
 # 5. Register Routers (นำเข้า API Endpoints)
 app.include_router(api_router, prefix="/api/v1")
 
@@ -76,6 +143,16 @@ async def health_check():
         "version": settings.VERSION
     }
 
+# Readiness (Load Balancer / Docker ควรส่ง Request มาเมื่อ /ready ตอบ 200 เท่านั้น)
+@app.get("/ready")
+async def ready_check():
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+# 7. Prometheus Metrics (latency ต่อ stage / เหตุผลที่ reject / เวลาโหลดโมเดล)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     # ใช้สำหรับ Debug บนเครื่อง (Production จะรันผ่าน Docker/Uvicorn command)
     import uvicorn
@@ -0,0 +1,132 @@
+"""
+Preload-and-fork serving
+
+Master โหลด buffalo_l + Anti-Spoof ครั้งเดียว แล้ว fork Worker หลายตัว
+Worker ใช้ weight ชุดเดียวกันแบบ copy-on-write (ไม่ต้องโหลดซ้ำทุก Worker แบบ uvicorn --workers)
+
+- session ของ ONNX Runtime ใน Master ต้องเป็น single-thread: Thread pool ไม่ตามไปใน Process ลูกหลัง fork
+- Torch ห้ามรัน inference ก่อน fork (OpenMP pool หลัง fork ค้างได้) -> warm-up ทำใน Worker หลัง fork
+- gc.freeze() ก่อน fork: GC จะไม่ไปแตะ object ของ Master -> หน้า memory ไม่ถูก copy โดยไม่จำเป็น
+- Socket ถูก bind ใน Master แล้วส่งต่อให้ทุก Worker (kernel กระจาย connection ให้เอง)
+
+State ใน Process (หลัง fork แต่ละ Worker มีของตัวเอง):
+- VECTOR_BACKEND=memory ใช้ไม่ได้เมื่อมีหลาย Worker: Index ใน RAM ถูกอัปเดตแค่ใน Worker ที่รับคำสั่งเขียน
+  Worker อื่นจะยังเจอผู้ใช้ที่ถูกลบ / ตู้ที่ถูกย้ายไปแล้ว -> preload() ไม่ยอม Start
+- face_cache / decision_cache ตรวจ generation ของผู้ใช้ใน Shared Memory ที่สร้างใน Master
+  (app/services/generations.py) -> การเขียนใน Worker หนึ่งทำให้ cache ของ Worker อื่นใช้ไม่ได้ทันที
+  ไม่ต้องรอ CLAIM_CACHE_TTL_S / DECISION_CACHE_TTL_S
+
+วิธีรัน:
+    python -m app.prefork --workers 4 --port 8000
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger("app.prefork")
+
+def preload(workers: int):
+    """โหลดโมเดลใน Master (ยังไม่เริ่ม Thread ใดๆ) แล้ว freeze heap ก่อน fork"""
+    settings.PREFORK_WORKERS = workers
+    settings.ORT_INTRA_OP_THREADS = 1
+    settings.ORT_INTER_OP_THREADS = 1
+    settings.ORT_EXECUTION_MODE = "sequential"
+    if settings.INFERENCE_MODE != "thread":
+        raise SystemExit("app.prefork requires INFERENCE_MODE=thread")
+    if settings.VECTOR_BACKEND == "memory" and workers > 1:
+        # Index ใน RAM ของแต่ละ Worker ไม่ได้รับการเขียนของ Worker อื่น (ผู้ใช้ที่ถูกลบยังยืนยันผ่านได้)
+        raise SystemExit("app.prefork with --workers > 1 requires VECTOR_BACKEND=qdrant")
+
+    # import app.main ใน Master -> Worker ไม่ต้อง import FastAPI / Router ซ้ำ
+    from app.main import app
+    from app.readiness import readiness
+    from app.services.face_service import face_service
+
+    started = time.perf_counter()
+    face_service.load_models(start_threads=False)
+    readiness.record("load_models", time.perf_counter() - started)
+
+    gc.collect()
+    gc.freeze()
+    return app
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def spawn_worker(app, sock: socket.socket, index: int, log_level: str) -> int:
+    pid = os.fork()
+    if pid != 0:
+        return pid
+
+    # --- Process ลูก ---
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    logger.info(f"Worker {index} started (pid={os.getpid()})")
+    try:
+        server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+        server.run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+def main(args):
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    sock = bind_socket(args.host, args.port)
+    app = preload(args.workers)
+
+    workers = {spawn_worker(app, sock, i, args.log_level): i for i in range(args.workers)}
+    logger.info(f"🚀 Prefork master (pid={os.getpid()}) serving on {args.host}:{args.port} with {args.workers} workers")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = workers.pop(pid, None)
+        if index is None or stopping:
+            continue
+        # Worker ตาย -> fork ใหม่จาก Master (โมเดลยังอยู่ใน memory ไม่ต้องโหลดใหม่)
+        logger.warning(f"⚠️ Worker {index} (pid={pid}) exited with status {status}, restarting...")
+        workers[spawn_worker(app, sock, index, args.log_level)] = index
+
+    sock.close()
+    logger.info("🛑 Prefork master stopped.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--log-level", default="info")
+    main(parser.parse_args())
@@ -0,0 +1,165 @@
+"""
+ค่าปรับแต่ง Collection ของ Qdrant (HNSW / on-disk / quantization / payload index / search params)
+
+ใช้ทั้งตอนสร้าง Collection ใหม่ และตอน migrate Collection เดิมให้ตรงกับ Settings
+(เทียบ config ปัจจุบันแล้ว update เฉพาะส่วนที่ต่าง -> Qdrant ไม่ต้อง rebuild index ทุกครั้งที่ Start)
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client import models
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_SCHEMAS = {
+    "keyword": models.PayloadSchemaType.KEYWORD,
+    "bool": models.PayloadSchemaType.BOOL,
+    "integer": models.PayloadSchemaType.INTEGER,
+}
+
+@dataclass
+class CollectionTuning:
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_ef: int = 0                   # 0 = ค่า default ของ Qdrant
+    full_scan_threshold: int = 10000   # KB: Segment เล็กกว่านี้ Qdrant ค้นหาแบบ exact เอง
+    on_disk: bool = False
+    on_disk_payload: bool = True
+    quantization: str = "none"         # "none" / "scalar" / "binary"
+    quantization_always_ram: bool = True
+    quantization_rescore: bool = True
+    quantization_oversampling: float = 2.0
+    exact: bool = False
+    payload_indexes: Dict[str, str] = field(default_factory=dict)  # field -> "keyword" / "bool" / "integer"
+
+    @classmethod
+    def from_settings(cls) -> "CollectionTuning":
+        return cls(
+            hnsw_m=settings.QDRANT_HNSW_M,
+            hnsw_ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+            hnsw_ef=settings.QDRANT_HNSW_EF,
+            full_scan_threshold=settings.QDRANT_FULL_SCAN_THRESHOLD_KB,
+            on_disk=settings.QDRANT_ON_DISK,
+            on_disk_payload=settings.QDRANT_ON_DISK_PAYLOAD,
+            quantization=settings.QDRANT_QUANTIZATION,
+            quantization_always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+            quantization_rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+            quantization_oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+            exact=settings.QDRANT_EXACT_SEARCH,
+            payload_indexes=dict(settings.QDRANT_PAYLOAD_INDEXES),
+        )
+
+    # --- ตอนสร้าง / migrate Collection ---
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(
+            m=self.hnsw_m,
+            ef_construct=self.hnsw_ef_construct,
+            full_scan_threshold=self.full_scan_threshold,
+        )
+
+    def quantization_config(self) -> Optional[Any]:
+        if self.quantization == "none":
+            return None
+        if self.quantization == "scalar":
+            # float32 -> int8: RAM ของ Vector ลดลง 4 เท่า recall แทบไม่เปลี่ยน
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.quantization_always_ram,
+                )
+            )
+        if self.quantization == "binary":
+            # 1 bit ต่อมิติ: เร็วสุดแต่ต้อง rescore + oversampling ถึงจะได้ recall ที่ใช้ได้
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=self.quantization_always_ram)
+            )
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION: {self.quantization}")
+
+    def vectors_config(self, size: int) -> models.VectorParams:
+        return models.VectorParams(
+            size=size,
+            distance=models.Distance.COSINE,  # ใช้ Cosine Similarity เหมาะกับ Face Recognition
+            on_disk=self.on_disk,
+        )
+
+    # --- ตอนค้นหา ---
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        if self.exact:
+            # Gallery เล็ก: brute force ถูกกว่าและ recall 100%
+            return models.SearchParams(exact=True)
+        quantization = None
+        if self.quantization != "none":
+            quantization = models.QuantizationSearchParams(
+                rescore=self.quantization_rescore,
+                oversampling=self.quantization_oversampling,
+            )
+        if not self.hnsw_ef and quantization is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.hnsw_ef or None, quantization=quantization)
+
+def create_collection(client: QdrantClient, collection_name: str, size: int, tuning: CollectionTuning):
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=tuning.vectors_config(size),
+        hnsw_config=tuning.hnsw_config(),
+        quantization_config=tuning.quantization_config(),
+        on_disk_payload=tuning.on_disk_payload,
+    )
+    ensure_payload_indexes(client, collection_name, tuning, existing={})
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str, tuning: CollectionTuning,
+                           existing: Optional[Dict[str, Any]] = None):
+    """สร้าง Payload index ที่ยังไม่มี (filter ด้วย locker_id / active จะไม่ต้อง scan ทุก Point)"""
+    if existing is None:
+        existing = client.get_collection(collection_name).payload_schema or {}
+    for field_name, schema in tuning.payload_indexes.items():
+        if field_name in existing:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=PAYLOAD_SCHEMAS[schema],
+            wait=True,
+        )
+        logger.info(f"✅ Payload index '{field_name}' ({schema}) created on '{collection_name}'.")
+
+def migrate_collection(client: QdrantClient, collection_name: str, tuning: CollectionTuning) -> Dict[str, Any]:
+    """
+    ทำให้ Collection ที่มีอยู่แล้วตรงกับ tuning: update เฉพาะส่วนที่ต่างจาก config ปัจจุบัน
+    Return: dict ของสิ่งที่เปลี่ยน (ว่าง = ตรงอยู่แล้ว)
+    """
+    info = client.get_collection(collection_name)
+    config = info.config
+    changes: Dict[str, Any] = {}
+
+    hnsw = config.hnsw_config
+    if (hnsw.m, hnsw.ef_construct, hnsw.full_scan_threshold) != (
+        tuning.hnsw_m, tuning.hnsw_ef_construct, tuning.full_scan_threshold
+    ):
+        changes["hnsw_config"] = tuning.hnsw_config()
+
+    vectors = config.params.vectors
+    if isinstance(vectors, models.VectorParams) and bool(vectors.on_disk) != tuning.on_disk:
+        # Collection นี้ใช้ Vector ไม่มีชื่อ -> key เป็น ""
+        changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=tuning.on_disk)}
+
+    if bool(config.params.on_disk_payload) != tuning.on_disk_payload:
+        changes["collection_params"] = models.CollectionParamsDiff(on_disk_payload=tuning.on_disk_payload)
+
+    wanted = tuning.quantization_config()
+    if wanted != config.quantization_config:
+        changes["quantization_config"] = wanted if wanted is not None else models.Disabled.DISABLED
+
+    if changes:
+        logger.info(f"⏳ Migrating collection '{collection_name}': {sorted(changes)}")
+        client.update_collection(collection_name=collection_name, **changes)
+
+    ensure_payload_indexes(client, collection_name, tuning, existing=info.payload_schema or {})
+    return changes
@@ -0,0 +1,126 @@
+import glob
+import logging
+import os
+from dataclasses import dataclass
+
+import cv2
+import onnxruntime as ort
+import torch
+from insightface.app import FaceAnalysis
+from insightface.model_zoo.model_zoo import ModelRouter
+from insightface.utils import ensure_available
+
+from app.config import settings
+
+# Setup Logger
+logger = logging.getLogger(__name__)
+
+_GRAPH_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+def available_cores() -> int:
+    """จำนวน Core ที่ Process นี้ใช้ได้จริง (เคารพ taskset / cgroup cpuset)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    cores: int
+    units: int          # จำนวนงาน inference ที่รันพร้อมกันได้ (Worker + Batcher)
+    ort_intra: int
+    ort_inter: int
+    torch_threads: int
+    cv2_threads: int
+
+def plan_threads(batching: bool = False) -> ThreadBudget:
+    """
+    แบ่ง Core ให้งาน inference ที่รันพร้อมกัน แต่ละตัวได้ cores // units Thread
+    (detect -> embed -> liveness ของ Request เดียวรันต่อกัน ไม่ซ้อนกัน จึงใช้ก้อนเดียวกันได้)
+    ค่าที่ตั้งไว้ใน Config (> 0) ชนะค่าที่คำนวณได้เสมอ
+    """
+    cores = settings.CPU_BUDGET or available_cores()
+    if settings.INFERENCE_MODE == "process":
+        # แต่ละ Worker Process รับเฟรมทีละเฟรม (ไม่มี Batcher)
+        units = settings.PROCESS_WORKERS
+    else:
+        # Thread ของ Batcher รัน Recognition ขนานกับ Worker -> นับเป็นอีกหนึ่งหน่วย
+        units = settings.INFERENCE_WORKERS + (1 if batching else 0)
+        # โหมด prefork: ทุก Process ที่ fork ออกไปแบ่ง Core ชุดเดียวกัน
+        units *= max(1, settings.PREFORK_WORKERS)
+    units = max(1, units)
+    per_unit = max(1, cores // units)
+
+    return ThreadBudget(
+        cores=cores,
+        units=units,
+        ort_intra=settings.ORT_INTRA_OP_THREADS or per_unit,
+        ort_inter=settings.ORT_INTER_OP_THREADS or 1,
+        torch_threads=settings.TORCH_NUM_THREADS or per_unit,
+        cv2_threads=settings.CV2_NUM_THREADS or per_unit,
+    )
+
+def apply_thread_budget(budget: ThreadBudget):
+    """ตั้งขนาด Thread pool ระดับ Process ของ Torch / OpenCV (เรียกก่อนโหลดโมเดล)"""
+    torch.set_num_threads(budget.torch_threads)
+    try:
+        # ตั้งได้ครั้งเดียวก่อน Torch เริ่มใช้ inter-op pool
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    cv2.setNumThreads(budget.cv2_threads)
+    logger.info(
+        f"🧮 CPU budget: {budget.cores} cores / {budget.units} units -> "
+        f"ort_intra={budget.ort_intra} ort_inter={budget.ort_inter} "
+        f"torch={budget.torch_threads} cv2={budget.cv2_threads}"
+    )
+
+def session_options(budget: ThreadBudget) -> ort.SessionOptions:
+    """SessionOptions สำหรับทุก ONNX session ของ InsightFace (ใช้กับ create_face_analysis)"""
+    if settings.ORT_GRAPH_OPTIMIZATION not in _GRAPH_LEVELS:
+        raise ValueError(f"Unknown ORT_GRAPH_OPTIMIZATION: {settings.ORT_GRAPH_OPTIMIZATION}")
+    if settings.ORT_EXECUTION_MODE not in _EXECUTION_MODES:
+        raise ValueError(f"Unknown ORT_EXECUTION_MODE: {settings.ORT_EXECUTION_MODE}")
+
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = budget.ort_intra
+    opts.inter_op_num_threads = budget.ort_inter
+    opts.graph_optimization_level = _GRAPH_LEVELS[settings.ORT_GRAPH_OPTIMIZATION]
+    opts.execution_mode = _EXECUTION_MODES[settings.ORT_EXECUTION_MODE]
+    if not settings.ORT_ALLOW_SPINNING:
+        opts.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        opts.add_session_config_entry("session.inter_op.allow_spinning", "0")
+    return opts
+
+def create_face_analysis(name: str, allowed_modules, providers, sess_options: ort.SessionOptions) -> FaceAnalysis:
+    """
+    เหมือน FaceAnalysis(name, allowed_modules=..., providers=...) แต่ทุก ONNX session ใช้ sess_options ที่ให้มา
+    (model_zoo.get_model ของ insightface 0.7.x ส่งต่อแค่ providers -> sess_options ใน kwargs จะถูกทิ้ง)
+    """
+    ort.set_default_logger_severity(3)
+    face_app = FaceAnalysis.__new__(FaceAnalysis)
+    face_app.models = {}
+    face_app.model_dir = ensure_available("models", name, root="~/.insightface")
+
+    for onnx_file in sorted(glob.glob(os.path.join(face_app.model_dir, "*.onnx"))):
+        model = ModelRouter(onnx_file).get_model(providers=providers, sess_options=sess_options)
+        if model is None or model.taskname in face_app.models:
+            continue
+        if allowed_modules is not None and model.taskname not in allowed_modules:
+            continue
+        face_app.models[model.taskname] = model
+
+    if "detection" not in face_app.models:
+        raise RuntimeError(f"No detection model found in {face_app.model_dir}")
+    face_app.det_model = face_app.models["detection"]
+    return face_app
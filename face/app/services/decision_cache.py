@@ -0,0 +1,122 @@
+"""
+Cache ผลยืนยันตัวตนล่าสุดของแต่ละอุปกรณ์ (คนเดิมสแกนซ้ำที่ตู้เดิมภายในไม่กี่วินาที)
+
+- Key = อุปกรณ์ (device_id / locker_id) เก็บผลล่าสุดได้ไม่กี่รายการต่ออุปกรณ์
+- หน้าใหม่ที่ cosine กับ embedding ที่ cache ไว้ >= min_similarity -> ใช้ผลเดิมแทนการค้นหาใน Qdrant
+  (Liveness ยังรันทุกครั้ง: cache แทนแค่ "คนนี้คือใคร")
+- เก็บเฉพาะผลที่จับคู่ผู้ใช้ได้ (unknown / error ไม่ถูก cache)
+- ข้อมูลผู้ใช้เปลี่ยน (ลงทะเบียน / จอง / ลบ) -> ทิ้งทุกผลที่ชี้ไปหาผู้ใช้นั้น
+  (Worker อื่นของ app.prefork: ผลที่ generation ของผู้ใช้ไม่ตรงแล้วจะไม่ถูกใช้)
+"""
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+from app import metrics
+from app.config import settings
+from app.services.generations import UserGenerations
+from app.services.ttl_cache import TTLCache
+from app.services.vector_backend import SearchHit, as_point_id
+from app.services.vector_db import qdrant_service
+
+@dataclass
+class CachedDecision:
+    embedding: np.ndarray   # normalize แล้ว
+    hit: SearchHit
+    generation: int         # generation ของผู้ใช้ตอนเก็บ
+
+class DecisionCache:
+    def __init__(self, max_devices: int, per_device: int, ttl_s: float, min_similarity: float,
+                 generations: UserGenerations):
+        self.per_device = per_device
+        self.ttl_s = ttl_s
+        self.min_similarity = min_similarity
+        self.generations = generations
+        self._devices = TTLCache(max_devices, ttl_s)  # device -> TTLCache ของผลล่าสุด
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, device: Hashable, embedding) -> Optional[SearchHit]:
+        """ผลเดิมของหน้าที่ใกล้พอในอุปกรณ์นี้ (None = ไม่มี ต้องค้นหาใหม่)"""
+        recent = self._devices.get(device)
+        best = None
+        if recent is not None:
+            probe = self._normalize(embedding)
+            best_score = self.min_similarity
+            for key, decision in recent.items():
+                if self.generations.get(decision.hit.id) != decision.generation:
+                    # ผู้ใช้ถูกเปลี่ยนใน Worker อื่น -> ผลนี้ใช้ไม่ได้แล้ว
+                    recent.pop(key)
+                    continue
+                score = float(decision.embedding @ probe)
+                if score >= best_score:
+                    best, best_score = decision.hit, score
+
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.count_cache("decision", hit=best is not None)
+        return best
+
+    def store(self, device: Hashable, embedding, hit: SearchHit, since: Optional[int] = None) -> bool:
+        """
+        เก็บผลที่เพิ่งค้นหาได้ (since = generations.version() ก่อนเริ่มค้นหา)
+        Return: False = มีผู้ใช้ถูกเปลี่ยนระหว่างค้นหา ไม่ได้เก็บ (ผลอาจมาจากข้อมูลก่อนเปลี่ยน)
+        """
+        # อ่าน generation ก่อนตรวจ version: ถ้าถูก bump หลังตรวจ ของที่เก็บจะไม่ตรงและถูกทิ้งตอน lookup
+        generation = self.generations.get(hit.id)
+        if since is not None and self.generations.version() != since:
+            return False
+        with self._lock:
+            recent = self._devices.get(device)
+            if recent is None:
+                recent = TTLCache(self.per_device, self.ttl_s)
+            # put ทุกครั้งเพื่อต่ออายุอุปกรณ์ที่ยังใช้งานอยู่
+            self._devices.put(device, recent)
+            recent.put(next(self._seq), CachedDecision(self._normalize(embedding), hit, generation))
+        return True
+
+    def invalidate_user(self, user_id: Any):
+        """ทิ้งทุกผลที่ชี้ไปหา user_id (ทุกอุปกรณ์)"""
+        point_id = as_point_id(user_id)
+        for _, recent in self._devices.items():
+            for key, decision in recent.items():
+                if as_point_id(decision.hit.id) == point_id:
+                    recent.pop(key)
+
+    def clear(self):
+        self._devices.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.DECISION_CACHE_ENABLED,
+            "devices": len(self._devices),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evicted_devices": self._devices.evictions,
+        }
+
+decision_cache = DecisionCache(
+    max_devices=settings.DECISION_CACHE_MAX_DEVICES,
+    per_device=settings.DECISION_CACHE_PER_DEVICE,
+    ttl_s=settings.DECISION_CACHE_TTL_S,
+    min_similarity=settings.DECISION_CACHE_MIN_SIMILARITY,
+    generations=qdrant_service.generations,
+)
+# ลงทะเบียน / จอง / ลบผู้ใช้ -> ผลที่ cache ไว้ของผู้ใช้นั้นใช้ไม่ได้แล้ว
+qdrant_service.add_listener(decision_cache.invalidate_user)
@@ -3,8 +3,20 @@ import numpy as np
 import torch
 import logging
 import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
 from insightface.app import FaceAnalysis
+from insightface.app.common import Face
+from insightface.utils import face_align
 from app.config import settings
+from app import metrics
+from app.services import cpu_budget
+from app.services.quality_gate import QualityReport, quality_gate_from_settings
 
 # Setup Logger
 logger = logging.getLogger(__name__)
@@ -14,6 +26,9 @@ class AntiSpoofModel:
     def __init__(self):
         self.model = None
         self.device = torch.device(settings.DEVICE if torch.cuda.is_available() else "cpu")
+        # Buffer NCHW ที่ใช้ซ้ำทุกครั้ง (ป้องกันด้วย lock เพราะหลาย Thread อาจเรียกพร้อมกัน)
+        self._batch = None
+        self._lock = threading.Lock()
 
     def load(self, model_path: str):
         if not os.path.exists(model_path):
@@ -30,55 +45,307 @@ class AntiSpoofModel:
             raise e
 
     def preprocess(self, face_crop):
-        """เตรียมรูปภาพให้เข้ากับโมเดล (Resize -> Transpose -> Normalize)"""
-        # MiniFASNet ส่วนใหญ่ใช้ 80x80
-        img = cv2.resize(face_crop, (80, 80)) 
-        img = img.transpose((2, 0, 1)) # HWC -> CHW
-        img = torch.from_numpy(img).float().div(255.0).unsqueeze(0)
-        return img.to(self.device)
+        """เตรียมรูปภาพให้เข้ากับโมเดล (Resize -> Transpose -> Normalize) -> Tensor ของผู้เรียกเอง (ไม่ใช้ buffer ร่วม)"""
+        with self._lock:
+            return self.preprocess_batch([face_crop]).clone()
 
-    def is_real(self, face_crop) -> bool:
+    def preprocess_batch(self, face_crops):
+        """
+        เขียนทุก crop ลง Tensor NCHW ที่จองไว้ล่วงหน้า (ขยายเองถ้า batch ใหญ่กว่า)
+        Tensor ที่ได้ชี้ไปที่ buffer ร่วม -> ต้องถือ self._lock ตั้งแต่เรียกจนใช้ Tensor เสร็จ (ดู score_batch)
+        """
+        n = len(face_crops)
+        if self._batch is None or n > self._batch.shape[0]:
+            self._batch = np.empty((max(n, 8), 3, 80, 80), dtype=np.float32)
+
+        for i, crop in enumerate(face_crops):
+            # MiniFASNet ส่วนใหญ่ใช้ 80x80
+            img = cv2.resize(crop, (80, 80))
+            np.multiply(img.transpose((2, 0, 1)), 1.0 / 255.0, out=self._batch[i], casting="unsafe") # HWC -> CHW
+
+        return torch.from_numpy(self._batch[:n]).to(self.device)
+
+    def score_batch(self, face_crops) -> list:
+        """ความน่าจะเป็นว่าเป็นคนจริง (0.0 - 1.0) ของทุก crop ด้วย forward pass ครั้งเดียว"""
         if self.model is None:
-            logger.warning("Anti-Spoof model is not loaded! Skipping check (Returning True).")
-            return True # Fail-safe: ถ้าไม่มีโมเดล ยอมให้ผ่านไปก่อน (หรือจะ False ก็ได้แล้วแต่นโยบาย)
+            logger.warning("Anti-Spoof model is not loaded! Skipping check (Returning 1.0).")
+            return [1.0] * len(face_crops) # Fail-safe: ถ้าไม่มีโมเดล ยอมให้ผ่านไปก่อน (หรือจะ 0.0 ก็ได้แล้วแต่นโยบาย)
+        if not face_crops:
+            return []
 
         try:
-            inp = self.preprocess(face_crop)
-            with torch.no_grad():
-                pred = self.model(inp)
-                score = torch.softmax(pred, dim=1)[0][1].item()
-            
-            return score > settings.ANTI_SPOOF_THRESHOLD
+            with self._lock:
+                inp = self.preprocess_batch(face_crops)
+                with torch.no_grad():
+                    pred = self.model(inp)
+                    return torch.softmax(pred, dim=1)[:, 1].tolist()
         except Exception as e:
             logger.error(f"Error during liveness check: {e}")
-            return False
+            return [0.0] * len(face_crops)
+
+    def score(self, face_crop) -> float:
+        """ความน่าจะเป็นว่าเป็นคนจริง (0.0 - 1.0)"""
+        return self.score_batch([face_crop])[0]
+
+    def is_real(self, face_crop) -> bool:
+        return self.score(face_crop) > settings.ANTI_SPOOF_THRESHOLD
+
+@dataclass
+class FaceAnalysisResult:
+    """
+    ผลรวมของ detect + embed + liveness สำหรับใบหน้าเดียว (ส่งข้าม Process ได้เพราะไม่มีรูปภาพติดไปด้วย)
+    ไม่ผ่าน Quality Gate -> quality_reasons ไม่ว่าง และ embedding = None (ไม่ได้รัน Embed / Liveness)
+    """
+    bbox: Optional[np.ndarray]
+    kps: Optional[np.ndarray]
+    det_score: float
+    embedding: Optional[np.ndarray]
+    liveness_score: float
+    quality_reasons: List[str] = field(default_factory=list)
+
+    @property
+    def quality_ok(self) -> bool:
+        return not self.quality_reasons
+
+    @property
+    def is_real(self) -> bool:
+        return self.liveness_score > settings.ANTI_SPOOF_THRESHOLD
+
+class EmbeddingBatcher:
+    """
+    Micro-batching scheduler สำหรับโมเดล Recognition (ArcFace)
+
+    Request ที่เข้ามาใกล้ๆ กันจะถูกรวมเป็น batch เดียว (รอไม่เกิน max_wait_ms
+    หรือจนครบ max_batch_size) แล้วรัน ONNX ครั้งเดียวต่อ batch
+    """
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._rec_model = None
+        self._thread = None
+
+        # สถิติสำหรับจูน batch size / max wait
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_waits = deque(maxlen=2048)
+        self._total_items = 0
+
+    def start(self, rec_model):
+        self._rec_model = rec_model
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, aligned_crop) -> Future:
+        """ส่งหน้าที่ align แล้ว (112x112) เข้าคิว -> ได้ Future ของ embedding กลับไป"""
+        future = Future()
+        self._queue.put((aligned_crop, future, time.perf_counter()))
+        return future
+
+    def embed(self, aligned_crop):
+        return self.submit(aligned_crop).result()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # ส่งต่อสัญญาณหยุดให้รอบถัดไป
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = self._collect(first)
+            started = time.perf_counter()
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._total_items += len(batch)
+                self._queue_waits.extend(started - item[2] for item in batch)
+
+            try:
+                feats = self._rec_model.get_feat([item[0] for item in batch])
+                for (_, future, _), feat in zip(batch, feats):
+                    future.set_result(feat.flatten())
+            except Exception as e:
+                logger.error(f"Error during batched recognition: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            waits_ms = np.array(self._queue_waits, dtype=np.float64) * 1000.0
+
+        return {
+            "batches": batches,
+            "items": self._total_items,
+            "mean_batch_size": (self._total_items / batches) if batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "queue_wait_ms": {
+                "mean": float(waits_ms.mean()) if waits_ms.size else 0.0,
+                "p50": float(np.percentile(waits_ms, 50)) if waits_ms.size else 0.0,
+                "p95": float(np.percentile(waits_ms, 95)) if waits_ms.size else 0.0,
+                "max": float(waits_ms.max()) if waits_ms.size else 0.0,
+            },
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
 
 class FaceService:
     """Service หลักที่รวบรวมฟังก์ชันเกี่ยวกับใบหน้า"""
-    def __init__(self):
+    def __init__(self, batching: Optional[bool] = None):
         self.app = None
         self.anti_spoof = AntiSpoofModel()
+        # โมเดลประจำ Worker Thread แต่ละตัว (ดู load_worker_models)
+        self._local = threading.local()
+        self.batcher = None
+        # จำนวน Thread ของ ORT / Torch / OpenCV (ถูกคำนวณตอน load_models)
+        self.budget = None
+        # ตรวจคุณภาพเฟรม/หน้าก่อนรันโมเดล (None = ปิด)
+        self.quality_gate = quality_gate_from_settings() if settings.QUALITY_GATE_ENABLED else None
+        if settings.BATCHING_ENABLED if batching is None else batching:
+            self.batcher = EmbeddingBatcher(settings.BATCH_MAX_SIZE, settings.BATCH_MAX_WAIT_MS)
     
-    def load_models(self):
-        """โหลดโมเดลทั้งหมด (ถูกเรียกจาก main.py ตอน start server)"""
+    def load_models(self, start_threads: bool = True):
+        """
+        โหลดโมเดลทั้งหมด (ถูกเรียกจาก main.py ตอน start server)
+        start_threads=False: ยังไม่เริ่ม Thread เบื้องหลัง (ใช้ใน Master ของ app.prefork ก่อน fork)
+        """
         logger.info(f"Loading InsightFace model with device: {settings.DEVICE}...")
         
-        # เลือก Provider ตาม Hardware
-        providers = ['CUDAExecutionProvider'] if settings.DEVICE == 'cuda' else ['CPUExecutionProvider']
-        
         try:
-            # โหลด InsightFace (Buffalo_L คือโมเดลที่มีความแม่นยำสูง)
-            self.app = FaceAnalysis(name="buffalo_l", providers=providers)
-            self.app.prepare(ctx_id=0 if settings.DEVICE == 'cuda' else -1, det_size=(640, 640))
+            # แบ่ง Core ให้ Worker แต่ละตัวก่อนสร้าง session (กัน Thread pool ของแต่ละ library แย่งกัน)
+            if settings.CPU_BUDGET_ENABLED:
+                self.budget = cpu_budget.plan_threads(batching=self.batcher is not None)
+                cpu_budget.apply_thread_budget(self.budget)
+
+            # โหลด InsightFace (Buffalo_L คือโมเดลที่มีความแม่นยำสูง) และ Anti-Spoof Model พร้อมกัน
+            # (ONNX Runtime / TorchScript ปล่อย GIL ระหว่างโหลด -> ใช้เวลาเท่าตัวที่ช้ากว่า)
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-loader") as loader:
+                insightface_future = loader.submit(self._timed_load, "insightface", self._create_face_analysis)
+                anti_spoof_future = loader.submit(
+                    self._timed_load, "anti_spoof", self.anti_spoof.load, settings.ANTI_SPOOF_MODEL_PATH
+                )
+                self.app = insightface_future.result()
+                anti_spoof_future.result()
             logger.info("✅ InsightFace model loaded.")
 
-            # โหลด Anti-Spoof Model
-            self.anti_spoof.load(settings.ANTI_SPOOF_MODEL_PATH)
-            
+            if start_threads:
+                self.start_batcher()
+
         except Exception as e:
             logger.error(f"❌ Critical Error loading models: {e}")
             raise e
 
+    def start_batcher(self):
+        """เริ่ม Thread ของ Batcher (ใช้โมเดล Recognition ตัวเดียวกับ FaceAnalysis)"""
+        if self.batcher is not None:
+            self.batcher.start(self.app.models["recognition"])
+            logger.info(
+                f"✅ Embedding batcher started (max_batch={settings.BATCH_MAX_SIZE}, "
+                f"max_wait={settings.BATCH_MAX_WAIT_MS}ms)"
+            )
+
+    def _timed_load(self, name: str, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model=name)
+        return result
+
+    def _create_face_analysis(self, allowed_modules=None):
+        # เลือก Provider ตาม Hardware
+        providers = ['CUDAExecutionProvider'] if settings.DEVICE == 'cuda' else ['CPUExecutionProvider']
+
+        if allowed_modules is None:
+            allowed_modules = settings.INSIGHTFACE_ALLOWED_MODULES
+
+        if self.budget is not None:
+            sess_options = cpu_budget.session_options(self.budget)
+            face_app = cpu_budget.create_face_analysis("buffalo_l", allowed_modules, providers, sess_options)
+        else:
+            face_app = FaceAnalysis(name="buffalo_l", allowed_modules=allowed_modules, providers=providers)
+        face_app.prepare(ctx_id=0 if settings.DEVICE == 'cuda' else -1, det_size=(640, 640))
+        return face_app
+
+    def load_worker_models(self):
+        """
+        โหลด ONNX/Torch session ชุดใหม่ให้ Thread ปัจจุบัน
+        ถูกเรียกเป็น initializer ของ Inference Pool เพื่อให้แต่ละ Worker มี session ของตัวเอง
+        """
+        # ถ้าเปิด Batcher อยู่ Recognition จะรันใน Thread ของ Batcher -> Worker ต้องการแค่ Detector
+        allowed_modules = ["detection"] if self.batcher is not None else None
+        self._local.app = self._create_face_analysis(allowed_modules)
+
+        anti_spoof = AntiSpoofModel()
+        anti_spoof.load(settings.ANTI_SPOOF_MODEL_PATH)
+        self._local.anti_spoof = anti_spoof
+        logger.info(f"✅ Worker models loaded for {threading.current_thread().name}")
+
+    def warm_up(self) -> float:
+        """
+        รันทุกโมเดลที่ Thread นี้ใช้ด้วยเฟรมสังเคราะห์ ทุกขนาดใน WARMUP_FRAME_SIZES
+        ให้ lazy-init / การจองหน่วยความจำของ ONNX Runtime และ Torch เกิดตอนนี้ ไม่ใช่ตอน Request แรก
+        Return: เวลาที่ใช้ (วินาที)
+        """
+        started = time.perf_counter()
+        face_app = self._get_app()
+        anti_spoof = self._get_anti_spoof()
+        rng = np.random.default_rng(0)
+        max_num = 1 if settings.DETECT_SINGLE_FACE else 0
+        aligned = rng.integers(0, 256, size=(112, 112, 3), dtype=np.uint8)
+
+        for _ in range(settings.WARMUP_ITERATIONS):
+            for height, width in settings.WARMUP_FRAME_SIZES:
+                frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+                self._detect_faces(face_app, frame, max_num)
+
+            rec_model = face_app.models.get("recognition")
+            if rec_model is not None:
+                rec_model.get_feat([aligned])
+                if self.batcher is not None and face_app is self.app:
+                    # session นี้ถูก Batcher ใช้ -> warm batch ใหญ่สุดด้วย
+                    rec_model.get_feat([aligned] * settings.BATCH_MAX_SIZE)
+            elif self.batcher is not None:
+                self.batcher.embed(aligned)
+
+            if anti_spoof.model is not None:
+                anti_spoof.score_batch([aligned])
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"🔥 Warm-up finished on {threading.current_thread().name} in {elapsed:.2f}s")
+        return elapsed
+
+    def _get_app(self):
+        return getattr(self._local, "app", None) or self.app
+
+    def _get_anti_spoof(self):
+        return getattr(self._local, "anti_spoof", None) or self.anti_spoof
+
+    def shutdown(self):
+        """ปิด Thread เบื้องหลัง (ถูกเรียกจาก main.py ตอนปิด Server)"""
+        if self.batcher is not None:
+            self.batcher.stop()
+
     def bytes_to_image(self, image_bytes: bytes):
         """Helper: แปลง Bytes เป็น OpenCV Image"""
         try:
@@ -94,29 +361,164 @@ class FaceService:
         หาใบหน้าในรูป 
         Return: (face_object, face_crop_image) หรือ (None, None)
         """
-        if self.app is None:
+        target_face = self._find_face(img)
+        if target_face is None:
+            return None, None
+
+        self._embed_face(img, target_face)
+        return target_face, self._crop_face(img, target_face.bbox)
+
+    def _find_face(self, img):
+        """Detect แล้วคืนใบหน้าที่ใหญ่ที่สุด (None ถ้าไม่เจอ)"""
+        face_app = self._get_app()
+        if face_app is None:
             raise RuntimeError("Face Models are not loaded! Check startup logs.")
 
-        faces = self.app.get(img)
+        # รันแค่ Detector ก่อน (ไม่ผ่าน FaceAnalysis.get ที่จะรันทุกโมดูลกับทุกหน้า)
+        max_num = 1 if settings.DETECT_SINGLE_FACE else 0
+        with metrics.stage("detect"):
+            faces = self._detect_faces(face_app, img, max_num)
         
         if not faces:
-            return None, None
+            return None
 
-        # เลือกใบหน้าที่ใหญ่ที่สุด (กรณีมีหลายคนในเฟรม)
-        target_face = sorted(faces, key=lambda x: (x.bbox[2]-x.bbox[0]) * (x.bbox[3]-x.bbox[1]), reverse=True)[0]
-        
+        # เลือกใบหน้าที่ใหญ่ที่สุด (กรณีมีหลายคนในเฟรม) -> ถ้า max_num=1 Detector เลือกให้แล้ว
+        if len(faces) == 1:
+            return faces[0]
+        return sorted(faces, key=lambda x: (x.bbox[2]-x.bbox[0]) * (x.bbox[3]-x.bbox[1]), reverse=True)[0]
+
+    def _embed_face(self, img, target_face):
+        # Embed เฉพาะหน้าที่เลือก (ข้าม attribute heads เช่น genderage / landmark)
+        with metrics.stage("embed"):
+            if self.batcher is not None:
+                # Align หน้าเป็น 112x112 แล้วส่งเข้าคิว batch ของ Recognition
+                aligned = face_align.norm_crop(img, landmark=target_face.kps, image_size=112)
+                target_face.embedding = self.batcher.embed(aligned)
+            else:
+                self._get_app().models["recognition"].get(img, target_face)
+
+    def _crop_face(self, img, bbox):
         # Crop ภาพใบหน้าเพื่อส่งไปตรวจ Liveness
-        bbox = target_face.bbox.astype(int)
+        bbox = bbox.astype(int)
         h, w, _ = img.shape
         x1, y1 = max(0, bbox[0]), max(0, bbox[1])
         x2, y2 = min(w, bbox[2]), min(h, bbox[3])
-        face_crop = img[y1:y2, x1:x2]
+        return img[y1:y2, x1:x2]
+
+    def _detect_faces(self, face_app, img, max_num: int = 0):
+        """รันเฉพาะ Detector (max_num=1 -> คืนแค่หน้าที่ใหญ่ที่สุด)"""
+        bboxes, kpss = face_app.det_model.detect(img, max_num=max_num, metric='max')
+        faces = []
+        for i in range(bboxes.shape[0]):
+            kps = kpss[i] if kpss is not None else None
+            faces.append(Face(bbox=bboxes[i, 0:4], kps=kps, det_score=bboxes[i, 4]))
+        return faces
 
-        return target_face, face_crop
+    def batching_stats(self) -> dict:
+        """สถิติ batch size / queue wait ของ Batcher (ไว้จูน Config)"""
+        if self.batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batcher.stats()}
 
     def check_liveness(self, face_crop) -> bool:
         """Wrapper สำหรับเรียก Anti-Spoof"""
-        return self.anti_spoof.is_real(face_crop)
+        return self._get_anti_spoof().is_real(face_crop)
+
+    def liveness_score(self, face_crop) -> float:
+        return self._get_anti_spoof().score(face_crop)
+
+    def liveness_scores(self, face_crops) -> list:
+        """คะแนน liveness ของหลาย crop (เช่นหลายเฟรมต่อการสแกน) ใน forward pass เดียว"""
+        return self._get_anti_spoof().score_batch(face_crops)
+
+    def _check_quality(self, check, *args) -> QualityReport:
+        with metrics.stage("quality"):
+            report = check(*args)
+        for reason in report.reasons:
+            metrics.QUALITY_REJECTS.inc(reason=reason)
+        return report
+
+    def analyze(self, img) -> Optional[FaceAnalysisResult]:
+        """
+        Detect -> Embed -> Liveness ของใบหน้าที่ใหญ่ที่สุด (None ถ้าไม่เจอหน้า)
+        เปิด Quality Gate: เฟรม/หน้าที่ไม่ผ่านจะหยุดก่อนโมเดลถัดไป แล้วคืนผลที่มี quality_reasons
+        """
+        gate = self.quality_gate
+        if gate is not None:
+            report = self._check_quality(gate.check_frame, img)
+            if not report.passed:
+                return FaceAnalysisResult(bbox=None, kps=None, det_score=0.0, embedding=None,
+                                          liveness_score=0.0, quality_reasons=report.reasons)
+
+        face_obj = self._find_face(img)
+        if face_obj is None:
+            return None
+
+        bbox = np.asarray(face_obj.bbox, dtype=np.float32)
+        kps = None if face_obj.kps is None else np.asarray(face_obj.kps, dtype=np.float32)
+        face_crop = self._crop_face(img, face_obj.bbox)
+
+        if gate is not None:
+            report = self._check_quality(gate.check_face, face_crop, bbox, kps)
+            if not report.passed:
+                return FaceAnalysisResult(bbox=bbox, kps=kps, det_score=float(face_obj.det_score), embedding=None,
+                                          liveness_score=0.0, quality_reasons=report.reasons)
+
+        self._embed_face(img, face_obj)
+        with metrics.stage("liveness"):
+            liveness_score = self.liveness_score(face_crop)
+
+        return FaceAnalysisResult(
+            bbox=bbox,
+            kps=kps,
+            det_score=float(face_obj.det_score),
+            embedding=np.asarray(face_obj.embedding, dtype=np.float32),
+            liveness_score=liveness_score,
+        )
+
+    def analyze_crop(self, face_crop, kps=None, bbox=None) -> FaceAnalysisResult:
+        """
+        หน้าที่ Client crop มาแล้ว (ไม่รัน Detector): Align 112x112 -> Embed -> Liveness
+        kps: 5 จุด (ตาซ้าย, ตาขวา, จมูก, มุมปากซ้าย, มุมปากขวา) ในพิกัดของ crop
+             None = วาง template ของ ArcFace ลงบนกรอบหน้าตรงๆ (แม่นน้อยกว่าส่งจุดมา)
+        bbox: กรอบหน้า [x1, y1, x2, y2] ในพิกัดของ crop เมื่อ Client ขยายขอบ (margin) ไว้ให้ Align
+              None = ทั้ง crop คือกรอบหน้าพอดีๆ
+        Quality Gate (ขนาดหน้า / เบลอ / แสง) และ Liveness ดูเฉพาะในกรอบหน้า เหมือนหน้าที่ /verify Detect เจอ
+        """
+        h, w = face_crop.shape[:2]
+        if bbox is None:
+            bbox = np.array([0, 0, w, h], dtype=np.float32)
+        bbox = np.asarray(bbox, dtype=np.float32).reshape(4)
+        face_img = self._crop_face(face_crop, bbox)
+        if kps is None:
+            scale = np.array([(bbox[2] - bbox[0]) / 112.0, (bbox[3] - bbox[1]) / 112.0], dtype=np.float32)
+            kps = face_align.arcface_dst * scale + bbox[:2]
+        kps = np.asarray(kps, dtype=np.float32).reshape(5, 2)
+
+        gate = self.quality_gate
+        if gate is not None:
+            report = self._check_quality(gate.check_face, face_img, bbox, kps)
+            if not report.passed:
+                return FaceAnalysisResult(bbox=bbox, kps=kps, det_score=0.0, embedding=None,
+                                          liveness_score=0.0, quality_reasons=report.reasons)
+
+        with metrics.stage("align"):
+            aligned = face_align.norm_crop(face_crop, landmark=kps, image_size=112)
+        with metrics.stage("embed"):
+            if self.batcher is not None:
+                embedding = self.batcher.embed(aligned)
+            else:
+                embedding = self._get_app().models["recognition"].get_feat(aligned).flatten()
+        with metrics.stage("liveness"):
+            liveness_score = self.liveness_score(face_img)
+
+        return FaceAnalysisResult(
+            bbox=bbox,
+            kps=kps,
+            det_score=1.0,  # ไม่ได้ Detect ที่ Server: ถือตามที่ Client ตรวจมาแล้ว
+            embedding=np.asarray(embedding, dtype=np.float32),
+            liveness_score=liveness_score,
+        )
 
 # Create Singleton Instance
 # บรรทัดนี้สำคัญ: เราสร้าง object ไว้เลยเพื่อให้ไฟล์อื่น import ไปใช้ตัวเดียวกัน
@@ -0,0 +1,40 @@
+"""
+เลข generation ต่อผู้ใช้ที่ทุก Worker ของ app.prefork เห็นตรงกัน (ใช้ตรวจว่าของใน cache ยังใช้ได้หรือไม่)
+
+- เขียน Qdrant สำเร็จ (ลงทะเบียน / จอง / ลบ) -> bump(user_id)
+- ของใน cache ถูกเก็บพร้อม generation ของผู้ใช้ ณ ตอนที่อ่านมา -> ไม่ตรงกับตอนนี้ = ข้อมูลเปลี่ยนแล้ว ห้ามใช้
+- ตัวนับอยู่ใน Shared Memory ที่สร้างตอน import (ใน Master ก่อน fork) -> Worker ทุกตัวเห็นการ bump
+  ของ Worker อื่นทันทีในการ lookup ครั้งถัดไป ไม่ต้องรอ TTL
+- ผู้ใช้หลายคนอาจชนช่องเดียวกัน (hash) -> แค่ทิ้ง cache เกินจำเป็น ไม่มีทางได้ของเก่ากลับไป
+
+ไม่ครอบคลุม Process ที่ไม่ได้ fork จาก Master เดียวกัน (uvicorn --workers, หลายเครื่อง):
+กรณีนั้น Process อื่นยังใช้ของใน cache ได้จนหมด TTL (ดู CLAIM_CACHE_TTL_S / DECISION_CACHE_TTL_S)
+"""
+import ctypes
+import multiprocessing as mp
+import zlib
+
+from app.services.vector_backend import as_point_id
+
+class UserGenerations:
+    def __init__(self, slots: int = 4096):
+        self.slots = slots
+        # ช่องสุดท้าย = ตัวนับรวม (เพิ่มทุกครั้งที่ผู้ใช้คนไหนก็ตามเปลี่ยน)
+        self._counters = mp.Array(ctypes.c_uint64, slots + 1)
+
+    def _slot(self, user_id) -> int:
+        # crc32 แทน hash(): hash ของ str สุ่ม seed ต่อ Process
+        return zlib.crc32(str(as_point_id(user_id)).encode()) % self.slots
+
+    def get(self, user_id) -> int:
+        return self._counters[self._slot(user_id)]
+
+    def version(self) -> int:
+        """ตัวนับรวม: ไม่เปลี่ยนระหว่างสองจุด = ไม่มีผู้ใช้คนไหนเปลี่ยนเลยในช่วงนั้น"""
+        return self._counters[self.slots]
+
+    def bump(self, user_id):
+        slot = self._slot(user_id)
+        with self._counters.get_lock():
+            self._counters[slot] += 1
+            self._counters[self.slots] += 1
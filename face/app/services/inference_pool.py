@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app.config import settings
+
+# Setup Logger
+logger = logging.getLogger(__name__)
+
+class InferencePool:
+    """
+    Executor ขนาดจำกัดสำหรับงาน CPU-bound (decode / detect / liveness)
+    เพื่อไม่ให้ Event Loop ของ FastAPI โดนบล็อก -> Request อื่น (เช่น Health Check) ยังตอบได้ทันที
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self, initializer: Optional[Callable] = None):
+        """
+        สร้าง Executor และบังคับให้ Worker ทุกตัวเกิดขึ้นทันที
+        (initializer เช่น face_service.load_worker_models จะได้รันตอน Start ไม่ใช่ตอน Request แรก)
+        """
+        if self._executor is not None:
+            return
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference",
+            initializer=initializer,
+        )
+
+        # ThreadPoolExecutor สร้าง Thread แบบ lazy -> ส่งงานที่รอกันเองเข้าไปให้ครบทุก Worker
+        barrier = threading.Barrier(self.max_workers)
+        futures = [self._executor.submit(barrier.wait) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+        logger.info(f"✅ Inference pool started with {self.max_workers} workers.")
+
+    def broadcast(self, fn: Callable) -> list:
+        """รัน fn หนึ่งครั้งบน Worker ทุกตัว (เช่น warm-up session ของแต่ละ Thread) แบบ blocking"""
+        if self._executor is None:
+            raise RuntimeError("Inference pool is not started! Check startup logs.")
+
+        # Worker ที่ทำเสร็จแล้วต้องรอที่ Barrier -> รับงานซ้ำไม่ได้ ทุกตัวจึงได้คนละ 1 ครั้งพอดี
+        barrier = threading.Barrier(self.max_workers)
+
+        def task():
+            try:
+                return fn()
+            finally:
+                barrier.wait()
+
+        futures = [self._executor.submit(task) for _ in range(self.max_workers)]
+        return [future.result() for future in futures]
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """รัน fn ใน Worker แล้ว await ผลลัพธ์"""
+        if self._executor is None:
+            raise RuntimeError("Inference pool is not started! Check startup logs.")
+
+        loop = asyncio.get_running_loop()
+        # ส่ง context ของ Request ไปด้วย (metrics ของ stage ที่รันใน Worker จะได้เข้า Server-Timing)
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, ctx.run, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# Singleton Instance
+inference_pool = InferencePool(settings.INFERENCE_WORKERS)
@@ -0,0 +1,236 @@
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from app import metrics
+from app.config import settings
+from app.services.face_service import FaceAnalysisResult
+
+# Setup Logger
+logger = logging.getLogger(__name__)
+
+class WorkerCrashedError(RuntimeError):
+    """Worker Process ตายระหว่างประมวลผลเฟรม"""
+
+class WorkerTimeoutError(RuntimeError):
+    """Worker Process ไม่ตอบภายใน PROCESS_TASK_TIMEOUT_S (ถูก kill และเปิดตัวใหม่แล้ว)"""
+
+def _worker_main(shm_name: str, conn):
+    """
+    Entry point ของ Inference Worker Process
+    โหลดโมเดลครั้งเดียว แล้วรอรับ (task, shape, kps, bbox, frame) ผ่าน Pipe
+    ตัวภาพอยู่ใน Shared Memory (frame = None) ยกเว้นเฟรมที่ใหญ่เกิน slot จะมากับ Pipe เลย
+    task = "analyze" (เฟรมเต็ม) หรือ "crop" (หน้าที่ Client crop มาแล้ว)
+    ตอบกลับ (status, ผลลัพธ์, เวลาแต่ละ stage) -> API Process บันทึกเวลาลง metrics ของ Request ต่อ
+    """
+    # import ในนี้เพื่อให้ Process ลูกโหลดโมเดลเอง (ไม่ต้อง pickle อะไรข้ามมา)
+    from app.services.face_service import FaceService
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # Worker รับเฟรมทีละเฟรมอยู่แล้ว -> ไม่ต้องใช้ Batcher
+    service = FaceService(batching=False)
+    service.load_models()
+    if settings.WARMUP_ENABLED:
+        service.warm_up()
+    conn.send(("ready", None))
+
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            task, shape, kps, bbox, frame = message
+
+            if frame is None:
+                # view ตรงเข้า Shared Memory (ไม่มีการ copy หรือ pickle ภาพ)
+                img = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            else:
+                img = frame
+            del frame
+            # metrics ของ Process นี้ไม่มีใคร scrape -> เก็บเวลาแต่ละ stage ส่งกลับไปพร้อมผลลัพธ์
+            with metrics.capture() as timings:
+                try:
+                    if task == "crop":
+                        result = service.analyze_crop(img, kps, bbox)
+                    else:
+                        result = service.analyze(img)
+                    reply = ("ok", result)
+                except Exception as e:
+                    reply = ("error", str(e))
+                finally:
+                    del img
+            conn.send(reply + (timings,))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        shm.close()
+
+class _WorkerSlot:
+    """Worker 1 ตัว + Shared Memory ประจำตัว"""
+    def __init__(self, index: int, slot_bytes: int):
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_bytes)
+        self.process = None
+        self.conn = None
+
+class ProcessInferencePool:
+    """
+    Pool ของ Inference Worker Process
+
+    - API Process decode ภาพเอง แล้ว copy เฟรมลง Shared Memory ของ Worker ที่ว่าง
+      (เฟรมที่ใหญ่กว่า slot_bytes เช่นภาพ 4K ส่งผ่าน Pipe แทน: ช้ากว่าแต่ไม่ต้องย่อภาพ -> พิกัดผลลัพธ์ไม่เพี้ยน)
+    - ส่งแค่ shape ผ่าน Pipe -> ได้ bbox / embedding / liveness score กลับมา
+    - ถ้า Worker ตาย จะถูก start ใหม่ (โหลดโมเดลใหม่) โดยอัตโนมัติ
+    - ถ้า Worker ไม่ตอบภายใน task_timeout -> kill แล้ว start ใหม่ (Request นั้น error ไม่ลองซ้ำ)
+    """
+    def __init__(self, num_workers: int, slot_bytes: int, ready_timeout: float = 300.0,
+                 task_timeout: float = 10.0):
+        self.num_workers = max(1, num_workers)
+        self.slot_bytes = slot_bytes
+        self.ready_timeout = ready_timeout
+        self.task_timeout = task_timeout
+        self._ctx = mp.get_context("spawn")
+        self._slots = []
+        self._free = queue.Queue()
+        self._restart_lock = threading.Lock()
+
+    def start(self):
+        if self._slots:
+            return
+
+        # เปิดทุก Process ก่อนแล้วค่อยรอ -> Worker โหลดโมเดลพร้อมกัน (Start ไม่ช้าตามจำนวน Worker)
+        pending = []
+        for i in range(self.num_workers):
+            slot = _WorkerSlot(i, self.slot_bytes)
+            self._slots.append(slot)
+            pending.append((slot, self._launch(slot)))
+        for slot, (process, conn) in pending:
+            self._wait_ready(slot, process, conn)
+            self._free.put(slot)
+        logger.info(f"✅ Process inference pool started with {self.num_workers} workers.")
+
+    def _spawn(self, slot: _WorkerSlot):
+        process, conn = self._launch(slot)
+        self._wait_ready(slot, process, conn)
+
+    def _launch(self, slot: _WorkerSlot):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(slot.shm.name, child_conn),
+            name=f"inference-worker-{slot.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _wait_ready(self, slot: _WorkerSlot, process, parent_conn):
+        if not parent_conn.poll(self.ready_timeout):
+            process.terminate()
+            raise RuntimeError(f"Inference worker {slot.index} did not become ready.")
+        parent_conn.recv()
+
+        slot.process = process
+        slot.conn = parent_conn
+        logger.info(f"Inference worker {slot.index} ready (pid={process.pid})")
+
+    def _restart(self, slot: _WorkerSlot):
+        with self._restart_lock:
+            logger.warning(f"⚠️ Restarting inference worker {slot.index}...")
+            if slot.process is not None and slot.process.is_alive():
+                slot.process.terminate()
+            if slot.process is not None:
+                slot.process.join(timeout=5)
+            if slot.conn is not None:
+                slot.conn.close()
+            self._spawn(slot)
+
+    def _run_on(self, slot: _WorkerSlot, img: np.ndarray, task: str, kps, bbox):
+        if slot.process is None or not slot.process.is_alive():
+            self._restart(slot)
+
+        if img.nbytes <= self.slot_bytes:
+            frame = np.ndarray(img.shape, dtype=np.uint8, buffer=slot.shm.buf)
+            frame[...] = img
+            del frame
+            inline = None
+        else:
+            inline = np.ascontiguousarray(img)
+
+        try:
+            slot.conn.send((task, img.shape, kps, bbox, inline))
+            answered = slot.conn.poll(self.task_timeout)
+            if answered:
+                status, payload, timings = slot.conn.recv()
+        except (EOFError, BrokenPipeError, ConnectionResetError, OSError) as e:
+            raise WorkerCrashedError(f"Inference worker {slot.index} crashed: {e}")
+
+        if not answered:
+            # Worker ค้าง (เช่น Torch / ORT deadlock) -> ไม่ให้ Thread ของ Pool ค้างตามไปตลอด
+            self._restart(slot)
+            raise WorkerTimeoutError(f"Inference worker {slot.index} did not answer within {self.task_timeout}s")
+
+        for name, seconds in timings:
+            metrics.record_stage(name, seconds)
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def infer(self, img: np.ndarray) -> Optional[FaceAnalysisResult]:
+        """ส่งเฟรม (BGR uint8) ไปประมวลผลใน Worker ที่ว่าง (blocking)"""
+        return self._submit(img, "analyze")
+
+    def infer_crop(self, face_crop: np.ndarray, kps=None, bbox=None) -> FaceAnalysisResult:
+        """ส่งหน้าที่ crop มาแล้ว (+ 5 จุด / กรอบหน้าถ้ามี) ไป Align -> Embed -> Liveness ใน Worker ที่ว่าง"""
+        return self._submit(face_crop, "crop", kps, bbox)
+
+    def _submit(self, img: np.ndarray, task: str, kps=None, bbox=None):
+        if img.dtype != np.uint8:
+            raise ValueError("Frame must be uint8")
+        if img.nbytes > self.slot_bytes:
+            logger.debug(f"Frame larger than shared memory slot ({img.nbytes} > {self.slot_bytes} bytes), sending over pipe")
+
+        slot = self._free.get()
+        try:
+            try:
+                return self._run_on(slot, img, task, kps, bbox)
+            except WorkerCrashedError as e:
+                # Worker ตาย -> เปิดตัวใหม่แล้วลองอีกครั้งเดียว
+                logger.error(f"❌ {e}")
+                self._restart(slot)
+                return self._run_on(slot, img, task, kps, bbox)
+        finally:
+            self._free.put(slot)
+
+    def shutdown(self):
+        for slot in self._slots:
+            try:
+                if slot.process is not None and slot.process.is_alive():
+                    slot.conn.send(None)
+                    slot.process.join(timeout=5)
+                    if slot.process.is_alive():
+                        slot.process.terminate()
+            except (BrokenPipeError, OSError):
+                pass
+            slot.shm.close()
+            slot.shm.unlink()
+        self._slots = []
+        self._free = queue.Queue()
+
+# Singleton Instance (ใช้เมื่อ settings.INFERENCE_MODE == "process")
+process_pool = ProcessInferencePool(
+    settings.PROCESS_WORKERS,
+    settings.PROCESS_SHM_FRAME_BYTES,
+    task_timeout=settings.PROCESS_TASK_TIMEOUT_S,
+)
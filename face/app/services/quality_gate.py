@@ -0,0 +1,10 @@
+"""
+Quality Gate ของ Face Locker API -> ตัว implementation อยู่ที่ common/quality_gate.py
+ที่นี่แค่อ่าน threshold จาก app.config.settings (QUALITY_MIN_FACE_PX, QUALITY_MAX_YAW, ...)
+"""
+from common.quality_gate import QualityGate, QualityReport, estimate_pose  # noqa: F401
+
+from app.config import settings
+
+def quality_gate_from_settings() -> QualityGate:
+    return QualityGate.from_config(lambda key: getattr(settings, key, None))
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
+
+class TTLCache:
+    """
+    Cache ขนาดจำกัดแบบ LRU + หมดอายุตามเวลา (thread-safe)
+
+    - get() ของที่หมดอายุแล้ว = ไม่มี (และลบทิ้งทันที)
+    - put() เกิน max_size -> ไล่ตัวที่ใช้ล่าสุดนานที่สุดออก
+    """
+
+    def __init__(self, max_size: int, ttl_s: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._items: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= self._clock():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (self._clock() + self.ttl_s, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.pop(key, None)
+            return None if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """ของที่ยังไม่หมดอายุ (ใหม่สุดก่อน) -> snapshot ไม่ถือ lock ระหว่างวน"""
+        now = self._clock()
+        with self._lock:
+            alive = [(k, v) for k, (expires, v) in self._items.items() if expires > now]
+        return reversed(alive)
@@ -0,0 +1,542 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import FieldCondition, Filter, MatchValue, PointStruct, QueryRequest
+
+from app.services.collection_tuning import CollectionTuning, create_collection, migrate_collection
+
+# Setup Logger
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 512  # InsightFace (buffalo_l) ให้ output 512 dimension
+
+
+@dataclass
+class SearchHit:
+    """ผลลัพธ์การค้นหา (หน้าตาเหมือน ScoredPoint ของ Qdrant: มี id / score / payload)"""
+    id: Any
+    score: float
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class StoredFace:
+    """Vector ที่ลงทะเบียนไว้ของผู้ใช้หนึ่งคน (ใช้กับการยืนยันแบบ 1:1)"""
+    id: Any
+    vector: np.ndarray
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+    def similarity(self, embedding) -> float:
+        """Cosine similarity กับหน้าที่สแกนมา (scale เดียวกับ score ของการค้นหา)"""
+        probe = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(probe) * np.linalg.norm(self.vector))
+        return float(probe @ self.vector) / norm if norm > 0 else 0.0
+
+
+def locker_filter(locker_id) -> Optional[Filter]:
+    """เฉพาะผู้ใช้ที่จองตู้นี้ (Qdrant ใช้ payload index ของ locker_id ตอนค้นหา)"""
+    if locker_id is None:
+        return None
+    return Filter(must=[FieldCondition(key="locker_id", match=MatchValue(value=locker_id))])
+
+
+def as_point_id(user_id):
+    """Qdrant ใช้ id แบบ int หรือ UUID string -> แปลง "123" ให้เป็น 123 ให้ตรงกับที่เก็บไว้"""
+    if isinstance(user_id, str) and user_id.isdigit():
+        return int(user_id)
+    return user_id
+
+
+class VectorBackend:
+    """
+    Interface กลางของที่เก็บ Vector ใบหน้า
+    QdrantService เรียกผ่าน interface นี้ เพื่อให้สลับ Engine ได้จาก Config
+    """
+
+    def init_collection(self):
+        raise NotImplementedError
+
+    def upsert(self, user_id: int, embedding: list, payload: Dict[str, Any]):
+        raise NotImplementedError
+
+    def set_payload(self, user_id: int, payload: Dict[str, Any]):
+        raise NotImplementedError
+
+    def search(self, embedding, threshold: float, limit: int = 1,
+               locker_id: Optional[str] = None) -> List[SearchHit]:
+        """locker_id: ค้นหาเฉพาะผู้ใช้ที่จองตู้นี้ (None = ทั้ง Gallery)"""
+        raise NotImplementedError
+
+    def search_batch(self, embeddings, threshold: float, limit: int = 1,
+                     locker_id: Optional[str] = None) -> List[List[SearchHit]]:
+        """ค้นหาหลาย Vector ในคำสั่งเดียว (ผลลัพธ์เรียงตาม embeddings) locker_id ใช้กับทุก Vector"""
+        return [self.search(embedding, threshold, limit, locker_id) for embedding in embeddings]
+
+    def delete(self, user_id):
+        raise NotImplementedError
+
+    def retrieve(self, user_id) -> Optional[StoredFace]:
+        """ดึง Vector ของผู้ใช้ตาม point id (None = ไม่มีผู้ใช้นี้)"""
+        raise NotImplementedError
+
+    # --- async (เรียกจาก Endpoint โดยไม่ block event loop) ---
+    # ค่า default: รันเวอร์ชัน sync ใน Thread (Backend ที่มี Client แบบ async ให้ override)
+
+    async def aupsert(self, user_id: int, embedding: list, payload: Dict[str, Any]):
+        await asyncio.to_thread(self.upsert, user_id, embedding, payload)
+
+    async def aset_payload(self, user_id: int, payload: Dict[str, Any]):
+        await asyncio.to_thread(self.set_payload, user_id, payload)
+
+    async def asearch(self, embedding, threshold: float, limit: int = 1,
+                      locker_id: Optional[str] = None) -> List[SearchHit]:
+        return await asyncio.to_thread(self.search, embedding, threshold, limit, locker_id)
+
+    async def asearch_batch(self, embeddings, threshold: float, limit: int = 1,
+                            locker_id: Optional[str] = None) -> List[List[SearchHit]]:
+        return await asyncio.to_thread(self.search_batch, embeddings, threshold, limit, locker_id)
+
+    async def adelete(self, user_id):
+        await asyncio.to_thread(self.delete, user_id)
+
+    async def aretrieve(self, user_id) -> Optional[StoredFace]:
+        return await asyncio.to_thread(self.retrieve, user_id)
+
+    async def aclose(self):
+        pass
+
+
+def _as_list(embedding):
+    return embedding.tolist() if isinstance(embedding, np.ndarray) else embedding
+
+
+def _to_hits(points) -> List[SearchHit]:
+    return [SearchHit(id=p.id, score=p.score, payload=p.payload or {}) for p in points]
+
+
+def _to_stored(points) -> Optional[StoredFace]:
+    if not points or points[0].vector is None:
+        return None
+    p = points[0]
+    return StoredFace(id=p.id, vector=np.asarray(p.vector, dtype=np.float32), payload=p.payload or {})
+
+
+class QdrantBackend(VectorBackend):
+    """
+    Backend เดิม: ยิงทุกคำสั่งไปที่ Qdrant Server
+    aclient (ถ้ามี) ใช้กับคำสั่ง async -> รอ Qdrant บน event loop ตรงๆ ไม่ต้องกิน Thread
+    """
+
+    def __init__(self, client: QdrantClient, collection_name: str,
+                 aclient: Optional[AsyncQdrantClient] = None,
+                 tuning: Optional[CollectionTuning] = None, migrate: bool = False):
+        self.client = client
+        self.aclient = aclient
+        self.collection_name = collection_name
+        self.tuning = tuning or CollectionTuning()
+        self.migrate = migrate
+        self.search_params = self.tuning.search_params()
+
+    def init_collection(self):
+        # ตรวจสอบว่ามี collection นี้หรือยัง
+        if not self.client.collection_exists(self.collection_name):
+            logger.info(f"Creating collection '{self.collection_name}'...")
+            create_collection(self.client, self.collection_name, EMBEDDING_DIM, self.tuning)
+            logger.info(f"✅ Collection '{self.collection_name}' created successfully.")
+        else:
+            logger.info(f"✅ Collection '{self.collection_name}' already exists.")
+            if self.migrate:
+                changes = migrate_collection(self.client, self.collection_name, self.tuning)
+                if changes:
+                    logger.info(f"✅ Collection '{self.collection_name}' migrated: {sorted(changes)}")
+
+    def upsert(self, user_id: int, embedding: list, payload: Dict[str, Any]):
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                PointStruct(
+                    id=user_id, # ใช้ User ID เป็น Primary Key (ถ้าซ้ำจะทับของเดิม)
+                    vector=embedding,
+                    payload=payload
+                )
+            ]
+        )
+
+    def set_payload(self, user_id: int, payload: Dict[str, Any]):
+        # ใช้คำสั่ง set_payload ของ Qdrant เพื่อแก้ข้อมูลเฉพาะจุด
+        self.client.set_payload(
+            collection_name=self.collection_name,
+            points=[user_id],
+            payload=payload
+        )
+
+    def search(self, embedding, threshold: float, limit: int = 1,
+               locker_id: Optional[str] = None) -> List[SearchHit]:
+        points = self.client.query_points(
+            collection_name=self.collection_name,
+            query=_as_list(embedding),
+            query_filter=locker_filter(locker_id),
+            limit=limit,
+            score_threshold=threshold,
+            search_params=self.search_params,
+            with_payload=True
+        ).points
+
+        return _to_hits(points)
+
+    def _batch_requests(self, embeddings, threshold: float, limit: int,
+                        locker_id: Optional[str]) -> List[QueryRequest]:
+        query_filter = locker_filter(locker_id)
+        return [
+            QueryRequest(query=_as_list(embedding), filter=query_filter, limit=limit, score_threshold=threshold,
+                         params=self.search_params, with_payload=True)
+            for embedding in embeddings
+        ]
+
+    def search_batch(self, embeddings, threshold: float, limit: int = 1,
+                     locker_id: Optional[str] = None) -> List[List[SearchHit]]:
+        # query_batch_points: ไปกลับ Qdrant ครั้งเดียวต่อทั้งชุด
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=self._batch_requests(embeddings, threshold, limit, locker_id)
+        )
+        return [_to_hits(r.points) for r in responses]
+
+    def delete(self, user_id):
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=[user_id]
+        )
+
+    def retrieve(self, user_id) -> Optional[StoredFace]:
+        points = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=[user_id],
+            with_payload=True,
+            with_vectors=True
+        )
+        return _to_stored(points)
+
+    async def aretrieve(self, user_id) -> Optional[StoredFace]:
+        if self.aclient is None:
+            return await super().aretrieve(user_id)
+        points = await self.aclient.retrieve(
+            collection_name=self.collection_name,
+            ids=[user_id],
+            with_payload=True,
+            with_vectors=True
+        )
+        return _to_stored(points)
+
+    async def aupsert(self, user_id: int, embedding: list, payload: Dict[str, Any]):
+        if self.aclient is None:
+            return await super().aupsert(user_id, embedding, payload)
+        await self.aclient.upsert(
+            collection_name=self.collection_name,
+            points=[PointStruct(id=user_id, vector=_as_list(embedding), payload=payload)]
+        )
+
+    async def aset_payload(self, user_id: int, payload: Dict[str, Any]):
+        if self.aclient is None:
+            return await super().aset_payload(user_id, payload)
+        await self.aclient.set_payload(
+            collection_name=self.collection_name,
+            points=[user_id],
+            payload=payload
+        )
+
+    async def asearch(self, embedding, threshold: float, limit: int = 1,
+                      locker_id: Optional[str] = None) -> List[SearchHit]:
+        if self.aclient is None:
+            return await super().asearch(embedding, threshold, limit, locker_id)
+        response = await self.aclient.query_points(
+            collection_name=self.collection_name,
+            query=_as_list(embedding),
+            query_filter=locker_filter(locker_id),
+            limit=limit,
+            score_threshold=threshold,
+            search_params=self.search_params,
+            with_payload=True
+        )
+        return _to_hits(response.points)
+
+    async def asearch_batch(self, embeddings, threshold: float, limit: int = 1,
+                            locker_id: Optional[str] = None) -> List[List[SearchHit]]:
+        if self.aclient is None:
+            return await super().asearch_batch(embeddings, threshold, limit, locker_id)
+        responses = await self.aclient.query_batch_points(
+            collection_name=self.collection_name,
+            requests=self._batch_requests(embeddings, threshold, limit, locker_id)
+        )
+        return [_to_hits(r.points) for r in responses]
+
+    async def adelete(self, user_id):
+        if self.aclient is None:
+            return await super().adelete(user_id)
+        await self.aclient.delete(
+            collection_name=self.collection_name,
+            points_selector=[user_id]
+        )
+
+    async def aclose(self):
+        if self.aclient is not None:
+            await self.aclient.close()
+
+    def scroll_all(self, batch_size: int = 1024):
+        """ดึงทุก Point (พร้อม Vector) ออกมาเป็นชุดๆ ใช้ตอนโหลด Index เข้า RAM"""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            for p in points:
+                yield p
+            if offset is None:
+                break
+
+
+class GalleryIndex:
+    """
+    Exact search บน NumPy matrix ใน Process เดียวกับ API
+
+    - เก็บ Vector ที่ normalize แล้วเป็น float32 ใน array ต่อเนื่อง (C-contiguous)
+    - ค้นหา top-k ด้วย matrix-vector product ครั้งเดียว (cosine = dot product)
+    - ลบแบบ swap-with-last เพื่อให้ matrix ไม่มีรู
+    - Sub-gallery ต่อตู้ (locker_id -> point id) สำหรับค้นหาเฉพาะผู้ใช้ที่จองตู้นั้น
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, initial_capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._ids: List[Any] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[Any, int] = {}
+        self._lockers: Dict[Any, Set[Any]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        return vec
+
+    def _move_locker(self, point_id, old, new):
+        if old == new:
+            return
+        if old is not None:
+            members = self._lockers.get(old)
+            if members is not None:
+                members.discard(point_id)
+                if not members:
+                    del self._lockers[old]
+        if new is not None:
+            self._lockers.setdefault(new, set()).add(point_id)
+
+    def _grow(self):
+        new_vectors = np.zeros((self._vectors.shape[0] * 2, self.dim), dtype=np.float32)
+        new_vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+        self._vectors = new_vectors
+
+    def upsert(self, point_id, embedding, payload: Dict[str, Any]):
+        vec = self._normalize(embedding)
+        with self._lock:
+            row = self._rows.get(point_id)
+            if row is None:
+                if len(self._ids) == self._vectors.shape[0]:
+                    self._grow()
+                row = len(self._ids)
+                self._ids.append(point_id)
+                self._payloads.append(dict(payload))
+                self._rows[point_id] = row
+                self._move_locker(point_id, None, payload.get("locker_id"))
+            else:
+                self._move_locker(point_id, self._payloads[row].get("locker_id"), payload.get("locker_id"))
+                self._payloads[row] = dict(payload)
+            self._vectors[row] = vec
+
+    def set_payload(self, point_id, payload: Dict[str, Any]) -> bool:
+        with self._lock:
+            row = self._rows.get(point_id)
+            if row is None:
+                return False
+            if "locker_id" in payload:
+                self._move_locker(point_id, self._payloads[row].get("locker_id"), payload["locker_id"])
+            self._payloads[row].update(payload)
+            return True
+
+    def remove(self, point_id) -> bool:
+        with self._lock:
+            row = self._rows.pop(point_id, None)
+            if row is None:
+                return False
+            self._move_locker(point_id, self._payloads[row].get("locker_id"), None)
+            last = len(self._ids) - 1
+            if row != last:
+                # ย้ายแถวสุดท้ายมาแทนที่แถวที่ถูกลบ
+                moved_id = self._ids[last]
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = moved_id
+                self._payloads[row] = self._payloads[last]
+                self._rows[moved_id] = row
+            self._ids.pop()
+            self._payloads.pop()
+            return True
+
+    def get(self, point_id) -> Optional[StoredFace]:
+        with self._lock:
+            row = self._rows.get(point_id)
+            if row is None:
+                return None
+            return StoredFace(id=point_id, vector=self._vectors[row].copy(), payload=dict(self._payloads[row]))
+
+    def search(self, embedding, threshold: float, limit: int = 1,
+               locker_id: Optional[str] = None) -> List[SearchHit]:
+        query = self._normalize(embedding)
+        with self._lock:
+            if locker_id is None:
+                n = len(self._ids)
+                if n == 0:
+                    return []
+                rows = None
+                scores = self._vectors[:n] @ query
+            else:
+                # Sub-gallery ของตู้นี้: คำนวณแค่แถวของผู้ใช้ที่จองไว้ (ไม่กี่คน แทนทั้ง Gallery)
+                members = self._lockers.get(locker_id)
+                if not members:
+                    return []
+                rows = np.fromiter((self._rows[pid] for pid in members), dtype=np.intp, count=len(members))
+                n = len(rows)
+                scores = self._vectors[rows] @ query
+
+            if limit == 1:
+                top = [int(np.argmax(scores))]
+            else:
+                k = min(limit, n)
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+
+            hits = []
+            for i in top:
+                if scores[i] < threshold:
+                    continue
+                row = i if rows is None else rows[i]
+                hits.append(SearchHit(id=self._ids[row], score=float(scores[i]), payload=dict(self._payloads[row])))
+            return hits
+
+    def search_batch(self, embeddings, threshold: float, limit: int = 1,
+                     locker_id: Optional[str] = None) -> List[List[SearchHit]]:
+        if len(embeddings) == 0:
+            return []
+        queries = np.stack([self._normalize(e) for e in embeddings])
+        with self._lock:
+            if locker_id is None:
+                n = len(self._ids)
+                rows = None
+                candidates = self._vectors[:n]
+            else:
+                # Sub-gallery ของตู้นี้เหมือน search()
+                members = self._lockers.get(locker_id) or ()
+                rows = np.fromiter((self._rows[pid] for pid in members), dtype=np.intp, count=len(members))
+                n = len(rows)
+                candidates = self._vectors[rows]
+            if n == 0:
+                return [[] for _ in embeddings]
+            # matrix-matrix product ครั้งเดียวทั้งชุด: (Q, dim) x (dim, N)
+            scores = queries @ candidates.T
+            k = min(limit, n)
+            if k == 1:
+                top = np.argmax(scores, axis=1)[:, None]
+            else:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+                top = np.take_along_axis(top, order, axis=1)
+
+            return [
+                [self._hit(i if rows is None else rows[i], row[i]) for i in row_top if row[i] >= threshold]
+                for row, row_top in zip(scores, top)
+            ]
+
+    def _hit(self, row: int, score) -> SearchHit:
+        return SearchHit(id=self._ids[row], score=float(score), payload=dict(self._payloads[row]))
+
+
+class InMemoryBackend(VectorBackend):
+    """
+    Backend แบบ In-process: ค้นหาจาก GalleryIndex ใน RAM (ไม่ต้องไปกลับ Network)
+    แต่ยังเขียนทะลุไปที่ Qdrant เสมอ เพื่อให้ข้อมูลไม่หายตอน restart
+    """
+
+    def __init__(self, source: QdrantBackend):
+        self.source = source
+        self.index = GalleryIndex()
+
+    def init_collection(self):
+        self.source.init_collection()
+
+        # โหลดทั้ง Collection เข้า RAM ครั้งเดียวตอน Start
+        count = 0
+        for point in self.source.scroll_all():
+            if point.vector is None:
+                continue
+            self.index.upsert(point.id, point.vector, point.payload or {})
+            count += 1
+        logger.info(f"✅ In-memory gallery loaded with {count} vectors.")
+
+    def upsert(self, user_id: int, embedding: list, payload: Dict[str, Any]):
+        self.source.upsert(user_id, embedding, payload)
+        self.index.upsert(user_id, embedding, payload)
+
+    def set_payload(self, user_id: int, payload: Dict[str, Any]):
+        self.source.set_payload(user_id, payload)
+        self.index.set_payload(user_id, payload)
+
+    def search(self, embedding, threshold: float, limit: int = 1,
+               locker_id: Optional[str] = None) -> List[SearchHit]:
+        return self.index.search(embedding, threshold, limit, locker_id)
+
+    def search_batch(self, embeddings, threshold: float, limit: int = 1,
+                     locker_id: Optional[str] = None) -> List[List[SearchHit]]:
+        return self.index.search_batch(embeddings, threshold, limit, locker_id)
+
+    def delete(self, user_id):
+        self.source.delete(user_id)
+        self.index.remove(as_point_id(user_id))
+
+    def retrieve(self, user_id) -> Optional[StoredFace]:
+        return self.index.get(as_point_id(user_id))
+
+    # เขียนผ่าน Client async ของ source แล้วอัปเดต Index ใน RAM
+    # asearch / asearch_batch ใช้ค่า default ของ VectorBackend (asyncio.to_thread):
+    # ค้นหาเป็นงาน CPU O(N x 512) ห้ามรันบน event loop (จะบล็อก /health, /ready และ Request อื่นทั้งหมด)
+
+    async def aupsert(self, user_id: int, embedding: list, payload: Dict[str, Any]):
+        await self.source.aupsert(user_id, embedding, payload)
+        self.index.upsert(user_id, embedding, payload)
+
+    async def aset_payload(self, user_id: int, payload: Dict[str, Any]):
+        await self.source.aset_payload(user_id, payload)
+        self.index.set_payload(user_id, payload)
+
+    async def adelete(self, user_id):
+        await self.source.adelete(user_id)
+        self.index.remove(as_point_id(user_id))
+
+    async def aretrieve(self, user_id) -> Optional[StoredFace]:
+        return self.retrieve(user_id)
+
+    async def aclose(self):
+        await self.source.aclose()
@@ -1,20 +1,98 @@
+import asyncio
 import logging
-from typing import Optional, Dict, Any
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+import math
+from typing import Optional, Dict, Any, List, Callable
+
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from app.config import settings
+from app import metrics
+from app.services.vector_backend import (
+    VectorBackend, QdrantBackend, InMemoryBackend, SearchHit, StoredFace, as_point_id
+)
+from app.services.ttl_cache import TTLCache
+from app.services.generations import UserGenerations
+from app.services.collection_tuning import CollectionTuning
 
 # Setup Logger
 logger = logging.getLogger(__name__)
 
+def _server_options() -> Dict[str, Any]:
+    """ค่าเชื่อมต่อ Qdrant Server ที่ใช้ร่วมกันทั้ง Client แบบ sync และ async"""
+    return dict(
+        host=settings.QDRANT_HOST,
+        port=settings.QDRANT_PORT,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        timeout=math.ceil(settings.QDRANT_TIMEOUT_S),
+        # connection pool ของ REST (httpx) -> ใช้ connection เดิมซ้ำ ไม่ต้อง handshake ทุก Request
+        limits=httpx.Limits(
+            max_connections=settings.QDRANT_POOL_SIZE,
+            max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+        ),
+    )
+
+def create_client() -> QdrantClient:
+    """Client ไปที่ Qdrant Server หรือ Qdrant local mode ถ้าตั้ง QDRANT_LOCAL_PATH"""
+    if settings.QDRANT_LOCAL_PATH == ":memory:":
+        return QdrantClient(location=":memory:")
+    if settings.QDRANT_LOCAL_PATH:
+        return QdrantClient(path=settings.QDRANT_LOCAL_PATH)
+    return QdrantClient(**_server_options())
+
+def create_async_client() -> Optional[AsyncQdrantClient]:
+    """
+    AsyncQdrantClient สำหรับ Endpoint (ตัวเดียวต่อ Process, connection pool ใช้ร่วมกันทุก Request)
+    คืน None ถ้าปิด QDRANT_ASYNC หรือใช้ local mode (Client ตัวที่สองจะเห็นข้อมูลคนละชุดกับ create_client())
+    -> Backend จะรันคำสั่ง sync ใน Thread แทน
+    """
+    if not settings.QDRANT_ASYNC or settings.QDRANT_LOCAL_PATH:
+        return None
+    return AsyncQdrantClient(**_server_options())
+
+def create_backend(client: QdrantClient, collection_name: str,
+                   aclient: Optional[AsyncQdrantClient] = None) -> VectorBackend:
+    """เลือก Vector Backend ตาม settings.VECTOR_BACKEND ("qdrant" หรือ "memory")"""
+    qdrant_backend = QdrantBackend(
+        client, collection_name, aclient,
+        tuning=CollectionTuning.from_settings(),
+        # local mode ไม่มี HNSW / quantization ให้ migrate (ค้นหาแบบ exact อยู่แล้ว)
+        migrate=settings.QDRANT_MIGRATE_ON_START and not settings.QDRANT_LOCAL_PATH,
+    )
+    if settings.VECTOR_BACKEND == "memory":
+        return InMemoryBackend(qdrant_backend)
+    if settings.VECTOR_BACKEND != "qdrant":
+        raise ValueError(f"Unknown VECTOR_BACKEND: {settings.VECTOR_BACKEND}")
+    return qdrant_backend
+
 class QdrantService:
-    def __init__(self):
+    def __init__(self, client: Optional[QdrantClient] = None,
+                 aclient: Optional[AsyncQdrantClient] = None):
         # สร้าง Client เชื่อมต่อ (ยังไม่ได้ต่อจริงจนกว่าจะยิง Request)
-        self.client = QdrantClient(
-            host=settings.QDRANT_HOST, 
-            port=settings.QDRANT_PORT
-        )
+        # ส่ง client เข้ามาเองได้ เช่น QdrantClient(":memory:") สำหรับ benchmark แบบ offline
+        self.client = client or create_client()
+        # ส่ง client มาเองแต่ไม่ส่ง aclient -> ไม่สร้าง Client async ที่ชี้ไปคนละที่
+        self.aclient = aclient if aclient is not None or client is not None else create_async_client()
         self.collection_name = settings.COLLECTION_NAME
+        self.backend = create_backend(self.client, self.collection_name, self.aclient)
+        # Vector ของผู้ใช้ที่ถูกยืนยันแบบ 1:1 บ่อยๆ (ไม่ต้องดึงจาก Qdrant ทุกครั้ง)
+        # ค่าใน cache = (generation ตอนดึงมา, StoredFace)
+        self.face_cache = TTLCache(settings.CLAIM_CACHE_SIZE, settings.CLAIM_CACHE_TTL_S)
+        # generation ต่อผู้ใช้ที่ Worker ทุกตัวของ app.prefork เห็นร่วมกัน (ทิ้ง cache ข้าม Process)
+        self.generations = UserGenerations(settings.GENERATION_SLOTS)
+        self._listeners: List[Callable[[Any], None]] = []
+
+    def add_listener(self, callback: Callable[[Any], None]):
+        """callback(user_id) ถูกเรียกทุกครั้งที่ข้อมูลผู้ใช้เปลี่ยน (ใช้ทิ้ง cache ที่อื่น)"""
+        self._listeners.append(callback)
+
+    def _changed(self, user_id):
+        """ข้อมูลของ user_id เปลี่ยน (ลงทะเบียน / จอง / ลบ) -> ทิ้งของที่ cache ไว้"""
+        # bump ก่อน: Worker อื่นจะเห็นว่าของใน cache ของตัวเองใช้ไม่ได้ตั้งแต่ lookup ถัดไป
+        self.generations.bump(user_id)
+        self.face_cache.pop(as_point_id(user_id))
+        for callback in self._listeners:
+            callback(user_id)
 
     def init_collection(self):
         """
@@ -22,21 +100,7 @@ class QdrantService:
         function นี้จะถูกเรียกจาก main.py ตอนเริ่ม Server
         """
         try:
-            # ตรวจสอบว่ามี collection นี้หรือยัง
-            if not self.client.collection_exists(self.collection_name):
-                logger.info(f"Creating collection '{self.collection_name}'...")
-                
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=512,  # InsightFace (buffalo_l) ให้ output 512 dimension
-                        distance=Distance.COSINE # ใช้ Cosine Similarity เหมาะกับ Face Recognition
-                    )
-                )
-                logger.info(f"✅ Collection '{self.collection_name}' created successfully.")
-            else:
-                logger.info(f"✅ Collection '{self.collection_name}' already exists.")
-                
+            self.backend.init_collection()
         except Exception as e:
             logger.error(f"❌ Failed to initialize Qdrant collection: {e}")
             raise e
@@ -46,19 +110,15 @@ class QdrantService:
         1. ลงทะเบียนผู้ใช้ใหม่ (เก็บแค่หน้าและ ID ยังไม่มีตู้)
         """
         try:
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    PointStruct(
-                        id=user_id,
-                        vector=embedding,
-                        payload={
-                            "locker_id": None, # ยังไม่มีการจอง
-                            "active": True
-                        }
-                    )
-                ]
+            self.backend.upsert(
+                user_id,
+                embedding,
+                payload={
+                    "locker_id": None, # ยังไม่มีการจอง
+                    "active": True
+                }
             )
+            self._changed(user_id)
             logger.info(f"Registered new User ID: {user_id}")
             return True
         except Exception as e:
@@ -70,14 +130,8 @@ class QdrantService:
         2. อัปเดตการจอง (ไม่ต้องใช้รูป ใช้แค่ ID)
         """
         try:
-            # ใช้คำสั่ง set_payload ของ Qdrant เพื่อแก้ข้อมูลเฉพาะจุด
-            self.client.set_payload(
-                collection_name=self.collection_name,
-                points=[user_id],
-                payload={
-                    "locker_id": locker_id
-                }
-            )
+            self.backend.set_payload(user_id, {"locker_id": locker_id})
+            self._changed(user_id)
             logger.info(f"Updated booking for User {user_id} -> Locker {locker_id}")
             return True
         except Exception as e:
@@ -90,41 +144,37 @@ class QdrantService:
         บันทึกหรืออัปเดตข้อมูลใบหน้า
         """
         try:
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    PointStruct(
-                        id=user_id, # ใช้ User ID เป็น Primary Key (ถ้าซ้ำจะทับของเดิม)
-                        vector=embedding,
-                        payload={
-                            "locker_id": locker_id,
-                            "active": True # เผื่ออนาคตอยากทำระบบระงับสิทธิ์ชั่วคราว
-                        }
-                    )
-                ]
+            self.backend.upsert(
+                user_id, # ใช้ User ID เป็น Primary Key (ถ้าซ้ำจะทับของเดิม)
+                embedding,
+                payload={
+                    "locker_id": locker_id,
+                    "active": True # เผื่ออนาคตอยากทำระบบระงับสิทธิ์ชั่วคราว
+                }
             )
+            self._changed(user_id)
             logger.info(f"Upserted face for User ID: {user_id}, Locker: {locker_id}")
             return True
         except Exception as e:
             logger.error(f"❌ Error upserting face: {e}")
             return False
 
-    def search_face(self, embedding: list) -> Optional[Any]:
+    def search_face(self, embedding: list, locker_id: Optional[str] = None) -> Optional[Any]:
         """
         ค้นหาใบหน้าที่ใกล้เคียงที่สุด
-        Return: PointStruct (Object ของ Qdrant) หรือ None
+        locker_id: ค้นหาเฉพาะผู้ใช้ที่จองตู้นี้ (None = ทั้ง Gallery)
+        Return: SearchHit (มี id / score / payload) หรือ None
         """
         try:
             # ใช้ threshold จาก Config
             threshold = settings.FACE_SIMILARITY_THRESHOLD
 
-            results = self.client.query_points(
-                collection_name=self.collection_name,
-                query=embedding,
+            results = self.backend.search(
+                embedding,
+                threshold=threshold,
                 limit=1, # เอาแค่คนเดียวที่เหมือนที่สุด
-                score_threshold=threshold,
-                with_payload=True
-            ).points
+                locker_id=locker_id
+            )
 
             if not results:
                 logger.info("Search completed: No match found.")
@@ -141,15 +191,139 @@ class QdrantService:
     def delete_face(self, user_id: str):
         """ลบข้อมูลใบหน้า (เผื่อต้องใช้)"""
         try:
-            self.client.delete(
-                collection_name=self.collection_name,
-                points_selector=[user_id]
-            )
+            self.backend.delete(user_id)
+            self._changed(user_id)
             logger.info(f"Deleted User ID: {user_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to delete user {user_id}: {e}")
             return False
 
+    # ---------------------------------------------------------
+    # เวอร์ชัน async สำหรับ Endpoint (ไม่ block event loop)
+    # ทุกคำสั่งมี timeout ของตัวเอง (QDRANT_TIMEOUT_S) -> Qdrant ช้าแล้ว Request ไม่ค้างตาม
+    # ---------------------------------------------------------
+    @staticmethod
+    async def _call(coro, timeout: Optional[float] = None):
+        return await asyncio.wait_for(coro, timeout or settings.QDRANT_TIMEOUT_S)
+
+    async def aregister_new_user(self, user_id: int, embedding: list) -> bool:
+        try:
+            await self._call(self.backend.aupsert(user_id, embedding, payload={"locker_id": None, "active": True}))
+            self._changed(user_id)
+            logger.info(f"Registered new User ID: {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Registration failed: {e!r}")
+            return False
+
+    async def aupdate_booking(self, user_id: int, locker_id: str) -> bool:
+        try:
+            await self._call(self.backend.aset_payload(user_id, {"locker_id": locker_id}))
+            self._changed(user_id)
+            logger.info(f"Updated booking for User {user_id} -> Locker {locker_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Booking update failed: {e!r}")
+            return False
+
+    async def aupsert_face(self, user_id: int, locker_id: str, embedding: list) -> bool:
+        try:
+            await self._call(self.backend.aupsert(user_id, embedding, payload={"locker_id": locker_id, "active": True}))
+            self._changed(user_id)
+            logger.info(f"Upserted face for User ID: {user_id}, Locker: {locker_id}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error upserting face: {e!r}")
+            return False
+
+    async def asearch_face(self, embedding: list, locker_id: Optional[str] = None,
+                           timeout: Optional[float] = None) -> Optional[Any]:
+        """เหมือน search_face: คืน SearchHit ที่ใกล้ที่สุดหรือ None"""
+        try:
+            results = await self._call(
+                self.backend.asearch(embedding, threshold=settings.FACE_SIMILARITY_THRESHOLD, limit=1,
+                                     locker_id=locker_id),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error("❌ Qdrant search timed out.")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Error searching face: {e!r}")
+            return None
+
+        if not results:
+            logger.info("Search completed: No match found.")
+            return None
+        hit = results[0]
+        logger.info(f"Match found! User ID: {hit.id}, Score: {hit.score:.4f}")
+        return hit
+
+    async def asearch_faces(self, embeddings: list, locker_id: Optional[str] = None,
+                            timeout: Optional[float] = None) -> List[Optional[SearchHit]]:
+        """
+        ค้นหาหลายใบหน้าในคำสั่งเดียว (query_batch_points) -> SearchHit หรือ None ตามลำดับ
+        locker_id: ค้นหาเฉพาะผู้ใช้ที่จองตู้นี้ (None = ทั้ง Gallery)
+        """
+        if len(embeddings) == 0:
+            return []
+        try:
+            results = await self._call(
+                self.backend.asearch_batch(embeddings, threshold=settings.FACE_SIMILARITY_THRESHOLD, limit=1,
+                                           locker_id=locker_id),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error("❌ Qdrant batch search timed out.")
+            return [None] * len(embeddings)
+        except Exception as e:
+            logger.error(f"❌ Error searching faces: {e!r}")
+            return [None] * len(embeddings)
+        return [hits[0] if hits else None for hits in results]
+
+    async def adelete_face(self, user_id: str) -> bool:
+        try:
+            await self._call(self.backend.adelete(user_id))
+            self._changed(user_id)
+            logger.info(f"Deleted User ID: {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete user {user_id}: {e!r}")
+            return False
+
+    async def aget_face(self, user_id, timeout: Optional[float] = None) -> Optional[StoredFace]:
+        """
+        Vector ที่ลงทะเบียนไว้ของ user_id (สำหรับยืนยันตัวตนแบบ 1:1 ไม่ต้องค้นหาทั้ง Gallery)
+        ใช้ของใน cache ก่อน (หมดอายุตาม CLAIM_CACHE_TTL_S / ใช้ไม่ได้ทันทีเมื่อ generation ของผู้ใช้เปลี่ยน)
+        Return: StoredFace หรือ None ถ้าไม่มีผู้ใช้นี้ / ดึงไม่สำเร็จ
+        """
+        point_id = as_point_id(user_id)
+        generation = self.generations.get(point_id)
+        cached = self.face_cache.get(point_id)
+        if cached is not None:
+            if cached[0] == generation:
+                metrics.count_cache("claimed_face", hit=True)
+                return cached[1]
+            # Worker อื่นเปลี่ยนข้อมูลผู้ใช้นี้ไปแล้ว
+            self.face_cache.pop(point_id)
+        metrics.count_cache("claimed_face", hit=False)
+        try:
+            face = await self._call(self.backend.aretrieve(point_id), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Qdrant retrieve timed out for User {user_id}.")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Error retrieving User {user_id}: {e!r}")
+            return None
+        if face is not None:
+            # เก็บด้วย generation ก่อนดึง: ถ้ามีการเปลี่ยนระหว่างดึง lookup ครั้งหน้าจะไม่ใช้ของนี้
+            self.face_cache.put(point_id, (generation, face))
+        return face
+
+    async def aclose(self):
+        """ปิด connection pool ของ Client async (เรียกตอน Server shutdown)"""
+        await self.backend.aclose()
+
 # Singleton Instance
-qdrant_service = QdrantService()
\ No newline at end of file
+qdrant_service = QdrantService()
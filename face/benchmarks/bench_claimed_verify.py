@@ -0,0 +1,94 @@
+"""
+เทียบ latency หลังได้ embedding แล้วของ
+  1:N            asearch_face (ค้นหาทั้ง Gallery ตาม VECTOR_BACKEND)
+  1:1 cold       aget_face + cosine โดยล้าง cache ทุกครั้ง (ดึง Vector จาก Qdrant ตาม point id)
+  1:1 cached     aget_face + cosine (Vector อยู่ใน cache แล้ว)
+
+วิธีรัน:
+    python -m benchmarks.bench_claimed_verify --sizes 1000 10000 100000            # Qdrant Server
+    python -m benchmarks.bench_claimed_verify --local --sizes 1000 10000           # Qdrant local mode
+    VECTOR_BACKEND=memory python -m benchmarks.bench_claimed_verify --local
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from app.config import settings
+from app.services.collection_tuning import CollectionTuning, create_collection
+from app.services.vector_db import QdrantService
+from benchmarks.bench_qdrant_client import DIM, make_gallery
+from benchmarks.utils import summarize, format_row, save_results
+
+async def timed(fn, items) -> dict:
+    latencies = []
+    for item in items:
+        started = time.perf_counter()
+        await fn(item)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+async def run_size(size: int, args) -> dict:
+    client = QdrantClient(location=":memory:") if args.local else QdrantClient(host=args.host, port=args.port, timeout=300)
+    if client.collection_exists(settings.COLLECTION_NAME):
+        client.delete_collection(settings.COLLECTION_NAME)
+    create_collection(client, settings.COLLECTION_NAME, DIM, CollectionTuning.from_settings())
+
+    gallery = make_gallery(size)
+    # point id เริ่มที่ 1 เหมือน user_id จริง
+    client.upload_collection(
+        settings.COLLECTION_NAME, vectors=gallery, ids=range(1, size + 1), batch_size=1024,
+        payload=({"locker_id": f"L{i}", "active": True} for i in range(1, size + 1)),
+    )
+    aclient = None if args.local else AsyncQdrantClient(host=args.host, port=args.port)
+    service = QdrantService(client=client, aclient=aclient)
+    service.init_collection()  # VECTOR_BACKEND=memory: โหลด Gallery เข้า RAM
+
+    rng = np.random.default_rng(1)
+    users = rng.integers(1, size + 1, args.queries)
+    probes = gallery[users - 1] + rng.standard_normal((args.queries, DIM)).astype(np.float32) * 0.03
+    items = list(zip(users.tolist(), probes))
+
+    async def one_to_n(item):
+        _, probe = item
+        await service.asearch_face(probe)
+
+    async def one_to_one_cold(item):
+        user_id, probe = item
+        service.face_cache.clear()
+        (await service.aget_face(user_id)).similarity(probe)
+
+    async def one_to_one(item):
+        user_id, probe = item
+        (await service.aget_face(user_id)).similarity(probe)
+
+    results = {}
+    try:
+        for name, fn in (("1:N", one_to_n), ("1:1 cold", one_to_one_cold), ("1:1 cached", one_to_one)):
+            await timed(fn, items[:20])  # warm-up (และเติม cache ให้ 1:1 cached)
+            if name == "1:1 cached":
+                for user_id, _ in items:
+                    await service.aget_face(user_id)
+            results[name] = await timed(fn, items)
+            print(format_row(f"{size}/{name}", results[name]))
+    finally:
+        await service.aclose()
+        client.delete_collection(settings.COLLECTION_NAME)
+    return results
+
+async def main(args):
+    results = {"vector_backend": settings.VECTOR_BACKEND, "local": args.local}
+    for size in args.sizes:
+        results[str(size)] = await run_size(size, args)
+    print(f"saved: {save_results('claimed_verify', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--local", action="store_true", help="ใช้ Qdrant local mode แทน Server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
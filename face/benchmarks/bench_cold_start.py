@@ -0,0 +1,89 @@
+"""
+วัด cold start ของ Server และเทียบ latency ของ Request แรกกับ steady state
+(เปิด / ปิด warm-up เพื่อดูว่า Request แรกหลัง /ready ช้ากว่าปกติแค่ไหน)
+
+แต่ละรอบเปิด uvicorn ใหม่ใน Subprocess แล้ว:
+  1. จับเวลาจนกว่า GET / ตอบ (Server เปิด port) และจนกว่า GET /ready ตอบ 200
+  2. ยิง /api/v1/verify ครั้งแรก แล้วยิงต่ออีก --requests ครั้ง
+
+วิธีรัน:
+    QDRANT_LOCAL_PATH=:memory: python -m benchmarks.bench_cold_start --image ../ai/faces/face_1.png
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.utils import summarize, format_row, save_results
+
+def wait_for(client: httpx.Client, url: str, timeout: float, expect_status: int = 200) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(url).status_code == expect_status:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} did not return {expect_status} within {timeout}s")
+
+def verify(client: httpx.Client, url: str, image_bytes: bytes) -> float:
+    started = time.perf_counter()
+    resp = client.post(f"{url}/api/v1/verify", files={"file": ("face.jpg", image_bytes, "image/jpeg")})
+    resp.raise_for_status()
+    return time.perf_counter() - started
+
+def run(warmup: bool, args, image_bytes: bytes) -> dict:
+    url = f"http://127.0.0.1:{args.port}"
+    env = dict(os.environ, WARMUP_ENABLED="true" if warmup else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        with httpx.Client(timeout=60.0) as client:
+            listening_s = wait_for(client, f"{url}/", args.timeout)
+            ready_s = listening_s + wait_for(client, f"{url}/ready", args.timeout)
+            cold_start = client.get(f"{url}/ready").json().get("cold_start_seconds", {})
+
+            first = verify(client, url, image_bytes)
+            steady = [verify(client, url, image_bytes) for _ in range(args.requests)]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    stats = summarize(steady)
+    result = {
+        "warmup": warmup,
+        "listening_s": listening_s,
+        "ready_s": ready_s,
+        "server_phases_s": cold_start,
+        "first_request_ms": first * 1000.0,
+        "steady_state": stats,
+        "first_vs_p50": first * 1000.0 / stats["p50_ms"],
+    }
+    label = "warm-up" if warmup else "no warm-up"
+    print(f"[{label}] listening={listening_s:.2f}s ready={ready_s:.2f}s phases={cold_start}")
+    print(f"    first request={result['first_request_ms']:.1f}ms ({result['first_vs_p50']:.2f}x p50)")
+    print("    " + format_row("steady state", stats))
+    return result
+
+def main(args):
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+
+    results = {}
+    for warmup in (False, True):
+        results["warmup" if warmup else "no_warmup"] = run(warmup, args, image_bytes)
+    print(f"saved: {save_results('cold_start', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True, help="รูปหน้าที่ใช้ยิง /verify")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=50, help="จำนวน Request หลังครั้งแรก (steady state)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    main(parser.parse_args())
@@ -0,0 +1,158 @@
+"""
+เทียบ CPU ของ Server ต่อการ verify 1 ครั้ง ระหว่างการส่งทั้งเฟรม (/verify) กับส่งหน้าที่ crop แล้ว (/verify/crop)
+
+  frame            decode JPEG ทั้งเฟรม -> FaceService.analyze() (SCRFD 640x640 + embed + liveness)
+  crop+landmarks   decode JPEG ของหน้า (มี margin) -> FaceService.analyze_crop(kps, bbox) (align + embed + liveness)
+  crop             เหมือนข้างบนแต่ไม่ส่ง landmarks (Server วาง template ของ ArcFace บนกรอบหน้า)
+
+ภาพหน้าแต่ละใบถูกแปะลงเฟรมขนาด --frame-size แล้ว crop แบบเดียวกับ FaceCropper.crop_for_upload
+(ใช้ bbox / 5 จุดจาก Detector ของ Server แทน YOLO ของอุปกรณ์ ไม่ต้องมี ultralytics)
+ไม่รวมการค้นหาใน Qdrant (เหมือนกันทั้งสองทาง)
+
+รายงาน: CPU ms ต่อ verify (time.process_time รวมทุก Thread ของ ORT / Torch), wall latency, ขนาดที่ upload
+และ cosine ระหว่าง embedding ของทางเต็มเฟรมกับทาง crop (ดูว่า align จาก crop ยังได้หน้าเดิม)
+
+วิธีรัน:
+    python -m benchmarks.bench_crop_verify --faces-dir ../ai/faces --frame-size 720 1280
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from app import metrics
+from app.config import settings
+from app.services.face_service import FaceService
+from benchmarks.bench_verify_pipeline import encode, load_faces
+from benchmarks.utils import summarize, format_row, save_results
+
+CROP_MARGIN = 0.15  # เท่ากับค่า default ของ FaceCropper
+
+def make_frame(face, rng: np.random.Generator, size):
+    h, w = size
+    frame = np.full((h, w, 3), rng.integers(60, 180, size=3), dtype=np.uint8)
+    fh = int(h * rng.uniform(0.35, 0.6))
+    fw = min(w, int(face.shape[1] * fh / face.shape[0]))
+    y, x = rng.integers(0, h - fh + 1), rng.integers(0, w - fw + 1)
+    frame[y:y + fh, x:x + fw] = cv2.resize(face, (fw, fh))
+    return frame
+
+def crop_upload(frame, bbox, kps, margin: float):
+    """
+    เหมือน FaceCropper.crop_for_upload: ขยายกรอบเมื่อมี landmarks แล้วย้าย landmarks / กรอบหน้ามาอยู่ในพิกัดของ crop
+    Return: (crop, landmarks, face_box) -> face_box = None เมื่อไม่ได้ขยายกรอบ
+    """
+    fx1, fy1, fx2, fy2 = map(int, bbox)
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = fx1, fy1, fx2, fy2
+    if kps is not None:
+        pad_x, pad_y = int((x2 - x1) * margin), int((y2 - y1) * margin)
+        x1, y1, x2, y2 = x1 - pad_x, y1 - pad_y, x2 + pad_x, y2 + pad_y
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(w, x2), min(h, y2)
+    if kps is None:
+        return frame[y1:y2, x1:x2], None, None
+    landmarks = (np.asarray(kps) - [x1, y1]).tolist()
+    face_box = [max(0, fx1) - x1, max(0, fy1) - y1, min(w, fx2) - x1, min(h, fy2) - y1]
+    return frame[y1:y2, x1:x2], landmarks, face_box
+
+def build_workload(face_svc: FaceService, faces, rng: np.random.Generator, size):
+    """[(ชื่อ, JPEG เต็มเฟรม, JPEG crop พร้อม margin, landmarks, กรอบหน้าใน crop, JPEG crop พอดีกรอบ)] ของภาพที่ Detector เจอหน้า"""
+    workload = []
+    for name, face in faces:
+        frame = make_frame(face, rng, size)
+        found = face_svc._find_face(frame)
+        if found is None:
+            continue
+        crop, landmarks, face_box = crop_upload(frame, found.bbox, found.kps, CROP_MARGIN)
+        tight, _, _ = crop_upload(frame, found.bbox, None, CROP_MARGIN)
+        workload.append((name, encode(frame), encode(crop), landmarks, face_box, encode(tight)))
+    return workload
+
+def run_mode(face_svc: FaceService, workload, mode: str, iterations: int) -> dict:
+    cpu, wall, upload_bytes, embeddings = [], [], [], {}
+    for i in range(iterations):
+        name, frame_jpg, crop_jpg, landmarks, face_box, tight_jpg = workload[i % len(workload)]
+        payload = {"frame": frame_jpg, "crop+landmarks": crop_jpg, "crop": tight_jpg}[mode]
+        # landmarks / กรอบหน้าส่งเป็นข้อความเหมือนใน Form -> นับรวมทั้งขนาดและเวลา parse
+        landmarks_json = json.dumps(landmarks) if mode == "crop+landmarks" else None
+        box_text = ",".join(str(int(v)) for v in face_box) if mode == "crop+landmarks" else None
+
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        with metrics.capture():
+            img = face_svc.bytes_to_image(payload)
+            if mode == "frame":
+                result = face_svc.analyze(img)
+            else:
+                kps = json.loads(landmarks_json) if landmarks_json else None
+                box = [float(v) for v in box_text.split(",")] if box_text else None
+                result = face_svc.analyze_crop(img, kps, box)
+        cpu.append(time.process_time() - cpu_started)
+        wall.append(time.perf_counter() - wall_started)
+        upload_bytes.append(len(payload) + len(landmarks_json or "") + len(box_text or ""))
+        if result is not None and result.embedding is not None:
+            embeddings[name] = result.embedding
+
+    stats = {
+        "cpu": summarize(cpu),
+        "wall": summarize(wall),
+        "upload_kb_mean": float(np.mean(upload_bytes)) / 1024.0,
+        "embedded": len(embeddings),
+    }
+    print(format_row(f"{mode} cpu", stats["cpu"]), f"upload={stats['upload_kb_mean']:.1f}KB")
+    print(format_row(f"{mode} wall", stats["wall"]))
+    return stats, embeddings
+
+def cosine(a, b) -> float:
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    faces = load_faces(args.faces_dir)
+    if not faces:
+        raise SystemExit(f"No images found in {args.faces_dir}")
+
+    face_svc = FaceService(batching=False)
+    face_svc.load_models()
+    # วัดเฉพาะงานของโมเดล: ไม่ให้ Quality Gate ตัดเฟรมทิ้งต่างกันระหว่างสองทาง
+    face_svc.quality_gate = None
+    try:
+        face_svc.warm_up()
+        workload = build_workload(face_svc, faces, rng, tuple(args.frame_size))
+        if not workload:
+            raise SystemExit("Detector found no faces in the generated frames")
+        print(f"workload: {len(workload)} faces, frame={args.frame_size[0]}x{args.frame_size[1]}")
+
+        results, embeddings = {}, {}
+        for mode in ("frame", "crop+landmarks", "crop"):
+            run_mode(face_svc, workload, mode, args.warmup)
+            results[mode], embeddings[mode] = run_mode(face_svc, workload, mode, args.iterations)
+    finally:
+        face_svc.shutdown()
+
+    for mode in ("crop+landmarks", "crop"):
+        common = embeddings["frame"].keys() & embeddings[mode].keys()
+        sims = [cosine(embeddings["frame"][n], embeddings[mode][n]) for n in common]
+        results[mode]["cosine_vs_frame"] = {
+            "mean": float(np.mean(sims)) if sims else 0.0,
+            "min": float(np.min(sims)) if sims else 0.0,
+            "below_threshold": int(sum(s < settings.FACE_SIMILARITY_THRESHOLD for s in sims)),
+        }
+        saved = 1.0 - results[mode]["cpu"]["mean_ms"] / results["frame"]["cpu"]["mean_ms"]
+        results[mode]["cpu_saved_fraction"] = saved
+        print(f"{mode}: cpu saved {saved:.1%}, cosine vs frame "
+              f"mean={results[mode]['cosine_vs_frame']['mean']:.3f} min={results[mode]['cosine_vs_frame']['min']:.3f}")
+
+    results["config"] = {"frame_size": args.frame_size, "iterations": args.iterations, "crop_margin": CROP_MARGIN}
+    print(f"saved: {save_results('crop_verify', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces-dir", default="../ai/faces")
+    parser.add_argument("--frame-size", type=int, nargs=2, default=[720, 1280], metavar=("H", "W"))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
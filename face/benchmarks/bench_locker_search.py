@@ -0,0 +1,94 @@
+"""
+เทียบ latency ของการค้นหาทั้ง Gallery กับการค้นหาเฉพาะผู้ใช้ที่จองตู้ (locker-scoped) เมื่อ Gallery โตขึ้น
+
+  memory/full     GalleryIndex ค้นหาทั้ง matrix
+  memory/locker   GalleryIndex ค้นหาเฉพาะ sub-gallery ของตู้
+  qdrant/full     QdrantBackend ไม่มี filter
+  qdrant/locker   QdrantBackend + filter locker_id (payload index)
+
+ผู้ใช้ทุกคนถูกจองตู้ไว้ ตู้ละ --users-per-locker คน และ query คือหน้าเดิม + noise ยิงที่ตู้ของเจ้าของหน้า
+
+วิธีรัน (Qdrant Server บนเครื่อง, หรือ --local ใช้ Qdrant local mode):
+    python -m benchmarks.bench_locker_search --sizes 1000 10000 100000
+"""
+import argparse
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.services.collection_tuning import CollectionTuning
+from app.services.vector_backend import GalleryIndex, QdrantBackend
+from benchmarks.bench_qdrant_client import make_gallery
+from benchmarks.utils import summarize, format_row, save_results
+
+def locker_of(i: int, users_per_locker: int) -> str:
+    return f"L{i // users_per_locker}"
+
+def measure(search, queries, owners, args) -> dict:
+    """search(vector, locker_id) -> hits; นับว่าได้เจ้าของหน้ากลับมาหรือไม่"""
+    latencies, correct = [], 0
+    for q, owner in zip(queries, owners):
+        started = time.perf_counter()
+        hits = search(q, locker_of(owner, args.users_per_locker))
+        latencies.append(time.perf_counter() - started)
+        correct += bool(hits) and hits[0].id == owner
+    stats = summarize(latencies)
+    stats["top1_accuracy"] = correct / len(queries)
+    return stats
+
+def run_size(size: int, client: QdrantClient, args) -> dict:
+    gallery = make_gallery(size)
+    rng = np.random.default_rng(1)
+    owners = rng.integers(0, size, args.queries)
+    queries = gallery[owners] + rng.standard_normal((args.queries, gallery.shape[1])).astype(np.float32) * 0.03
+    payloads = [{"locker_id": locker_of(i, args.users_per_locker), "active": True} for i in range(size)]
+
+    index = GalleryIndex(initial_capacity=size)
+    for i in range(size):
+        index.upsert(i, gallery[i], payloads[i])
+
+    collection = f"locker_{uuid.uuid4().hex[:8]}"
+    backend = QdrantBackend(
+        client, collection,
+        tuning=CollectionTuning(exact=args.exact, payload_indexes={"locker_id": "keyword", "active": "bool"}),
+    )
+    backend.init_collection()
+    client.upload_collection(collection, vectors=gallery, payload=payloads, ids=range(size), batch_size=1024)
+
+    threshold = args.threshold
+    modes = {
+        "memory/full": lambda q, locker: index.search(q, threshold),
+        "memory/locker": lambda q, locker: index.search(q, threshold, locker_id=locker),
+        "qdrant/full": lambda q, locker: backend.search(q, threshold),
+        "qdrant/locker": lambda q, locker: backend.search(q, threshold, locker_id=locker),
+    }
+    results = {}
+    try:
+        for name, search in modes.items():
+            measure(search, queries[:20], owners[:20], args)  # warm-up
+            results[name] = measure(search, queries, owners, args)
+            print(format_row(f"{size}/{name}", results[name]), f"top1={results[name]['top1_accuracy']:.3f}")
+    finally:
+        client.delete_collection(collection)
+    return results
+
+def main(args):
+    client = QdrantClient(location=":memory:") if args.local else QdrantClient(host=args.host, port=args.port, timeout=300)
+    results = {"users_per_locker": args.users_per_locker}
+    for size in args.sizes:
+        results[str(size)] = run_size(size, client, args)
+    print(f"saved: {save_results('locker_search', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--local", action="store_true", help="ใช้ Qdrant local mode แทน Server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--users-per-locker", type=int, default=2)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--exact", action="store_true", help="Qdrant ค้นหาแบบ exact (ไม่ใช้ HNSW)")
+    main(parser.parse_args())
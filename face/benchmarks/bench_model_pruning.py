@@ -0,0 +1,101 @@
+"""
+เทียบ buffalo_l แบบโหลดทุกโมดูล (ของเดิม) กับแบบ pruned (detection + recognition, หน้าเดียว)
+วัด: เวลาโหลดโมเดล / RSS หลังโหลด / latency ต่อการเรียก 1 ครั้ง
+
+แต่ละโหมดรันใน Subprocess แยก เพื่อให้ค่า RSS ไม่ปนกัน
+
+วิธีรัน:
+    python -m benchmarks.bench_model_pruning --image ../ai/faces/face_1.png
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.utils import summarize, format_row, save_results
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+def child(mode: str, image_path: str, iterations: int):
+    import cv2
+    from insightface.app import FaceAnalysis
+
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    rss_before = rss_mb()
+
+    started = time.perf_counter()
+    allowed = None if mode == "full" else ["detection", "recognition"]
+    app = FaceAnalysis(name="buffalo_l", allowed_modules=allowed, providers=["CPUExecutionProvider"])
+    app.prepare(ctx_id=-1, det_size=(640, 640))
+    load_s = time.perf_counter() - started
+    rss_loaded = rss_mb()
+
+    def call_full():
+        # เส้นทางเดิม: get() รันทุกโมดูลกับทุกหน้า แล้วค่อย sort เลือกหน้าใหญ่สุด
+        faces = app.get(img)
+        return sorted(faces, key=lambda x: (x.bbox[2]-x.bbox[0]) * (x.bbox[3]-x.bbox[1]), reverse=True)[0]
+
+    def call_pruned():
+        # เส้นทางใหม่: Detector เลือกหน้าใหญ่สุดให้ แล้ว embed แค่หน้านั้น
+        from insightface.app.common import Face
+        bboxes, kpss = app.det_model.detect(img, max_num=1, metric="max")
+        face = Face(bbox=bboxes[0, 0:4], kps=kpss[0], det_score=bboxes[0, 4])
+        app.models["recognition"].get(img, face)
+        return face
+
+    call = call_full if mode == "full" else call_pruned
+    call()  # warm-up
+    samples = []
+    for _ in range(iterations):
+        t = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - t)
+
+    print(json.dumps({
+        "modules": sorted(app.models.keys()),
+        "load_s": load_s,
+        "rss_model_mb": rss_loaded - rss_before,
+        "rss_total_mb": rss_mb(),
+        "latency": summarize(samples),
+    }))
+
+def main(args):
+    results = {}
+    for mode in ("full", "pruned"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_model_pruning", "--child", mode,
+             "--image", args.image, "--iterations", str(args.iterations)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+
+    for mode, r in results.items():
+        print(f"[{mode}] modules={r['modules']}")
+        print(f"    load={r['load_s']:.2f}s  rss(models)={r['rss_model_mb']:.0f}MB  rss(total)={r['rss_total_mb']:.0f}MB")
+        print("    " + format_row("per-call", r["latency"]))
+
+    full, pruned = results["full"], results["pruned"]
+    results["savings"] = {
+        "load_s": full["load_s"] - pruned["load_s"],
+        "rss_mb": full["rss_total_mb"] - pruned["rss_total_mb"],
+        "p50_ms": full["latency"]["p50_ms"] - pruned["latency"]["p50_ms"],
+    }
+    print(f"savings: {results['savings']}")
+    print(f"saved: {save_results('model_pruning', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--child", choices=["full", "pruned"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.image, args.iterations)
+    else:
+        main(args)
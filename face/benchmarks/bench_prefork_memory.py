@@ -0,0 +1,119 @@
+"""
+เทียบหน่วยความจำ / เวลา Start ของ
+- independent : uvicorn --workers N (ทุก Worker โหลดโมเดลเอง)
+- prefork     : python -m app.prefork --workers N (Master โหลดครั้งเดียวแล้ว fork)
+
+วัดจาก /proc ของทุก Process ใน tree:
+  RSS = หน่วยความจำที่ Process เห็น (นับหน้าที่ใช้ร่วมกันซ้ำทุก Process)
+  PSS = หารหน้าที่ใช้ร่วมกันตามจำนวน Process -> ผลรวม PSS คือหน่วยความจำที่ใช้จริงทั้งเครื่อง
+  USS = หน้าที่เป็นของ Process นั้นคนเดียว
+
+วิธีรัน (Linux เท่านั้น):
+    QDRANT_LOCAL_PATH=:memory: python -m benchmarks.bench_prefork_memory --workers 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.utils import save_results
+
+def children_of(pid: int):
+    result = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                result.extend(int(c) for c in f.read().split())
+        except FileNotFoundError:
+            pass
+    return result
+
+def process_tree(pid: int):
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children_of(current))
+    return pids
+
+def memory_of(pid: int) -> dict:
+    """RSS / PSS / USS (MB) จาก smaps_rollup"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        cmdline = f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+    return {
+        "pid": pid,
+        "cmd": cmdline[:80],
+        "rss_mb": values.get("Rss", 0.0),
+        "pss_mb": values.get("Pss", 0.0),
+        "uss_mb": values.get("Private_Clean", 0.0) + values.get("Private_Dirty", 0.0),
+    }
+
+def wait_all_ready(url: str, workers: int, timeout: float) -> float:
+    """
+    รอจน /ready ตอบ 200 ติดกันหลายครั้ง (เปิด connection ใหม่ทุกครั้งให้ kernel กระจายไปหลาย Worker)
+    """
+    started = time.perf_counter()
+    streak = 0
+    while time.perf_counter() - started < timeout:
+        try:
+            ok = httpx.get(f"{url}/ready", timeout=5.0).status_code == 200
+        except httpx.TransportError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= workers * 4:
+            return time.perf_counter() - started
+        time.sleep(0.02 if ok else 0.2)
+    raise TimeoutError(f"Not all workers became ready within {timeout}s")
+
+def run(mode: str, args) -> dict:
+    if mode == "independent":
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+               "--workers", str(args.workers), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "app.prefork", "--port", str(args.port),
+               "--workers", str(args.workers), "--log-level", "warning"]
+
+    server = subprocess.Popen(cmd, env=dict(os.environ))
+    try:
+        ready_s = wait_all_ready(f"http://127.0.0.1:{args.port}", args.workers, args.timeout)
+        time.sleep(args.settle)
+        processes = [memory_of(pid) for pid in process_tree(server.pid)]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    total = {k: sum(p[k] for p in processes) for k in ("rss_mb", "pss_mb", "uss_mb")}
+    print(f"[{mode}] all {args.workers} workers ready in {ready_s:.2f}s")
+    for p in processes:
+        print(f"    pid={p['pid']:<7} rss={p['rss_mb']:7.0f}MB pss={p['pss_mb']:7.0f}MB "
+              f"uss={p['uss_mb']:7.0f}MB  {p['cmd']}")
+    print(f"    total  rss={total['rss_mb']:7.0f}MB pss={total['pss_mb']:7.0f}MB uss={total['uss_mb']:7.0f}MB")
+    return {"ready_s": ready_s, "processes": processes, "total": total}
+
+def main(args):
+    results = {mode: run(mode, args) for mode in ("independent", "prefork")}
+    ind, pre = results["independent"], results["prefork"]
+    results["savings"] = {
+        "pss_mb": ind["total"]["pss_mb"] - pre["total"]["pss_mb"],
+        "pss_per_worker_mb": (ind["total"]["pss_mb"] - pre["total"]["pss_mb"]) / args.workers,
+        "ready_s": ind["ready_s"] - pre["ready_s"],
+    }
+    print(f"savings: {results['savings']}")
+    print(f"saved: {save_results('prefork_memory', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--settle", type=float, default=2.0, help="รอหลัง ready ก่อนอ่าน memory (วินาที)")
+    main(parser.parse_args())
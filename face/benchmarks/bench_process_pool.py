@@ -0,0 +1,63 @@
+"""
+วัด Throughput ของ ProcessInferencePool เทียบกับจำนวน Worker Process
+(ควรเพิ่มเกือบเป็นเส้นตรงตามจำนวน Worker บนเครื่องหลาย Core)
+
+วิธีรัน:
+    python -m benchmarks.bench_process_pool --image ../ai/faces/face_1.png --workers 1 2 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from app.services.process_pool import ProcessInferencePool
+from benchmarks.utils import summarize, format_row, save_results
+
+def run(num_workers: int, img, requests: int):
+    pool = ProcessInferencePool(num_workers, slot_bytes=img.nbytes)
+    pool.start()
+    try:
+        # warm-up ให้ทุก Worker
+        with ThreadPoolExecutor(max_workers=num_workers) as ex:
+            list(ex.map(lambda _: pool.infer(img), range(num_workers * 2)))
+
+        latencies = []
+
+        def one(_):
+            started = time.perf_counter()
+            pool.infer(img)
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=num_workers * 2) as ex:
+            list(ex.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+
+    return {"throughput_rps": requests / elapsed, "latency": summarize(latencies)}
+
+def main(args):
+    img = cv2.imread(args.image, cv2.IMREAD_COLOR)
+    if img is None:
+        raise SystemExit(f"Cannot read image: {args.image}")
+
+    results = {}
+    for n in args.workers:
+        results[str(n)] = run(n, img, args.requests)
+
+    base = results[str(args.workers[0])]["throughput_rps"] / args.workers[0]
+    for n in args.workers:
+        r = results[str(n)]
+        r["scaling_efficiency"] = r["throughput_rps"] / (base * n)
+        print(format_row(f"workers={n}", r["latency"]),
+              f"{r['throughput_rps']:7.1f} req/s  efficiency={r['scaling_efficiency']:.2f}")
+    print(f"saved: {save_results('process_pool', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,170 @@
+"""
+เทียบ latency / throughput ของการค้นหาใน Qdrant จาก event loop ของ FastAPI
+  sync_blocking : QdrantClient (REST) เรียกตรงๆ ใน coroutine (แบบเดิม -> block event loop)
+  sync_thread   : QdrantClient (REST) ใน asyncio.to_thread
+  async_rest    : AsyncQdrantClient ผ่าน REST (connection pool)
+  async_grpc    : AsyncQdrantClient ผ่าน gRPC
+  async_batch   : AsyncQdrantClient.query_batch_points ทีละ --batch vector
+
+ยิงพร้อมกัน --concurrency coroutine เหมือน Request หลายตัวที่เข้ามาพร้อมกัน
+
+Stand-in: Qdrant Server บนเครื่อง (REST 6333 / gRPC 6334)
+    docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    python -m benchmarks.bench_qdrant_client --gallery 10000 --concurrency 16
+
+--local: ใช้ Qdrant local mode (":memory:") แทน Server (ไม่ผ่าน Network ไม่มี gRPC)
+วัดได้แค่ overhead ฝั่ง Client (แต่ละ Client มีข้อมูลชุดของตัวเอง)
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import Distance, PointStruct, QueryRequest, VectorParams
+
+from benchmarks.utils import summarize, format_row, save_results
+
+DIM = 512
+
+def make_gallery(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_queries(gallery: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    """หน้าเดิมที่ถ่ายใหม่ = vector ใน gallery + noise"""
+    rng = np.random.default_rng(seed)
+    picked = gallery[rng.integers(0, len(gallery), n)]
+    noisy = picked + rng.standard_normal(picked.shape).astype(np.float32) * 0.03
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+def seed(client: QdrantClient, collection: str, gallery: np.ndarray, batch: int = 1024):
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    client.create_collection(collection, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    for start in range(0, len(gallery), batch):
+        chunk = gallery[start:start + batch]
+        client.upsert(collection, points=[
+            PointStruct(id=start + i, vector=v.tolist(), payload={"locker_id": f"L{(start + i) % 100}", "active": True})
+            for i, v in enumerate(chunk)
+        ])
+
+async def seed_async(client: AsyncQdrantClient, collection: str, gallery: np.ndarray, batch: int = 1024):
+    if await client.collection_exists(collection):
+        await client.delete_collection(collection)
+    await client.create_collection(collection, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    for start in range(0, len(gallery), batch):
+        chunk = gallery[start:start + batch]
+        await client.upsert(collection, points=[
+            PointStruct(id=start + i, vector=v.tolist(), payload={"locker_id": f"L{(start + i) % 100}", "active": True})
+            for i, v in enumerate(chunk)
+        ])
+
+async def drive(one, queries: np.ndarray, concurrency: int, per_call: int = 1) -> dict:
+    """
+    ให้ concurrency coroutine ดึงงานจากคิวเดียวกันจนหมด
+    one(chunk) ค้นหา chunk ของ query (ขนาด per_call) -> เก็บ latency ต่อการเรียก
+    """
+    chunks = [queries[i:i + per_call] for i in range(0, len(queries), per_call)]
+    queue = asyncio.Queue()
+    for chunk in chunks:
+        queue.put_nowait(chunk)
+    latencies = []
+
+    async def worker():
+        while not queue.empty():
+            chunk = queue.get_nowait()
+            started = time.perf_counter()
+            await one(chunk)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = summarize(latencies)
+    stats["queries_per_s"] = len(queries) / elapsed
+    return stats
+
+async def run(args):
+    gallery = make_gallery(args.gallery)
+    queries = make_queries(gallery, args.queries)
+    collection = f"bench_{uuid.uuid4().hex[:8]}"
+    timeout = args.timeout
+
+    if args.local:
+        sync_client = QdrantClient(location=":memory:")
+        rest_client = AsyncQdrantClient(location=":memory:")
+        grpc_client = None
+        seed(sync_client, collection, gallery)
+        await seed_async(rest_client, collection, gallery)
+    else:
+        server = dict(host=args.host, port=args.port, grpc_port=args.grpc_port, timeout=max(1, int(timeout)))
+        sync_client = QdrantClient(**server)
+        rest_client = AsyncQdrantClient(**server)
+        grpc_client = AsyncQdrantClient(prefer_grpc=True, **server)
+        seed(sync_client, collection, gallery)
+
+    def search_sync(vector):
+        return sync_client.query_points(collection, query=vector.tolist(), limit=1, with_payload=True).points
+
+    async def sync_blocking(chunk):
+        search_sync(chunk[0])
+
+    async def sync_thread(chunk):
+        await asyncio.wait_for(asyncio.to_thread(search_sync, chunk[0]), timeout)
+
+    def async_single(client):
+        async def one(chunk):
+            await asyncio.wait_for(
+                client.query_points(collection, query=chunk[0].tolist(), limit=1, with_payload=True), timeout
+            )
+        return one
+
+    async def async_batch(chunk):
+        await asyncio.wait_for(rest_client.query_batch_points(collection, requests=[
+            QueryRequest(query=v.tolist(), limit=1, with_payload=True) for v in chunk
+        ]), timeout)
+
+    modes = {
+        "sync_blocking": (sync_blocking, 1),
+        "sync_thread": (sync_thread, 1),
+        "async_rest": (async_single(rest_client), 1),
+        "async_batch": (async_batch, args.batch),
+    }
+    if grpc_client is not None:
+        modes["async_grpc"] = (async_single(grpc_client), 1)
+
+    results = {"gallery": args.gallery, "concurrency": args.concurrency, "local": args.local}
+    try:
+        for name, (one, per_call) in modes.items():
+            if args.only and name not in args.only:
+                continue
+            await drive(one, queries[: args.concurrency * per_call * 2], args.concurrency, per_call)  # warm-up pool
+            stats = await drive(one, queries, args.concurrency, per_call)
+            results[name] = stats
+            print(format_row(name, stats), f"{stats['queries_per_s']:8.1f} q/s")
+    finally:
+        if not args.local:
+            sync_client.delete_collection(collection)
+        sync_client.close()
+        await rest_client.close()
+        if grpc_client is not None:
+            await grpc_client.close()
+
+    print(f"saved: {save_results('qdrant_client', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--local", action="store_true", help="ใช้ Qdrant local mode แทน Server")
+    parser.add_argument("--gallery", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=8, help="จำนวน vector ต่อ query_batch_points")
+    parser.add_argument("--timeout", type=float, default=5.0, help="timeout ต่อคำสั่ง (วินาที)")
+    parser.add_argument("--only", nargs="*", help="รันเฉพาะ mode ที่ระบุ")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,115 @@
+"""
+Recall / latency ของค่าปรับแต่ง Collection (HNSW / quantization / on-disk / exact) ที่ขนาด Gallery ต่างๆ
+
+แต่ละ (ขนาด, config) สร้าง Collection ใหม่ด้วย create_collection() ตัวเดียวกับที่ Service ใช้
+แล้ววัด:
+  build_s        เวลา upload + รอ optimizer สร้าง index เสร็จ (status = green)
+  recall@1 / @10 เทียบกับ exact top-k ที่คำนวณด้วย NumPy
+  latency        p50 / p95 / p99 ต่อ query (limit=10, search params ตาม config)
+
+ต้องใช้ Qdrant Server (local mode ไม่มี HNSW / quantization):
+    docker run -p 6333:6333 qdrant/qdrant
+    python -m benchmarks.bench_qdrant_tuning --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client import models
+
+from app.services.collection_tuning import CollectionTuning, create_collection
+from benchmarks.bench_qdrant_client import DIM, make_gallery, make_queries
+from benchmarks.utils import summarize, format_row, save_results
+
+CONFIGS = {
+    "exact": CollectionTuning(exact=True),
+    "hnsw_default": CollectionTuning(),
+    "hnsw_m32_ef128": CollectionTuning(hnsw_m=32, hnsw_ef_construct=200, hnsw_ef=128),
+    "scalar_int8": CollectionTuning(quantization="scalar"),
+    "binary_rescore": CollectionTuning(quantization="binary", quantization_oversampling=3.0),
+    "on_disk_scalar": CollectionTuning(on_disk=True, quantization="scalar"),
+}
+
+def exact_top_k(gallery: np.ndarray, queries: np.ndarray, k: int, chunk: int = 100_000) -> np.ndarray:
+    """Ground truth: top-k id ของแต่ละ query (cosine = dot product เพราะ normalize แล้ว)"""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(gallery), chunk):
+        scores = queries @ gallery[start:start + chunk].T
+        ids = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_ids = np.concatenate([best_ids, ids], axis=1)
+        top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_ids = np.take_along_axis(merged_ids, top, axis=1)
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_ids, order, axis=1)
+
+def wait_green(client: QdrantClient, collection: str, timeout: float):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if client.get_collection(collection).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"Collection {collection} not indexed within {timeout}s")
+
+def run_config(client: QdrantClient, tuning: CollectionTuning, gallery: np.ndarray,
+               queries: np.ndarray, truth: np.ndarray, args) -> dict:
+    collection = f"tuning_{uuid.uuid4().hex[:8]}"
+    create_collection(client, collection, DIM, tuning)
+    try:
+        started = time.perf_counter()
+        client.upload_collection(
+            collection_name=collection,
+            vectors=gallery,
+            payload=({"locker_id": f"L{i % 100}", "active": True} for i in range(len(gallery))),
+            ids=range(len(gallery)),
+            batch_size=1024,
+            parallel=args.parallel,
+        )
+        wait_green(client, collection, args.index_timeout)
+        build_s = time.perf_counter() - started
+
+        params = tuning.search_params()
+        latencies, found = [], []
+        for q in queries:
+            t = time.perf_counter()
+            points = client.query_points(collection, query=q.tolist(), limit=10, search_params=params).points
+            latencies.append(time.perf_counter() - t)
+            found.append([p.id for p in points])
+    finally:
+        client.delete_collection(collection)
+
+    recall_1 = np.mean([bool(f) and f[0] == t[0] for f, t in zip(found, truth)])
+    recall_10 = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+    stats = summarize(latencies)
+    return {"build_s": build_s, "recall@1": float(recall_1), "recall@10": float(recall_10), "latency": stats}
+
+def main(args):
+    client = QdrantClient(host=args.host, port=args.port, timeout=300)
+    results = {}
+    for size in args.sizes:
+        gallery = make_gallery(size)
+        queries = make_queries(gallery, args.queries)
+        truth = exact_top_k(gallery, queries, 10)
+        for name, tuning in CONFIGS.items():
+            if args.only and name not in args.only:
+                continue
+            r = run_config(client, tuning, gallery, queries, truth, args)
+            results[f"{size}/{name}"] = r
+            print(format_row(f"{size}/{name}", r["latency"]),
+                  f"recall@1={r['recall@1']:.3f} recall@10={r['recall@10']:.3f} build={r['build_s']:.1f}s")
+    print(f"saved: {save_results('qdrant_tuning', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--parallel", type=int, default=4, help="จำนวน Process ที่ใช้ upload")
+    parser.add_argument("--index-timeout", type=float, default=3600.0)
+    parser.add_argument("--only", nargs="*", help="รันเฉพาะ config ที่ระบุ")
+    main(parser.parse_args())
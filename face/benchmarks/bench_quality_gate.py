@@ -0,0 +1,181 @@
+"""
+วัด compute ที่ Quality Gate ประหยัดได้บน trace ของกล้องที่เล่นซ้ำ
+
+เล่นเฟรมชุดเดียวกันผ่าน FaceService.analyze() 2 รอบ:
+  gate_off   ทุกเฟรมเข้า Detector และทุกหน้าที่เจอเข้า Embed + Liveness (แบบเดิม)
+  gate_on    Quality Gate ตัดเฟรม/หน้าที่ไม่ผ่านก่อนโมเดลถัดไป
+
+รายงานต่อเฟรม: CPU time ของ Process (time.process_time) และ wall time, เวลารวมแต่ละ stage,
+จำนวนครั้งที่รัน detect / embed / liveness และเหตุผลที่ถูกตัด
+
+แหล่งเฟรม:
+  --video clip.mp4       วิดีโอที่อัดจากกล้องหน้าตู้ (เล่นทุกเฟรม ไม่หน่วงตาม FPS)
+  --frames-dir dir/      ภาพนิ่งเรียงตามชื่อไฟล์
+  (ไม่ใส่)               trace สังเคราะห์จาก ai/faces: หน้าชัด / เบลอจากการเคลื่อนไหว / มืด / หน้าเล็ก /
+                         หันข้าง (บิดภาพ) / ไม่มีคน ตามสัดส่วน --mix
+
+วิธีรัน:
+    python -m benchmarks.bench_quality_gate --video ../recordings/locker01.mp4
+    python -m benchmarks.bench_quality_gate --faces-dir ../ai/faces --frames 500
+"""
+import argparse
+import glob
+import os
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from app import metrics
+from app.services.face_service import FaceService
+from app.services.quality_gate import quality_gate_from_settings
+from benchmarks.bench_verify_pipeline import load_faces
+from benchmarks.utils import save_results
+
+MODEL_STAGES = ("detect", "embed", "liveness")
+KINDS = ("clean", "motion_blur", "dark", "small", "turned", "empty")
+
+def read_video(path: str, limit: int):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(("video", frame))
+    cap.release()
+    return frames
+
+def read_dir(path: str, limit: int):
+    paths = sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.png")))[:limit]
+    frames = [("dir", cv2.imread(p, cv2.IMREAD_COLOR)) for p in paths]
+    return [(kind, img) for kind, img in frames if img is not None]
+
+def place(face, rng: np.random.Generator, scale: float, size=(480, 640)):
+    """วางหน้าบนพื้นหลังเรียบๆ สีสุ่ม (เหมือนผนังหน้าตู้) ขนาด scale ของความสูงเฟรม"""
+    h, w = size
+    frame = np.full((h, w, 3), rng.integers(60, 180, size=3), dtype=np.uint8)
+    fh = max(8, int(h * scale))
+    fw = max(8, int(face.shape[1] * fh / face.shape[0]))
+    fw, fh = min(fw, w), min(fh, h)
+    y, x = rng.integers(0, h - fh + 1), rng.integers(0, w - fw + 1)
+    frame[y:y + fh, x:x + fw] = cv2.resize(face, (fw, fh))
+    return frame
+
+def synthetic_trace(faces, count: int, mix, rng: np.random.Generator):
+    """เฟรมแต่ละแบบตามสัดส่วน mix (ลำดับเดียวกับ KINDS) สุ่มลำดับแบบคงที่ตาม seed"""
+    weights = np.asarray(mix, dtype=np.float64)
+    kinds = rng.choice(len(KINDS), size=count, p=weights / weights.sum())
+    frames = []
+    for i, k in enumerate(kinds):
+        kind = KINDS[k]
+        _, face = faces[i % len(faces)]
+        if kind == "empty":
+            frame = place(face, rng, 0.5)
+            frame[:] = frame[0, 0]
+        elif kind == "small":
+            frame = place(face, rng, rng.uniform(0.06, 0.1))
+        else:
+            frame = place(face, rng, rng.uniform(0.45, 0.8))
+        if kind == "motion_blur":
+            length = int(rng.integers(15, 31))
+            kernel = np.zeros((length, length), dtype=np.float32)
+            kernel[length // 2, :] = 1.0 / length
+            frame = cv2.filter2D(frame, -1, kernel)
+        elif kind == "dark":
+            frame = (frame * rng.uniform(0.05, 0.12)).astype(np.uint8)
+        elif kind == "turned":
+            # บีบครึ่งหน้าด้านหนึ่งให้แคบ: จมูกเยื้องไปทางแก้ม เหมือนหันข้าง
+            h, w = frame.shape[:2]
+            src = np.float32([[0, 0], [w, 0], [0, h], [w, h]])
+            dst = np.float32([[0, 0], [w * 0.55, h * 0.1], [0, h], [w * 0.55, h * 0.9]])
+            frame = cv2.warpPerspective(frame, cv2.getPerspectiveTransform(src, dst), (w, h))
+        frames.append((kind, frame))
+    return frames
+
+def replay(face_svc: FaceService, frames, gate) -> dict:
+    face_svc.quality_gate = gate
+    stage_s, stage_n = Counter(), Counter()
+    reasons, outcomes = Counter(), Counter()
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for kind, img in frames:
+        with metrics.capture() as timings:
+            result = face_svc.analyze(img)
+        for name, seconds in timings:
+            stage_s[name] += seconds
+            stage_n[name] += 1
+        if result is None:
+            outcomes[f"{kind}/no_face"] += 1
+        elif not result.quality_ok:
+            outcomes[f"{kind}/low_quality"] += 1
+            reasons.update(result.quality_reasons)
+        else:
+            outcomes[f"{kind}/{'real' if result.is_real else 'spoof'}"] += 1
+    cpu_s, wall_s = time.process_time() - cpu_started, time.perf_counter() - wall_started
+
+    n = len(frames)
+    return {
+        "frames": n,
+        "cpu_ms_per_frame": cpu_s * 1000.0 / n,
+        "wall_ms_per_frame": wall_s * 1000.0 / n,
+        "model_ms_per_frame": sum(stage_s[s] for s in MODEL_STAGES) * 1000.0 / n,
+        "quality_ms_per_frame": stage_s["quality"] * 1000.0 / n,
+        "stage_ms_total": {name: seconds * 1000.0 for name, seconds in stage_s.items()},
+        "stage_calls": dict(stage_n),
+        "reasons": dict(reasons),
+        "outcomes": dict(sorted(outcomes.items())),
+    }
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    if args.video:
+        frames = read_video(args.video, args.frames)
+    elif args.frames_dir:
+        frames = read_dir(args.frames_dir, args.frames)
+    else:
+        faces = load_faces(args.faces_dir)
+        if not faces:
+            raise SystemExit(f"No images found in {args.faces_dir}")
+        frames = synthetic_trace(faces, args.frames, args.mix, rng)
+    if not frames:
+        raise SystemExit("No frames to replay")
+    print(f"trace: {len(frames)} frames {dict(Counter(kind for kind, _ in frames))}")
+
+    face_svc = FaceService(batching=False)
+    face_svc.load_models()
+    gate = quality_gate_from_settings()
+    try:
+        face_svc.warm_up()
+        results = {}
+        for name, mode_gate in (("gate_off", None), ("gate_on", gate)):
+            replay(face_svc, frames[:args.warmup], mode_gate)
+            results[name] = r = replay(face_svc, frames, mode_gate)
+            print(f"{name:<10} cpu={r['cpu_ms_per_frame']:8.2f}ms/frame wall={r['wall_ms_per_frame']:8.2f}ms/frame "
+                  f"models={r['model_ms_per_frame']:8.2f}ms/frame quality={r['quality_ms_per_frame']:6.3f}ms/frame "
+                  f"calls={r['stage_calls']}")
+    finally:
+        face_svc.shutdown()
+
+    off, on = results["gate_off"], results["gate_on"]
+    results["saved"] = {
+        "cpu_fraction": 1.0 - on["cpu_ms_per_frame"] / off["cpu_ms_per_frame"],
+        "model_fraction": 1.0 - on["model_ms_per_frame"] / max(off["model_ms_per_frame"], 1e-9),
+    }
+    results["gate"] = vars(gate)
+    print(f"saved: cpu {results['saved']['cpu_fraction']:.1%}, model time {results['saved']['model_fraction']:.1%}; "
+          f"reasons={on['reasons']}")
+    print(f"saved: {save_results('quality_gate', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="วิดีโอที่อัดจากกล้อง")
+    parser.add_argument("--frames-dir", help="โฟลเดอร์ภาพนิ่งของ trace")
+    parser.add_argument("--faces-dir", default="../ai/faces", help="หน้าที่ใช้สร้าง trace สังเคราะห์")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--mix", type=float, nargs=len(KINDS), default=[0.4, 0.15, 0.1, 0.1, 0.1, 0.15],
+                        metavar="W", help=f"สัดส่วนเฟรมแต่ละแบบ: {' '.join(KINDS)}")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
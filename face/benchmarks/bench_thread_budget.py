@@ -0,0 +1,103 @@
+"""
+เทียบการตั้งค่า Thread ของ ONNX Runtime / Torch / OpenCV ภายใต้โหลดพร้อมกันหลาย Worker
+(ค่า default ของแต่ละ library vs CPU budget allocator และตัวแปรต่างๆ)
+
+แต่ละ config รันใน Subprocess แยก (Thread pool ของ Torch / OpenCV ตั้งได้ครั้งเดียวต่อ Process)
+โดยส่งค่า Config ผ่าน Environment Variable แบบเดียวกับ .env
+
+วิธีรัน:
+    python -m benchmarks.bench_thread_budget --image ../ai/faces/face_1.png --workers 2 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+
+from benchmarks.utils import summarize, format_row, save_results
+
+def configs(cores: int):
+    return {
+        # library ต่างคนต่างใช้ค่า default (Thread pool เท่าจำนวน Core ทุกตัว)
+        "untuned": {"CPU_BUDGET_ENABLED": "false"},
+        "budget": {},
+        "budget_no_spin": {"ORT_ALLOW_SPINNING": "false"},
+        "budget_parallel": {"ORT_EXECUTION_MODE": "parallel", "ORT_INTER_OP_THREADS": "2"},
+        "budget_basic_graph": {"ORT_GRAPH_OPTIMIZATION": "basic"},
+        # ให้ทุก Worker ได้ทุก Core (oversubscribe แบบจงใจ)
+        "oversubscribed": {
+            "ORT_INTRA_OP_THREADS": str(cores),
+            "TORCH_NUM_THREADS": str(cores),
+            "CV2_NUM_THREADS": str(cores),
+        },
+    }
+
+def child(image_path: str, workers: int, requests: int):
+    import cv2
+    from app.services.face_service import FaceService
+
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    service = FaceService(batching=False)
+    service.load_models()
+
+    # Worker แต่ละตัวมี session ของตัวเอง เหมือน Inference Pool จริง
+    executor = ThreadPoolExecutor(max_workers=workers, initializer=service.load_worker_models)
+    list(executor.map(lambda _: service.analyze(img), range(workers * 2)))  # warm-up
+
+    latencies = []
+
+    def one(_):
+        t = time.perf_counter()
+        service.analyze(img)
+        latencies.append(time.perf_counter() - t)
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    cpu_used = time.process_time() - cpu_started
+    executor.shutdown()
+
+    print(json.dumps({
+        "budget": None if service.budget is None else asdict(service.budget),
+        "throughput_rps": requests / elapsed,
+        # CPU-seconds ต่อ Request (รวม busy-wait ของ Thread ที่ spin อยู่)
+        "cpu_s_per_request": cpu_used / requests,
+        "latency": summarize(latencies),
+    }))
+
+def main(args):
+    cores = os.cpu_count() or 1
+    results = {}
+    for workers in args.workers:
+        for name, overrides in configs(cores).items():
+            if args.only and name not in args.only:
+                continue
+            env = dict(os.environ, INFERENCE_WORKERS=str(workers), INFERENCE_MODE="thread", **overrides)
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_thread_budget", "--child",
+                 "--image", args.image, "--workers", str(workers), "--requests", str(args.requests)],
+                check=True, capture_output=True, text=True, env=env,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            r["overrides"] = overrides
+            results[f"w{workers}/{name}"] = r
+            print(format_row(f"w{workers}/{name}", r["latency"]),
+                  f"{r['throughput_rps']:6.1f} req/s  cpu={r['cpu_s_per_request'] * 1000:6.1f}ms/req")
+    print(f"saved: {save_results('thread_budget', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--only", nargs="*", help="รันเฉพาะ config ที่ระบุ")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.image, args.workers[0], args.requests)
+    else:
+        main(args)
@@ -0,0 +1,169 @@
+"""
+Benchmark ของ Pipeline /verify แบบ offline (ไม่ต้องมี Qdrant Server / กล้อง / Network)
+
+- decode / detect / embed / liveness ผ่าน FaceService ตัวจริง
+- search ผ่าน QdrantService ที่ต่อกับ QdrantClient(":memory:")
+  (--backend memory = GalleryIndex ใน RAM, --backend qdrant = Qdrant local mode)
+- Gallery = หน้าจริงจาก ai/faces + embedding สุ่มเติมให้ครบ --gallery-size
+- ภาพทดสอบ = ai/faces + ภาพสังเคราะห์ (หน้าจริงแปะบนพื้นหลัง noise หลายขนาด / ภาพไม่มีหน้า)
+
+รายงาน p50 / p95 / p99 และ throughput ต่อ stage และ end-to-end แล้วบันทึกเป็น JSON
+
+วิธีรัน:
+    python -m benchmarks.bench_verify_pipeline --faces-dir ../ai/faces --gallery-size 10000
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app import metrics
+from app.config import settings
+from app.services.face_service import FaceService
+from app.services.vector_backend import EMBEDDING_DIM
+from app.services.vector_db import QdrantService
+from benchmarks.utils import summarize, format_row, save_results
+
+STAGES = ("decode", "detect", "embed", "liveness", "search")
+
+def load_faces(faces_dir: str):
+    paths = sorted(glob.glob(os.path.join(faces_dir, "*.png")) + glob.glob(os.path.join(faces_dir, "*.jpg")))
+    faces = [(os.path.basename(p), cv2.imread(p, cv2.IMREAD_COLOR)) for p in paths]
+    return [(name, img) for name, img in faces if img is not None]
+
+def synthetic_frames(faces, count: int, rng: np.random.Generator, size=(480, 640)):
+    """หน้าจริงย่อ/ขยายแบบสุ่มแล้วแปะบนพื้นหลัง noise (ทุกๆ 5 ภาพเป็นภาพไม่มีหน้า)"""
+    h, w = size
+    frames = []
+    for i in range(count):
+        frame = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        if i % 5 != 4 and faces:
+            _, face = faces[i % len(faces)]
+            scale = rng.uniform(0.3, 0.9) * min(h / face.shape[0], w / face.shape[1])
+            fh, fw = max(1, int(face.shape[0] * scale)), max(1, int(face.shape[1] * scale))
+            y, x = rng.integers(0, h - fh + 1), rng.integers(0, w - fw + 1)
+            frame[y:y + fh, x:x + fw] = cv2.resize(face, (fw, fh))
+        frames.append((f"synthetic_{i}", frame))
+    return frames
+
+def encode(img) -> bytes:
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok:
+        raise RuntimeError("Failed to encode benchmark image")
+    return buf.tobytes()
+
+def build_gallery(faces, face_svc: FaceService, size: int, rng: np.random.Generator) -> QdrantService:
+    qdrant = QdrantService(client=QdrantClient(":memory:"))
+    qdrant.init_collection()
+
+    enrolled = 0
+    for user_id, (_, img) in enumerate(faces, start=1):
+        result = face_svc.analyze(img)
+        if result is not None and result.quality_ok:
+            qdrant.upsert_face(user_id, f"locker_{user_id:02d}", result.embedding.tolist())
+            enrolled += 1
+
+    # เติม embedding สุ่มให้ Gallery ใหญ่เท่าของจริง
+    for user_id in range(len(faces) + 1, size + 1):
+        vec = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        qdrant.backend.upsert(user_id, vec.tolist(), {"locker_id": None, "active": True})
+    print(f"gallery: {size} vectors ({enrolled} real faces), backend={settings.VECTOR_BACKEND}")
+    return qdrant
+
+def verify_once(face_svc: FaceService, qdrant: QdrantService, image_bytes: bytes, samples: dict):
+    """เส้นทางเดียวกับ /verify (ไม่รวม HTTP) + เก็บเวลาแต่ละ stage"""
+    started = time.perf_counter()
+    with metrics.capture() as timings:
+        with metrics.stage("decode"):
+            img = face_svc.bytes_to_image(image_bytes)
+        result = face_svc.analyze(img)
+        if result is not None and result.quality_ok and result.is_real:
+            with metrics.stage("search"):
+                qdrant.search_face(result.embedding)
+    samples["end_to_end"].append(time.perf_counter() - started)
+    for name, seconds in timings:
+        samples.setdefault(name, []).append(seconds)
+    return result
+
+def report(samples: dict) -> dict:
+    results = {}
+    for name in STAGES + ("end_to_end",):
+        stats = summarize(samples.get(name, []))
+        if stats.get("count"):
+            # throughput แบบ serial (1 Thread): จำนวนครั้ง / เวลารวมของ stage นั้น
+            stats["throughput_ops"] = 1000.0 / stats["mean_ms"]
+            print(format_row(name, stats), f"{stats['throughput_ops']:8.1f} ops/s")
+        results[name] = stats
+    return results
+
+def bench_search_only(qdrant: QdrantService, iterations: int, rng: np.random.Generator) -> dict:
+    """ค้นหาอย่างเดียวด้วย query สุ่ม (แยกผลของ Gallery size ออกจากโมเดล)"""
+    samples = []
+    for _ in range(iterations):
+        query = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        started = time.perf_counter()
+        qdrant.search_face(query)
+        samples.append(time.perf_counter() - started)
+    stats = summarize(samples)
+    stats["throughput_ops"] = iterations / sum(samples)
+    print(format_row("search_only", stats), f"{stats['throughput_ops']:8.1f} ops/s")
+    return stats
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    settings.VECTOR_BACKEND = args.backend
+
+    faces = load_faces(args.faces_dir)
+    if not faces:
+        raise SystemExit(f"No images found in {args.faces_dir}")
+
+    face_svc = FaceService(batching=args.batching)
+    face_svc.load_models()
+    try:
+        qdrant = build_gallery(faces, face_svc, max(args.gallery_size, len(faces)), rng)
+
+        workload = [(name, encode(img)) for name, img in faces + synthetic_frames(faces, args.synthetic, rng)]
+        for _, image_bytes in workload[:args.warmup]:
+            verify_once(face_svc, qdrant, image_bytes, {"end_to_end": []})
+
+        samples = {"end_to_end": []}
+        faces_found = 0
+        for i in range(args.iterations):
+            _, image_bytes = workload[i % len(workload)]
+            if verify_once(face_svc, qdrant, image_bytes, samples) is not None:
+                faces_found += 1
+
+        print(f"iterations={args.iterations} faces_found={faces_found}")
+        results = {
+            "config": {
+                "backend": args.backend,
+                "gallery_size": args.gallery_size,
+                "batching": args.batching,
+                "iterations": args.iterations,
+                "workload_images": len(workload),
+                "faces_found": faces_found,
+            },
+            "stages": report(samples),
+            "search_only": bench_search_only(qdrant, args.search_iterations, rng),
+        }
+    finally:
+        face_svc.shutdown()
+
+    print(f"saved: {save_results('verify_pipeline', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces-dir", default="../ai/faces")
+    parser.add_argument("--backend", choices=["memory", "qdrant"], default="memory")
+    parser.add_argument("--gallery-size", type=int, default=10000)
+    parser.add_argument("--synthetic", type=int, default=20, help="จำนวนภาพสังเคราะห์ที่เพิ่มเข้า workload")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--search-iterations", type=int, default=1000)
+    parser.add_argument("--batching", action="store_true", help="ส่ง Recognition ผ่าน EmbeddingBatcher")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,242 @@
+"""
+Load test ระดับ HTTP: ยิงรูปจาก corpus ซ้ำๆ ไปที่ /api/v1/verify, /identify หรือ /check-in
+เพื่อหาว่าเครื่องเดียวรับได้กี่ตู้ (throughput vs latency + จุดอิ่มตัว)
+
+โหมด
+- open   : ยิงตามอัตราคงที่ (req/s) ไม่รอคำตอบ -> latency นับจากเวลาที่ "ควร" ส่ง (ไม่โดน coordinated omission)
+- closed : Client N ตัว ยิงแล้วรอคำตอบก่อนยิงใหม่
+
+แต่ละขั้น (--rates หรือ --concurrency) รัน --duration วินาที แล้วหยุดที่ขั้นแรกที่อิ่มตัว:
+  error rate > --max-error-rate, p99 > --slo-ms,
+  open: ทำได้ไม่ถึง 95% ของอัตราที่ยิง / closed: throughput เพิ่มไม่ถึง 5%
+
+รันกับ Stand-in แทน Qdrant / PostgreSQL:
+    # face
+    QDRANT_LOCAL_PATH=:memory: VECTOR_BACKEND=memory uvicorn app.main:app --port 8000
+    # InsightFace
+    QDRANT_LOCAL_PATH=:memory: uvicorn main:app --port 8001
+    # face-ai
+    QDRANT_LOCAL_PATH=:memory: DATABASE_URL=sqlite+aiosqlite:///./loadtest.db uvicorn main:app --port 8002
+
+    python -m benchmarks.load_http --target verify --corpus ../ai/faces --enroll --mode open --rates 2 4 8 16 32
+    python -m benchmarks.load_http --target identify --url http://localhost:8001 --corpus ../ai/faces --enroll \\
+        --mode closed --concurrency 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import glob
+import os
+import random
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.utils import summarize, save_results
+
+# path ของ endpoint ที่ทดสอบ / endpoint ลงทะเบียน (ใช้กับ --enroll) ของแต่ละ Service
+TARGETS = {
+    "verify": {"path": "/api/v1/verify", "register": "/api/v1/register"},
+    "identify": {"path": "/identify", "register": "/register"},
+    "check-in": {"path": "/check-in", "register": "/register"},
+}
+
+def load_corpus(directory: str):
+    paths = sorted(
+        p for ext in ("*.jpg", "*.jpeg", "*.png")
+        for p in glob.glob(os.path.join(directory, ext))
+    )
+    corpus = []
+    for path in paths:
+        with open(path, "rb") as f:
+            content_type = "image/png" if path.endswith(".png") else "image/jpeg"
+            corpus.append((os.path.basename(path), f.read(), content_type))
+    return corpus
+
+async def enroll(client: httpx.AsyncClient, url: str, target: str, corpus):
+    """ลงทะเบียนทุกรูปใน corpus ก่อน เพื่อให้การค้นหาเจอคนจริง (ไม่ใช่ unknown ทุกครั้ง)"""
+    path = url + TARGETS[target]["register"]
+    ok = 0
+    for i, (name, data, content_type) in enumerate(corpus, start=1):
+        files = {"file": (name, data, content_type)}
+        if target == "verify":
+            resp = await client.post(path, data={"user_id": str(i)}, files=files)
+        elif target == "identify":
+            resp = await client.post(path, params={"user_id": f"user_{i:03d}"}, files=files)
+        else:
+            resp = await client.post(path, data={"student_no": f"S{i:05d}", "name": name}, files=files)
+        ok += resp.status_code < 300
+    print(f"enrolled {ok}/{len(corpus)} images")
+
+class StepResult:
+    def __init__(self):
+        self.latencies = []
+        self.errors = Counter()
+        self.outcomes = Counter()
+        self.sent = 0
+
+    async def send(self, client: httpx.AsyncClient, path: str, item, started: float):
+        name, data, content_type = item
+        self.sent += 1
+        try:
+            resp = await client.post(path, files={"file": (name, data, content_type)})
+        except httpx.HTTPError as e:
+            self.errors[type(e).__name__] += 1
+            return
+        if resp.status_code >= 500:
+            self.errors[f"http_{resp.status_code}"] += 1
+            return
+        self.latencies.append(time.perf_counter() - started)
+        # เก็บผลลัพธ์ทางธุรกิจ (allow / reject / match ...) แยกจาก error ของระบบ
+        try:
+            body = resp.json()
+            outcome = body.get("status") or ("match" if body.get("match") else "no_match")
+        except ValueError:
+            outcome = f"http_{resp.status_code}"
+        self.outcomes[str(outcome)] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        completed = len(self.latencies)
+        errors = sum(self.errors.values())
+        return {
+            "sent": self.sent,
+            "completed": completed,
+            "throughput_rps": completed / elapsed if elapsed > 0 else 0.0,
+            "error_rate": errors / self.sent if self.sent else 0.0,
+            "errors": dict(self.errors),
+            "outcomes": dict(self.outcomes),
+            "latency": summarize(self.latencies),
+        }
+
+async def run_open(client, path, corpus, rate: float, duration: float, max_inflight: int, poisson: bool):
+    result = StepResult()
+    tasks = set()
+    start = time.perf_counter()
+    next_at = start
+    i = 0
+    while next_at < start + duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_inflight:
+            # Server ตามไม่ทัน -> นับเป็น error ฝั่ง client แทนการรอ (ไม่งั้นอัตราที่ยิงจะลดลงเอง)
+            result.sent += 1
+            result.errors["client_backlog"] += 1
+        else:
+            task = asyncio.create_task(result.send(client, path, corpus[i % len(corpus)], next_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        i += 1
+        next_at += random.expovariate(rate) if poisson else 1.0 / rate
+    if tasks:
+        await asyncio.gather(*tasks)
+    return result.summary(time.perf_counter() - start)
+
+async def run_closed(client, path, corpus, concurrency: int, duration: float):
+    result = StepResult()
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            await result.send(client, path, corpus[i % len(corpus)], time.perf_counter())
+            i += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(k) for k in range(concurrency)))
+    return result.summary(time.perf_counter() - start)
+
+def saturation_reason(args, step: dict, offered, previous) -> str:
+    if step["error_rate"] > args.max_error_rate:
+        return f"error_rate {step['error_rate']:.1%}"
+    p99 = step["latency"].get("p99_ms")
+    if p99 is not None and p99 > args.slo_ms:
+        return f"p99 {p99:.0f}ms > {args.slo_ms:.0f}ms"
+    if args.mode == "open" and step["throughput_rps"] < 0.95 * offered:
+        return f"achieved {step['throughput_rps']:.1f} < offered {offered:.1f} req/s"
+    if args.mode == "closed" and previous and step["throughput_rps"] < 1.05 * previous["throughput_rps"]:
+        return "throughput stopped scaling"
+    return ""
+
+async def main(args):
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        raise SystemExit(f"No images found in {args.corpus}")
+    path = args.url + TARGETS[args.target]["path"]
+    random.seed(args.seed)
+
+    max_conn = max(args.concurrency or [1]) if args.mode == "closed" else args.max_inflight
+    limits = httpx.Limits(max_connections=max_conn + 4, max_keepalive_connections=max_conn + 4)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        if args.enroll:
+            await enroll(client, args.url, args.target, corpus)
+
+        # warm-up ให้ Server โหลด/JIT ให้เรียบร้อยก่อนเริ่มวัด
+        await run_closed(client, path, corpus, 1, args.warmup)
+
+        levels = args.rates if args.mode == "open" else args.concurrency
+        curve, saturation, previous = [], None, None
+        for level in levels:
+            if args.mode == "open":
+                step = await run_open(client, path, corpus, level, args.duration, args.max_inflight, args.poisson)
+            else:
+                step = await run_closed(client, path, corpus, int(level), args.duration)
+            step["level"] = level
+            curve.append(step)
+
+            lat = step["latency"]
+            print(
+                f"{args.mode}={level:<6} {step['throughput_rps']:7.1f} req/s  "
+                f"p50={lat.get('p50_ms', 0):8.1f}ms p95={lat.get('p95_ms', 0):8.1f}ms "
+                f"p99={lat.get('p99_ms', 0):8.1f}ms  errors={step['error_rate']:.1%}  {step['outcomes']}"
+            )
+
+            reason = saturation_reason(args, step, level, previous)
+            if reason:
+                saturation = {
+                    "level": level,
+                    "reason": reason,
+                    # ขั้นก่อนหน้า = จุดที่ยังรับไหวสูงสุด
+                    "max_sustainable_level": previous["level"] if previous else None,
+                    "max_sustainable_rps": previous["throughput_rps"] if previous else None,
+                }
+                print(f"saturated at {args.mode}={level}: {reason}")
+                if not args.keep_going:
+                    break
+            previous = step
+
+    results = {
+        "config": {
+            "target": args.target,
+            "url": args.url,
+            "mode": args.mode,
+            "duration_s": args.duration,
+            "slo_ms": args.slo_ms,
+            "max_error_rate": args.max_error_rate,
+            "corpus_images": len(corpus),
+            "poisson": args.poisson,
+        },
+        "curve": curve,
+        "saturation": saturation,
+    }
+    print(f"saved: {save_results(f'load_{args.target}_{args.mode}', results)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=sorted(TARGETS), default="verify")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--corpus", required=True, help="โฟลเดอร์รูป (.jpg / .png) ที่จะยิงวนซ้ำ")
+    parser.add_argument("--enroll", action="store_true", help="ลงทะเบียนรูปใน corpus ก่อนเริ่มยิง")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8, 16, 32], help="req/s ต่อขั้น (open)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Client ต่อขั้น (closed)")
+    parser.add_argument("--poisson", action="store_true", help="เว้นระยะแบบสุ่ม (Poisson) แทนระยะคงที่")
+    parser.add_argument("--duration", type=float, default=20.0, help="วินาทีต่อขั้น")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p99 สูงสุดที่ยอมรับได้")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-inflight", type=int, default=256, help="Request ค้างสูงสุด (open)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--keep-going", action="store_true", help="รันทุกขั้นแม้จะอิ่มตัวแล้ว")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,80 @@
+"""
+FaceService.analyze_crop เมื่อ Client ส่ง crop ที่ขยายขอบ (margin) มาพร้อมกรอบหน้า:
+Quality Gate และ Liveness ต้องดูแค่กรอบหน้า ส่วน Align ใช้ทั้ง crop
+
+โมเดล Recognition / Anti-Spoof ถูกแทนด้วยตัวที่จดว่าได้ภาพขนาดเท่าไร (ไม่ต้องโหลดโมเดลจริง)
+
+รัน (จากโฟลเดอร์ face/):
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+from insightface.utils import face_align
+
+from app.services.face_service import FaceService
+from app.services.quality_gate import QualityGate
+
+MARGIN = 20
+FACE = 100  # ขนาดกรอบหน้า (พิกเซล)
+
+class FakeRecognition:
+    def get_feat(self, aligned):
+        return np.ones((1, 512), dtype=np.float32)
+
+class FakeApp:
+    models = {"recognition": FakeRecognition()}
+
+@pytest.fixture
+def service(monkeypatch):
+    svc = FaceService(batching=False)
+    svc.quality_gate = QualityGate(min_face_px=60.0, min_blur_var=0.0)
+    svc.liveness_inputs = []
+
+    def liveness_score(face_img):
+        svc.liveness_inputs.append(face_img.shape[:2])
+        return 0.99
+
+    monkeypatch.setattr(svc, "_get_app", lambda: FakeApp())
+    monkeypatch.setattr(svc, "liveness_score", liveness_score)
+    return svc
+
+def margin_crop(face: int = FACE, margin: int = MARGIN):
+    """crop ที่มีขอบรอบหน้า + กรอบหน้า / 5 จุดในพิกัดของ crop"""
+    rng = np.random.default_rng(0)
+    size = face + 2 * margin
+    crop = rng.integers(60, 200, size=(size, size, 3), dtype=np.uint8)
+    bbox = [margin, margin, margin + face, margin + face]
+    kps = (face_align.arcface_dst * (face / 112.0) + margin).tolist()
+    return crop, kps, bbox
+
+def test_liveness_runs_on_face_box_not_margin(service):
+    crop, kps, bbox = margin_crop()
+    result = service.analyze_crop(crop, kps, bbox)
+
+    assert result.quality_ok and result.embedding is not None
+    assert service.liveness_inputs == [(FACE, FACE)]
+    assert result.bbox.tolist() == bbox
+
+def test_face_size_is_measured_on_face_box(service):
+    # crop รวม margin = 90px ผ่าน min_face_px แต่หน้าจริงแค่ 50px
+    crop, kps, bbox = margin_crop(face=50)
+    result = service.analyze_crop(crop, kps, bbox)
+
+    assert result.quality_reasons == ["face_too_small"]
+    assert service.liveness_inputs == []
+
+def test_without_box_whole_crop_is_the_face(service):
+    crop, _, _ = margin_crop(margin=0)
+    result = service.analyze_crop(crop)
+
+    assert result.quality_ok
+    assert service.liveness_inputs == [(FACE, FACE)]
+    # template ของ ArcFace วางบนกรอบ = ทั้ง crop
+    assert np.allclose(result.kps, face_align.arcface_dst * (FACE / 112.0))
+
+def test_anti_spoof_preprocess_does_not_share_buffer():
+    model = FaceService(batching=False).anti_spoof
+    first = model.preprocess(np.full((80, 80, 3), 255, dtype=np.uint8))
+    # Request ถัดไปเขียน buffer ที่ใช้ซ้ำ -> Tensor ที่คืนไปแล้วต้องไม่เปลี่ยนตาม
+    model.preprocess(np.zeros((80, 80, 3), dtype=np.uint8))
+    assert float(first.min()) == 1.0
@@ -0,0 +1,57 @@
+"""
+Cache ใน Worker หนึ่งต้องใช้ไม่ได้ทันทีเมื่อ Worker อื่น (fork จาก Master เดียวกัน) เขียนข้อมูลผู้ใช้นั้น
+
+รัน (จากโฟลเดอร์ face/):
+    python -m pytest tests
+"""
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+from app.services.decision_cache import DecisionCache
+from app.services.generations import UserGenerations
+from app.services.vector_backend import SearchHit
+
+def bump_in_child(generations: UserGenerations, user_id):
+    """เหมือน QdrantService._changed ใน Worker อื่น"""
+    ctx = mp.get_context("fork")
+    proc = ctx.Process(target=generations.bump, args=(user_id,))
+    proc.start()
+    proc.join(10)
+    assert proc.exitcode == 0
+
+@pytest.fixture
+def generations():
+    return UserGenerations(slots=64)
+
+def test_bump_in_forked_worker_is_visible(generations):
+    before, version = generations.get(7), generations.version()
+    bump_in_child(generations, 7)
+    assert generations.get(7) == before + 1
+    assert generations.version() == version + 1
+    # id แบบ str / int ของผู้ใช้คนเดียวกันต้องได้ช่องเดียวกัน
+    assert generations.get("7") == generations.get(7)
+
+def test_decision_cache_drops_result_changed_in_other_worker(generations):
+    cache = DecisionCache(max_devices=4, per_device=2, ttl_s=60.0, min_similarity=0.9, generations=generations)
+    embedding = np.ones(512, dtype=np.float32)
+    cache.store("locker-1", embedding, SearchHit(id=7, score=0.95, payload={"locker_id": "L1"}))
+    assert cache.lookup("locker-1", embedding).id == 7
+
+    bump_in_child(generations, 7)
+    assert cache.lookup("locker-1", embedding) is None
+
+def test_decision_cache_skips_store_when_user_changed_during_search(generations):
+    cache = DecisionCache(max_devices=4, per_device=2, ttl_s=60.0, min_similarity=0.9, generations=generations)
+    embedding = np.ones(512, dtype=np.float32)
+    hit = SearchHit(id=7, score=0.95, payload={"locker_id": "L1"})
+
+    since = generations.version()
+    # ลบ / ย้ายตู้ระหว่างที่การค้นหายังไม่เสร็จ
+    bump_in_child(generations, 7)
+    assert cache.store("locker-1", embedding, hit, since=since) is False
+    assert cache.lookup("locker-1", embedding) is None
+
+    assert cache.store("locker-1", embedding, hit, since=generations.version()) is True
+    assert cache.lookup("locker-1", embedding).id == 7
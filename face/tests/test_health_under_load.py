@@ -0,0 +1,67 @@
+"""
+Health Check (GET /) ต้องยังตอบเร็วระหว่างที่ /api/v1/verify หลายตัวกำลังรออยู่ใน Inference Pool
+
+face_service.analyze ถูกแทนด้วยการ sleep (ไม่ต้องโหลดโมเดล) -> ถ้ามีขั้นไหนใน /verify รันบน event loop
+แทนที่จะส่งเข้า Pool, Health Check จะต้องรอตามไปด้วยและ p95 จะเกินขอบเขต
+
+รัน (จากโฟลเดอร์ face/):
+    python -m pytest tests
+"""
+import asyncio
+import time
+
+import cv2
+import httpx
+import numpy as np
+import pytest
+
+from app.main import app
+from app.readiness import readiness
+from app.services.face_service import face_service
+from app.services.inference_pool import inference_pool
+
+ANALYZE_S = 0.3          # เวลาที่ analyze ปลอมใช้ต่อ Request
+CONCURRENT_VERIFIES = 8
+HEALTH_P95_BOUND_S = 0.1
+
+@pytest.fixture
+def client_app(monkeypatch):
+    def slow_analyze(img):
+        time.sleep(ANALYZE_S)
+        return None  # -> reject "no_face_detected"
+
+    monkeypatch.setattr(face_service, "analyze", slow_analyze)
+    monkeypatch.setattr(readiness, "ready", True)
+    inference_pool.start()
+    yield app
+    inference_pool.shutdown()
+
+def test_health_stays_fast_while_verifies_are_in_flight(client_app):
+    image = cv2.imencode(".jpg", np.full((480, 640, 3), 128, dtype=np.uint8))[1].tobytes()
+
+    async def run():
+        transport = httpx.ASGITransport(app=client_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def verify():
+                files = {"file": ("face.jpg", image, "image/jpeg")}
+                return await client.post("/api/v1/verify", files=files)
+
+            loaders = [asyncio.create_task(verify()) for _ in range(CONCURRENT_VERIFIES)]
+            await asyncio.sleep(0.05)  # ให้ verify ทุกตัวเข้าคิวของ Pool ก่อน
+
+            samples = []
+            while not all(task.done() for task in loaders):
+                started = time.perf_counter()
+                resp = await client.get("/")
+                assert resp.status_code == 200
+                samples.append(time.perf_counter() - started)
+                await asyncio.sleep(0.02)
+            return samples, await asyncio.gather(*loaders)
+
+    samples, responses = asyncio.run(run())
+
+    assert [r.json()["reason"] for r in responses] == ["no_face_detected"] * CONCURRENT_VERIFIES
+    # verify 8 ตัวบน Pool 2 Thread ใช้เวลาราว 1.2 วินาที -> ต้องวัด Health Check ได้หลายครั้งระหว่างนั้น
+    assert len(samples) >= 10
+    p95 = float(np.percentile(samples, 95))
+    assert p95 < HEALTH_P95_BOUND_S, f"health p95 {p95 * 1000:.1f}ms while verifies in flight"
@@ -0,0 +1,92 @@
+"""
+ProcessInferencePool ต่อ Worker ปลอม (ไม่โหลดโมเดล): timeout / restart และเวลาแต่ละ stage ที่ส่งกลับมา
+
+รัน (จากโฟลเดอร์ face/):
+    python -m pytest tests
+"""
+import multiprocessing as mp
+import threading
+
+import numpy as np
+import pytest
+
+from app import metrics
+from app.services.process_pool import ProcessInferencePool, WorkerTimeoutError, _WorkerSlot
+
+class FakeProcess:
+    pid = 0
+
+    def is_alive(self):
+        return True
+
+@pytest.fixture
+def pool():
+    pool = ProcessInferencePool(num_workers=1, slot_bytes=64 * 64 * 3, task_timeout=0.2)
+    slot = _WorkerSlot(0, pool.slot_bytes)
+    parent_conn, child_conn = mp.Pipe()
+    slot.process, slot.conn = FakeProcess(), parent_conn
+    pool._slots.append(slot)
+    pool._free.put(slot)
+    pool.restarted = []
+    pool._restart = pool.restarted.append
+    yield pool, child_conn
+    slot.shm.close()
+    slot.shm.unlink()
+
+def test_hung_worker_times_out_and_is_restarted(pool):
+    pool, _ = pool
+    with pytest.raises(WorkerTimeoutError):
+        pool.infer(np.zeros((8, 8, 3), dtype=np.uint8))
+    assert [slot.index for slot in pool.restarted] == [0]
+    # slot ต้องกลับเข้า Pool ให้ Request ถัดไปใช้ได้
+    assert pool._free.qsize() == 1
+
+def test_worker_stage_timings_are_recorded_in_parent(pool):
+    pool, child_conn = pool
+
+    def worker():
+        assert child_conn.recv()[0] == "analyze"
+        child_conn.send(("ok", "result", [("detect", 0.01), ("embed", 0.02)]))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    with metrics.capture() as timings:
+        assert pool.infer(np.zeros((8, 8, 3), dtype=np.uint8)) == "result"
+    thread.join()
+    assert timings == [("detect", 0.01), ("embed", 0.02)]
+    assert pool.restarted == []
+
+def test_oversized_frame_is_sent_over_pipe(pool):
+    pool, child_conn = pool
+    # ใหญ่กว่า slot (64x64x3) เหมือนภาพ 4K ที่เกิน PROCESS_SHM_FRAME_BYTES
+    img = np.arange(128 * 96 * 3, dtype=np.uint32).astype(np.uint8).reshape(128, 96, 3)
+    received = {}
+
+    def worker():
+        task, shape, _, _, frame = child_conn.recv()
+        received.update(task=task, shape=shape, frame=frame)
+        child_conn.send(("ok", "result", []))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert pool.infer(img) == "result"
+    thread.join()
+    assert received["task"] == "analyze"
+    assert received["shape"] == img.shape
+    np.testing.assert_array_equal(received["frame"], img)
+
+def test_frame_that_fits_goes_through_shared_memory(pool):
+    pool, child_conn = pool
+    img = np.full((8, 8, 3), 7, dtype=np.uint8)
+    slot = pool._slots[0]
+
+    def worker():
+        _, shape, _, _, frame = child_conn.recv()
+        assert frame is None
+        np.testing.assert_array_equal(np.ndarray(shape, dtype=np.uint8, buffer=slot.shm.buf), img)
+        child_conn.send(("ok", "result", []))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert pool.infer(img) == "result"
+    thread.join()
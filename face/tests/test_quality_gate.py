@@ -0,0 +1,22 @@
+"""
+QualityGate.from_config: ชุดเดียวกันสำหรับ Settings ของ face และ Environment ของ ai-backend
+
+รัน (จากโฟลเดอร์ face/):
+    python -m pytest tests
+"""
+from app.config import settings
+from app.services.quality_gate import QualityGate, quality_gate_from_settings
+
+def test_from_settings_reads_every_threshold():
+    gate = quality_gate_from_settings()
+    assert gate.min_face_px == settings.QUALITY_MIN_FACE_PX
+    assert gate.max_yaw == settings.QUALITY_MAX_YAW
+    assert gate.frame_min_brightness == settings.QUALITY_FRAME_MIN_BRIGHTNESS
+    assert gate.frame_stride == settings.QUALITY_FRAME_STRIDE
+
+def test_from_config_casts_env_strings_and_keeps_defaults():
+    env = {"QUALITY_MIN_FACE_PX": "80", "QUALITY_FRAME_STRIDE": "4"}
+    gate = QualityGate.from_config(env.get)
+    assert gate.min_face_px == 80.0 and isinstance(gate.min_face_px, float)
+    assert gate.frame_stride == 4 and isinstance(gate.frame_stride, int)
+    assert gate.max_yaw == QualityGate().max_yaw
@@ -0,0 +1,165 @@
+"""
+ชุดทดสอบเดียวกันสำหรับทุก VectorBackend: InMemoryBackend ต้องให้ผลเหมือน QdrantBackend
+
+รัน (จากโฟลเดอร์ face/):
+    python -m pytest tests
+"""
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from app.services.vector_backend import EMBEDDING_DIM, InMemoryBackend, QdrantBackend
+
+THRESHOLD = 0.5
+
+def unit(vec) -> np.ndarray:
+    vec = np.asarray(vec, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+def random_vectors(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.stack([unit(v) for v in rng.standard_normal((n, EMBEDDING_DIM))])
+
+def payload(locker_id=None) -> dict:
+    return {"locker_id": locker_id, "active": True}
+
+@pytest.fixture(params=["qdrant", "memory"])
+def backend(request):
+    source = QdrantBackend(QdrantClient(location=":memory:"), f"test_{uuid.uuid4().hex[:8]}")
+    backend = source if request.param == "qdrant" else InMemoryBackend(source)
+    backend.init_collection()
+    yield backend
+    source.client.close()
+
+def ids(hits) -> list:
+    return [hit.id for hit in hits]
+
+def test_upsert_overwrites_vector_and_payload(backend):
+    old, new = random_vectors(2)
+    backend.upsert(1, old.tolist(), payload("L1"))
+    backend.upsert(1, new.tolist(), payload("L2"))
+
+    hits = backend.search(new, THRESHOLD)
+    assert ids(hits) == [1]
+    assert hits[0].score == pytest.approx(1.0, abs=1e-4)
+    assert hits[0].payload["locker_id"] == "L2"
+    assert backend.search(old, THRESHOLD) == []
+    # locker เดิมต้องไม่เหลือผู้ใช้นี้แล้ว
+    assert backend.search(new, THRESHOLD, locker_id="L1") == []
+
+def test_set_payload_moves_locker_and_keeps_other_fields(backend):
+    vec = random_vectors(1)[0]
+    backend.upsert(1, vec.tolist(), payload(None))
+    backend.set_payload(1, {"locker_id": "L1"})
+
+    hits = backend.search(vec, THRESHOLD, locker_id="L1")
+    assert ids(hits) == [1]
+    assert hits[0].payload == {"locker_id": "L1", "active": True}
+    assert backend.search(vec, THRESHOLD, locker_id="L2") == []
+
+    backend.set_payload(1, {"locker_id": "L2"})
+    assert backend.search(vec, THRESHOLD, locker_id="L1") == []
+    assert ids(backend.search(vec, THRESHOLD, locker_id="L2")) == [1]
+
+def test_delete_keeps_remaining_points_searchable(backend):
+    vectors = random_vectors(5)
+    for user_id, vec in enumerate(vectors, start=1):
+        backend.upsert(user_id, vec.tolist(), payload(f"L{user_id}"))
+
+    # ลบแถวกลาง -> InMemoryBackend ย้ายแถวสุดท้าย (user 5) มาแทน
+    backend.delete(2)
+
+    assert backend.search(vectors[1], THRESHOLD) == []
+    assert backend.retrieve(2) is None
+    for user_id in (1, 3, 4, 5):
+        hits = backend.search(vectors[user_id - 1], THRESHOLD)
+        assert ids(hits) == [user_id]
+        assert hits[0].payload["locker_id"] == f"L{user_id}"
+        assert ids(backend.search(vectors[user_id - 1], THRESHOLD, locker_id=f"L{user_id}")) == [user_id]
+
+    stored = backend.retrieve(5)
+    assert stored is not None and stored.similarity(vectors[4]) == pytest.approx(1.0, abs=1e-4)
+
+def test_threshold_cuts_off_low_scores(backend):
+    base, other = random_vectors(2)
+    backend.upsert(1, base.tolist(), payload())
+
+    # cosine กับ base = 0.6 พอดี (other เกือบตั้งฉากกับ base)
+    orth = unit(other - (other @ base) * base)
+    query = 0.6 * base + 0.8 * orth
+
+    hits = backend.search(query, 0.55)
+    assert ids(hits) == [1]
+    assert hits[0].score == pytest.approx(0.6, abs=1e-4)
+    assert backend.search(query, 0.65) == []
+
+def test_locker_filter_only_searches_booked_users(backend):
+    vectors = random_vectors(3)
+    for user_id, locker in ((1, "L1"), (2, "L1"), (3, "L2")):
+        backend.upsert(user_id, vectors[user_id - 1].tolist(), payload(locker))
+
+    assert backend.search(vectors[2], THRESHOLD, locker_id="L1") == []
+    assert ids(backend.search(vectors[2], THRESHOLD, locker_id="L2")) == [3]
+    assert ids(backend.search(vectors[0], THRESHOLD, locker_id="L1")) == [1]
+    assert backend.search(vectors[0], THRESHOLD, locker_id="missing") == []
+
+def test_top_k_is_ordered_by_score(backend):
+    query, *noise = random_vectors(6, seed=1)
+    similarities = {1: 0.7, 2: 0.95, 3: 0.8, 4: 0.3, 5: 0.9}
+    for user_id, sim in similarities.items():
+        orth = unit(noise[user_id - 1] - (noise[user_id - 1] @ query) * query)
+        vec = sim * query + np.sqrt(1 - sim ** 2) * orth
+        backend.upsert(user_id, vec.tolist(), payload("L1" if user_id % 2 else "L2"))
+
+    hits = backend.search(query, THRESHOLD, limit=10)
+    assert ids(hits) == [2, 5, 3, 1]  # 4 ต่ำกว่า threshold
+    assert [h.score for h in hits] == pytest.approx([0.95, 0.9, 0.8, 0.7], abs=1e-4)
+
+    assert ids(backend.search(query, THRESHOLD, limit=2)) == [2, 5]
+    assert ids(backend.search(query, THRESHOLD, limit=10, locker_id="L1")) == [5, 3, 1]
+
+def test_search_batch_matches_single_searches(backend):
+    vectors = random_vectors(4)
+    for user_id, vec in enumerate(vectors[:3], start=1):
+        backend.upsert(user_id, vec.tolist(), payload())
+
+    queries = [vectors[0], vectors[2], vectors[3]]
+    batch = backend.search_batch(queries, THRESHOLD, limit=1)
+    assert [ids(hits) for hits in batch] == [[1], [3], []]
+    for hits, query in zip(batch, queries):
+        single = backend.search(query, THRESHOLD)
+        assert ids(hits) == ids(single)
+        assert [h.score for h in hits] == pytest.approx([h.score for h in single], abs=1e-5)
+
+def test_search_batch_filters_by_locker(backend):
+    vectors = random_vectors(4)
+    for user_id, locker in ((1, "L1"), (2, "L1"), (3, "L2")):
+        backend.upsert(user_id, vectors[user_id - 1].tolist(), payload(locker))
+
+    queries = [vectors[0], vectors[1], vectors[2], vectors[3]]
+    batch = backend.search_batch(queries, THRESHOLD, locker_id="L1")
+    assert [ids(hits) for hits in batch] == [[1], [2], [], []]
+    for hits, query in zip(batch, queries):
+        assert ids(hits) == ids(backend.search(query, THRESHOLD, locker_id="L1"))
+
+    assert [ids(hits) for hits in backend.search_batch(queries, THRESHOLD, limit=3, locker_id="L2")] == [[], [], [3], []]
+    assert backend.search_batch(queries, THRESHOLD, locker_id="missing") == [[], [], [], []]
+    batch = asyncio.run(backend.asearch_batch(queries, THRESHOLD, locker_id="L2"))
+    assert [ids(hits) for hits in batch] == [[], [], [3], []]
+
+def test_async_search_matches_sync(backend):
+    vectors = random_vectors(3)
+    for user_id, vec in enumerate(vectors, start=1):
+        backend.upsert(user_id, vec.tolist(), payload("L1"))
+
+    async def run():
+        single = await backend.asearch(vectors[1], THRESHOLD, locker_id="L1")
+        batch = await backend.asearch_batch(vectors, THRESHOLD)
+        return single, batch
+
+    single, batch = asyncio.run(run())
+    assert ids(single) == [2]
+    assert [ids(hits) for hits in batch] == [[1], [2], [3]]
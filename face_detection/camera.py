@@ -1,30 +1,57 @@
 import cv2
 from ultralytics import YOLO
+import json
 import threading
 import requests
 import time
 
 # --- การตั้งค่า API ---
 API_URL = "http://localhost:8000/identify"
+CROP_VERIFY_URL = "http://localhost:8000/api/v1/verify/crop"  # upload_mode="crop": ส่งเฉพาะหน้า + landmarks
+# "frame" = ส่งทั้งเฟรมไป API_URL ทุกเฟรม (แบบเดิม) / "crop" = ส่งเฉพาะหน้าไป CROP_VERIFY_URL
+UPLOAD_MODE = "frame"
+UPLOAD_INTERVAL = 1.0  # upload_mode="crop": ส่งถี่สุดกี่วินาทีต่อครั้ง
+DEVICE_ID = "esp32_cam_01"
+LOCKER_ID = None       # ตู้ที่กล้องนี้ติดอยู่ (None = ค้นหาทั้ง Gallery)
 
 class FaceCropper:
-    def __init__(self, model_path):
+    def __init__(self, model_path, upload_mode="frame", crop_margin=0.15):
         # โหลดโมเดล YOLO (ใช้ path ของคุณ)
         self.model = YOLO(model_path)
+        # "frame" = ส่งทั้งเฟรมให้ Server หาหน้าเอง (/identify) / "crop" = ส่งเฉพาะหน้าที่ crop แล้ว (Server ไม่ต้องรัน Detector ซ้ำ)
+        self.upload_mode = upload_mode
+        # ขยายกรอบออกทุกด้านตอนส่งแบบ crop (ให้ Server align ได้โดยไม่มีขอบดำ) ใช้เฉพาะตอนมี landmarks
+        self.crop_margin = crop_margin
 
-    def process_and_crop(self, frame):
-        # 1. ให้ YOLO หาตำแหน่ง (ปรับ conf ตามต้องการ)
+    def detect(self, frame):
+        """
+        หาใบหน้าทั้งหมด -> [(x1, y1, x2, y2, kps), ...]
+        kps = 5 จุด (ตาซ้าย, ตาขวา, จมูก, มุมปากซ้าย, มุมปากขวา) ในพิกัดของเฟรม
+              ถ้าโมเดลเป็นแบบมี keypoints (เช่น yolov8-face) ไม่งั้นเป็น None
+        """
+        # ให้ YOLO หาตำแหน่ง (ปรับ conf ตามต้องการ)
         results = self.model(frame, conf=0.5, verbose=False)
-        
-        cropped_faces = [] # ลิสต์เก็บภาพใบหน้าที่ตัดมาได้
-        annotated_frame = frame.copy() # ภาพสำหรับโชว์ (วาดกรอบ)
+        keypoints = results[0].keypoints
+        kpss = keypoints.xy.cpu().numpy() if keypoints is not None else None
 
-        # 2. วนลูปตามจำนวนหน้าที่เจอ
-        for box in results[0].boxes:
+        faces = []
+        for i, box in enumerate(results[0].boxes):
             # ดึงพิกัด (x1, y1, x2, y2)
             coords = box.xyxy[0].cpu().numpy() # แปลงเป็น numpy array
             x1, y1, x2, y2 = map(int, coords)  # แปลงเป็น int
+            kps = kpss[i] if kpss is not None and kpss.shape[1] == 5 else None
+            faces.append((x1, y1, x2, y2, kps))
+        return faces
 
+    def process_and_crop(self, frame, faces=None):
+        if faces is None:
+            faces = self.detect(frame)
+        
+        cropped_faces = [] # ลิสต์เก็บภาพใบหน้าที่ตัดมาได้
+        annotated_frame = frame.copy() # ภาพสำหรับโชว์ (วาดกรอบ)
+
+        # วนลูปตามจำนวนหน้าที่เจอ
+        for x1, y1, x2, y2, _ in faces:
             # --- จุดสำคัญ: การ Crop ภาพ ---
             # ต้องเช็คขอบเขตไม่ให้ติดลบหรือเกินขนาดภาพ (กัน Error)
             h, w, _ = frame.shape
@@ -43,6 +70,61 @@ class FaceCropper:
 
         return annotated_frame, cropped_faces
 
+    def crop_for_upload(self, frame, face):
+        """
+        ตัดหน้าสำหรับส่งแบบ crop -> (face_img, landmarks, bbox) โดย landmarks / bbox อยู่ในพิกัดของ face_img
+        มี keypoints: ขยายขอบ crop_margin ให้ Server align ได้ แล้วบอกกรอบหน้าจริงใน bbox
+                      (Server ใช้กรอบนี้ตรวจขนาดหน้า / Liveness เหมือนตอน Detect เอง)
+        ไม่มี keypoints: ส่งกรอบพอดีหน้า (bbox = None, Server วาง template ของ ArcFace ลงบนกรอบเอง)
+        """
+        fx1, fy1, fx2, fy2, kps = face
+        h, w, _ = frame.shape
+        x1, y1, x2, y2 = fx1, fy1, fx2, fy2
+        if kps is not None:
+            pad_x, pad_y = int((x2 - x1) * self.crop_margin), int((y2 - y1) * self.crop_margin)
+            x1, y1, x2, y2 = x1 - pad_x, y1 - pad_y, x2 + pad_x, y2 + pad_y
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+
+        face_img = frame[y1:y2, x1:x2]
+        if kps is None:
+            return face_img, None, None
+        landmarks = [[float(x - x1), float(y - y1)] for x, y in kps]
+        bbox = [max(0, fx1) - x1, max(0, fy1) - y1, min(w, fx2) - x1, min(h, fy2) - y1]
+        return face_img, landmarks, bbox
+
+    def upload_crop(self, frame, faces, locker_id=LOCKER_ID, device_id=DEVICE_ID):
+        """
+        ส่งหน้าที่ใหญ่ที่สุด + landmarks -> /verify/crop (Server แค่ align + embed + liveness) รันใน Thread แยก
+        Return: dict ผลลัพธ์จาก Server หรือ None ถ้าไม่มีหน้า / ส่งไม่สำเร็จ
+        """
+        if not faces:
+            return None
+        largest = max(faces, key=lambda f: (f[2] - f[0]) * (f[3] - f[1]))
+        image, landmarks, bbox = self.crop_for_upload(frame, largest)
+        if image.size == 0:
+            return None
+
+        data = {"device_id": device_id}
+        if locker_id is not None:
+            data["locker_id"] = locker_id
+        if landmarks is not None:
+            data["landmarks"] = json.dumps(landmarks)
+        if bbox is not None:
+            data["bbox"] = ",".join(str(int(v)) for v in bbox)
+        url = CROP_VERIFY_URL
+
+        try:
+            _, img_encoded = cv2.imencode('.jpg', image)
+            files = {'file': ('face.jpg', img_encoded.tobytes(), 'image/jpeg')}
+            response = requests.post(url, files=files, data=data, timeout=5)
+            if response.status_code == 200:
+                return response.json()
+            print(f"❌ Upload ล้มเหลว: {response.status_code} - {response.text}")
+        except Exception as e:
+            print(f"⚠️ Error sending API: {e}")
+        return None
+
 def send_face_to_api( face_image):
         """ฟังก์ชันสำหรับส่งภาพไป Server (รันใน Thread แยก)"""
         try:
@@ -71,7 +153,7 @@ def open_camera():
     # เปลี่ยน Path เป็นโมเดลของคุณ
     model_path = r'C:\Users\chinn\Desktop\nene\pestguard_IoTHackathon_sit\ai\models\yolov8_face_detection.pt'
     
-    cropper = FaceCropper(model_path)
+    cropper = FaceCropper(model_path, upload_mode=UPLOAD_MODE)
     
     #ip_camera_url = "rtsp://10.250.80.155:8080/h264_ulaw.sdp"
     #cap = cv2.VideoCapture(ip_camera_url)
@@ -79,12 +161,39 @@ def open_camera():
 
     print("Opening camera... Press 'q' to exit.")
 
+    last_upload = 0.0
+    uploading = threading.Event()
+
+    def upload_and_report(frame, faces):
+        try:
+            data = cropper.upload_crop(frame, faces)
+            if data is None:
+                return
+            if data.get("status") == "allow":
+                print(f"✅ MATCH FOUND: {data.get('user_id')} -> Locker {data.get('locker_id')}")
+            else:
+                print(f"❌ NO MATCH: {data.get('reason', 'Unknown')} {data.get('quality') or ''}")
+        finally:
+            uploading.clear()
+
     while True:
         ret, frame = cap.read()
         if not ret: break
 
-        if ret:
+        detections = None
+        if cropper.upload_mode == "crop":
+            # ส่งเฉพาะหน้าเมื่อเจอหน้า (ครั้งละ 1 Request และไม่ถี่กว่า UPLOAD_INTERVAL)
+            detections = cropper.detect(frame)
+            now = time.time()
+            if detections and not uploading.is_set() and now - last_upload >= UPLOAD_INTERVAL:
+                last_upload = now
+                uploading.set()
+                threading.Thread(target=upload_and_report, args=(frame.copy(), detections), daemon=True).start()
+        elif ret:
             try:
+                # 1. แปลงเฟรม (Numpy) เป็น JPG
+                _, encoded_image = cv2.imencode('.jpg', frame)
+
                 # 2. เตรียมข้อมูลส่ง HTTP POST
                 files = {'file': ('image.jpg', encoded_image.tobytes(), 'image/jpeg')}
                 
@@ -122,7 +231,7 @@ def open_camera():
                 last_color = (0, 0, 255)
 
         # เรียกฟังก์ชันประมวลผล
-        main_frame, faces = cropper.process_and_crop(frame)
+        main_frame, faces = cropper.process_and_crop(frame, detections)
 
         # แสดงภาพหลัก (ที่มีกรอบเขียว)
         cv2.imshow("YOLO Face Detection", main_frame)